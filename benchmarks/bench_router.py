@@ -0,0 +1,60 @@
+""" Compare the generic router with specialized routers.
+
+Time a request which is dispatched by traversal to a view on the root
+object and a request which is dispatched by URL dispatch to a view
+attached to a route, using a router made by
+``Configurator.make_wsgi_app`` with and without ``specialize=True``
+and with and without the ``bind_route_views`` setting.
+"""
+import timeit
+
+from webob import Response
+
+from pyramid.configuration import Configurator
+
+NUMBER = 5000
+
+def view(request):
+    return Response('OK')
+
+def make_app(specialize, settings):
+    config = Configurator(settings=settings)
+    config.begin()
+    try:
+        config.add_view(view)
+        config.add_route('item', '/items/{id}', view=view)
+    finally:
+        config.end()
+    return config.make_wsgi_app(specialize=specialize)
+
+def start_response(status, headers):
+    pass
+
+def bench(app, path):
+    environ = {
+        'wsgi.url_scheme':'http',
+        'SERVER_NAME':'localhost',
+        'SERVER_PORT':'8080',
+        'REQUEST_METHOD':'GET',
+        'PATH_INFO':path,
+        }
+    timer = timeit.Timer(lambda: app(environ.copy(), start_response))
+    best = min(timer.repeat(3, NUMBER))
+    return best / NUMBER * 1e6
+
+def main():
+    scenarios = (
+        ('traversal', '/'),
+        ('route', '/items/1'),
+        )
+    for bind in (False, True):
+        settings = {'bind_route_views':bind}
+        for specialize in (False, True):
+            app = make_app(specialize, settings)
+            results = ['%s=%8.2fus' % (name, bench(app, path))
+                       for name, path in scenarios]
+            print 'bind_route_views=%-5s specialize=%-5s %s' % (
+                bind, specialize, ' '.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+""" Measure the cost of request timing.
+
+Time a request dispatched by URL dispatch with no request timer, and
+with a ``pyramid.timing.RequestTimingAggregator`` registered as the
+request timer, using both the generic and a specialized router.
+"""
+import timeit
+
+from webob import Response
+
+from pyramid.configuration import Configurator
+from pyramid.timing import RequestTimingAggregator
+
+NUMBER = 5000
+
+def view(request):
+    return Response('OK')
+
+def make_app(specialize, timer):
+    config = Configurator()
+    config.begin()
+    try:
+        config.add_route('item', '/items/{id}', view=view)
+        if timer is not None:
+            config.set_request_timer(timer)
+    finally:
+        config.end()
+    return config.make_wsgi_app(specialize=specialize)
+
+def start_response(status, headers):
+    pass
+
+def bench(app):
+    environ = {
+        'wsgi.url_scheme':'http',
+        'SERVER_NAME':'localhost',
+        'SERVER_PORT':'8080',
+        'REQUEST_METHOD':'GET',
+        'PATH_INFO':'/items/1',
+        }
+    timer = timeit.Timer(lambda: app(environ.copy(), start_response))
+    best = min(timer.repeat(3, NUMBER))
+    return best / NUMBER * 1e6
+
+def main():
+    for specialize in (False, True):
+        for timer in (None, RequestTimingAggregator()):
+            app = make_app(specialize, timer)
+            print 'specialize=%-5s timer=%-5s %8.2fus' % (
+                specialize, timer is not None, bench(app))
+            if timer is not None:
+                percentiles = timer.percentiles('item')
+                print '  p50=%.1fus p95=%.1fus p99=%.1fus' % (
+                    percentiles[50] * 1e6, percentiles[95] * 1e6,
+                    percentiles[99] * 1e6)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+""" Measure the cost of parsing paths and of traversal.
+
+Time ``pyramid.traversal.traversal_path`` without its cache (both the
+current implementation and the one which unquoted and decoded each
+segment) for shallow, deep and percent-encoded paths, and time
+``ModelGraphTraverser`` with and without a virtual root.
+"""
+import timeit
+import urllib
+
+from pyramid.traversal import ModelGraphTraverser
+from pyramid.traversal import traversal_path
+
+NUMBER = 20000
+
+PATHS = [
+    ('shallow', '/folder/document'),
+    ('deep', '/a/b/c/d/e/f/g/h/i/j/document.html'),
+    ('encoded', '/La%20Pe%C3%B1a/space%20thing/document'),
+    ('dots', '/a/./b/../c/document'),
+    ]
+
+def per_segment_traversal_path(path):
+    # the implementation which unquoted and decoded every segment
+    path = path.strip('/')
+    clean = []
+    for segment in path.split('/'):
+        segment = urllib.unquote(segment)
+        if not segment or segment=='.':
+            continue
+        elif segment == '..':
+            del clean[-1]
+        else:
+            clean.append(segment.decode('utf-8'))
+    return tuple(clean)
+
+class Folder(dict):
+    __parent__ = __name__ = None
+
+def make_tree(depth):
+    root = ob = Folder()
+    for i in range(depth):
+        child = Folder()
+        child.__name__ = 'f%d' % i
+        child.__parent__ = ob
+        ob[child.__name__] = child
+        ob = child
+    return root
+
+def bench(func, *arg):
+    timer = timeit.Timer(lambda: func(*arg))
+    best = min(timer.repeat(3, NUMBER))
+    return best / NUMBER * 1e6
+
+def main():
+    uncached = traversal_path.func
+    for name, path in PATHS:
+        print '%-8s per-segment %6.2fus  current %6.2fus  cached %6.2fus' % (
+            name, bench(per_segment_traversal_path, path),
+            bench(uncached, path), bench(traversal_path, path))
+
+    traverser = ModelGraphTraverser(make_tree(6))
+    environ = {'PATH_INFO':'/f3/f4/f5'}
+    print 'traverse without vroot %6.2fus' % bench(traverser, environ)
+    environ = {'PATH_INFO':'/f3/f4/f5', 'HTTP_X_VHM_ROOT':'/f0/f1/f2'}
+    print 'traverse with vroot    %6.2fus' % bench(traverser, environ)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+""" Compare the linear routes mapper with the indexed routes mapper.
+
+For route tables of 10, 100 and 1000 routes, time matching a path which
+hits the first route, a path which hits the last route and a path which
+hits no route at all.
+"""
+import timeit
+
+from pyramid.urldispatch import IndexedRoutesMapper
+from pyramid.urldispatch import RoutesMapper
+
+NUMBER = 2000
+
+class DummyRequest(object):
+    def __init__(self, path):
+        self.environ = {'PATH_INFO':path}
+
+def make_mapper(factory, size):
+    mapper = factory()
+    for i in range(size):
+        mapper.connect('route%s' % i, '/section%s/{id}/edit' % i)
+    return mapper
+
+def bench(mapper, path):
+    request = DummyRequest(path)
+    timer = timeit.Timer(lambda: mapper(request))
+    best = min(timer.repeat(3, NUMBER))
+    return best / NUMBER * 1e6
+
+def main():
+    for size in (10, 100, 1000):
+        scenarios = (
+            ('first', '/section0/1/edit'),
+            ('last', '/section%s/1/edit' % (size - 1)),
+            ('miss', '/nowhere/1/edit'),
+            )
+        for label, factory in (('linear', RoutesMapper),
+                               ('indexed', IndexedRoutesMapper)):
+            mapper = make_mapper(factory, size)
+            results = ['%s=%8.2fus' % (name, bench(mapper, path))
+                       for name, path in scenarios]
+            print '%5d routes %-8s %s' % (size, label, ' '.join(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+""" Measure the per-request overhead of derived views.
+
+Time calls to views derived by ``Configurator._derive_view`` with no
+stage, with predicates, with a permission and with predicates, a
+permission and an accept value, next to calls to the same views wrapped
+in one closure per stage (the way views were derived before the stages
+were flattened into a single function).
+"""
+import timeit
+
+from pyramid.configuration import Configurator
+from pyramid.exceptions import Forbidden
+from pyramid.exceptions import PredicateMismatch
+from pyramid.interfaces import IAuthenticationPolicy
+from pyramid.interfaces import IAuthorizationPolicy
+
+NUMBER = 100000
+
+def view(context, request):
+    return 'OK'
+
+def method_predicate(context, request):
+    return request.method == 'GET'
+
+def xhr_predicate(context, request):
+    return not request.is_xhr
+
+class Policy(object):
+    def effective_principals(self, request):
+        return ()
+
+    def permits(self, context, principals, permission):
+        return True
+
+class Request(object):
+    method = 'GET'
+    is_xhr = False
+
+def stacked_view(view, permission, predicates, policy, attributed):
+    # one wrapper per stage, as the view derivation stack used to make
+    if permission:
+        inner = view
+        def view(context, request):
+            principals = policy.effective_principals(request)
+            if policy.permits(context, principals, permission):
+                return inner(context, request)
+            raise Forbidden()
+    if predicates:
+        secured = view
+        def view(context, request):
+            if all((predicate(context, request) for predicate in
+                    predicates)):
+                return secured(context, request)
+            raise PredicateMismatch()
+    if attributed:
+        predicated = view
+        def view(context, request):
+            return predicated(context, request)
+    return view
+
+SCENARIOS = [
+    ('plain', None, (), False),
+    ('predicates', None, (method_predicate, xhr_predicate), False),
+    ('permission', 'view', (), False),
+    ('all', 'view', (method_predicate, xhr_predicate), True),
+    ]
+
+def bench(func, *arg):
+    timer = timeit.Timer(lambda: func(*arg))
+    best = min(timer.repeat(3, NUMBER))
+    return best / NUMBER * 1e6
+
+def main():
+    config = Configurator()
+    policy = Policy()
+    config.registry.registerUtility(policy, IAuthenticationPolicy)
+    config.registry.registerUtility(policy, IAuthorizationPolicy)
+    request = Request()
+    for name, permission, predicates, attributed in SCENARIOS:
+        kw = {}
+        if attributed:
+            kw['accept'] = 'text/html'
+        derived = config._derive_view(view, permission=permission,
+                                      predicates=predicates, **kw)
+        stacked = stacked_view(view, permission, predicates, policy,
+                               attributed)
+        print '%-10s stacked %6.2fus  flattened %6.2fus' % (
+            name, bench(stacked, None, request),
+            bench(derived, None, request))
+
+if __name__ == '__main__':
+    main()
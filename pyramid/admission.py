@@ -0,0 +1,153 @@
+import threading
+from time import time
+
+from pyramid.httpexceptions import HTTPServiceUnavailable
+
+class RequestShed(Exception):
+    """ Raised by :meth:`AdmissionController.admit` when a request is
+    not admitted; handled by the router, which responds with the
+    controller's ``response``."""
+
+class AdmissionGate(object):
+    """ Admits at most ``limit`` concurrent requests.  A request which
+    arrives while ``limit`` requests are in flight waits for at most
+    ``max_wait`` seconds for one of them to finish; if none finishes
+    in time, the request is shed.
+
+    The ``admitted``, ``shed`` and ``queued`` attributes count the
+    requests which were admitted, which were shed and which found the
+    gate full when they arrived (whether or not they were eventually
+    admitted); ``wait_time`` is the total number of seconds requests
+    spent waiting and ``in_flight`` is the number of requests
+    currently admitted."""
+    admitted = 0
+    shed = 0
+    queued = 0
+    wait_time = 0
+
+    def __init__(self, limit, max_wait=0):
+        self.limit = limit
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.condition = threading.Condition(threading.Lock())
+
+    def enter(self):
+        """ Return ``True`` if a request is admitted, ``False`` if it
+        is shed.  Every admitted request must be followed by a call to
+        :meth:`exit`."""
+        condition = self.condition
+        condition.acquire()
+        try:
+            if self.in_flight >= self.limit:
+                self.queued += 1
+                if self.max_wait > 0:
+                    start = time()
+                    deadline = start + self.max_wait
+                    remaining = self.max_wait
+                    while self.in_flight >= self.limit and remaining > 0:
+                        condition.wait(remaining)
+                        remaining = deadline - time()
+                    self.wait_time += time() - start
+                if self.in_flight >= self.limit:
+                    self.shed += 1
+                    return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        finally:
+            condition.release()
+
+    def exit(self):
+        """ Record that an admitted request has finished """
+        condition = self.condition
+        condition.acquire()
+        try:
+            self.in_flight -= 1
+            condition.notify()
+        finally:
+            condition.release()
+
+    def stats(self):
+        """ Return a dictionary of the gate's counters """
+        return {'admitted':self.admitted, 'shed':self.shed,
+                'queued':self.queued, 'wait_time':self.wait_time,
+                'in_flight':self.in_flight}
+
+class AdmissionController(object):
+    """ Caps the number of requests a :term:`router` processes
+    concurrently.  ``max_requests`` is the maximum number of requests
+    in flight in the router (``0`` means no maximum) and
+    ``route_limits`` is a dictionary mapping route names to the
+    maximum number of in-flight requests which matched that route.
+    Requests wait for at most ``max_wait`` seconds for a slot before
+    being shed; the router responds to a shed request by calling
+    ``response`` as a WSGI application (by default, an instance of
+    :class:`pyramid.httpexceptions.HTTPServiceUnavailable`).
+
+    The :class:`AdmissionGate` instances which enforce the limits are
+    available as the ``gate`` (``None`` when ``max_requests`` is ``0``)
+    and ``route_gates`` attributes."""
+
+    def __init__(self, max_requests=0, max_wait=0, route_limits=None,
+                 response=None):
+        self.gate = None
+        if max_requests:
+            self.gate = AdmissionGate(max_requests, max_wait)
+        self.route_gates = {}
+        for name, limit in (route_limits or {}).items():
+            self.route_gates[name] = AdmissionGate(limit, max_wait)
+        if response is None:
+            response = HTTPServiceUnavailable()
+        self.response = response
+
+    def admit(self, gates, route_name=None):
+        """ Admit a request to the router (if ``route_name`` is
+        ``None``) or to the route named ``route_name``, appending the
+        gate entered (if any) to the list ``gates``.  Raise
+        :class:`RequestShed` if the request is not admitted."""
+        if route_name is None:
+            gate = self.gate
+        else:
+            gate = self.route_gates.get(route_name)
+        if gate is not None:
+            if not gate.enter():
+                raise RequestShed(route_name)
+            gates.append(gate)
+
+    def release(self, gates):
+        """ Exit each of ``gates`` """
+        for gate in gates:
+            gate.exit()
+
+    def stats(self):
+        """ Return a dictionary mapping route names to the counters
+        (see :meth:`AdmissionGate.stats`) of their gates; the counters
+        of the router-wide gate are under the key ``None``."""
+        result = {}
+        if self.gate is not None:
+            result[None] = self.gate.stats()
+        for name, gate in self.route_gates.items():
+            result[name] = gate.stats()
+        return result
+
+def admission_controller_from_settings(settings):
+    """ Return an :class:`AdmissionController` configured by the
+    ``admission_max_requests``, ``admission_max_wait``,
+    ``admission_route_limits`` and ``admission_retry_after`` values
+    in the ``settings`` dictionary, or ``None`` if no limit is
+    configured."""
+    max_requests = int(settings.get('admission_max_requests', 0))
+    max_wait = float(settings.get('admission_max_wait', 0))
+    route_limits = {}
+    for item in settings.get('admission_route_limits', '').split():
+        name, limit = item.split('=', 1)
+        route_limits[name] = int(limit)
+    if not (max_requests or route_limits):
+        return None
+    headers = []
+    retry_after = settings.get('admission_retry_after')
+    if retry_after:
+        headers.append(('Retry-After', str(retry_after)))
+    response = HTTPServiceUnavailable(headers=headers)
+    return AdmissionController(max_requests, max_wait, route_limits,
+                               response)
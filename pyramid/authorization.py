@@ -3,11 +3,13 @@ from zope.interface import implements
 from pyramid.interfaces import IAuthorizationPolicy
 
 from pyramid.location import lineage
+from pyramid.location import request_lineage
 from pyramid.security import ACLAllowed
 from pyramid.security import ACLDenied
 from pyramid.security import Allow
 from pyramid.security import Deny
 from pyramid.security import Everyone
+from pyramid.threadlocal import get_current_request
 
 class ACLAuthorizationPolicy(object):
     """ An :term:`authorization policy` which consults an :term:`ACL`
@@ -55,6 +57,15 @@ class ACLAuthorizationPolicy(object):
       is cleared for all principals encountered in previous ACLs.  The
       walking process ends after we've processed the any ACL directly
       attached to ``context``; a set of principals is returned.
+
+    - The lineage of a context is computed once per request: the
+      policy memoizes it on the current request, as returned by
+      :func:`pyramid.threadlocal.get_current_request` (without a
+      current request, it is computed on each call).  An application
+      which moves an ancestor of a context after its permissions have
+      been checked during a request must call
+      :func:`pyramid.location.forget_request_lineages` to see its new
+      lineage.
     """
 
     implements(IAuthorizationPolicy)
@@ -67,7 +78,7 @@ class ACLAuthorizationPolicy(object):
 
         acl = '<No ACL found on any object in model lineage>'
         
-        for location in lineage(context):
+        for location in _lineage(context):
             try:
                 acl = location.__acl__
             except AttributeError:
@@ -102,7 +113,7 @@ class ACLAuthorizationPolicy(object):
         the :term:`lineage`."""
         allowed = set()
 
-        for location in reversed(list(lineage(context))):
+        for location in reversed(_lineage(context)):
             # NB: we're walking *up* the object graph from the root
             try:
                 acl = location.__acl__
@@ -131,3 +142,10 @@ class ACLAuthorizationPolicy(object):
             allowed.update(allowed_here)
 
         return allowed
+
+def _lineage(context):
+    # the lineage of the context is computed once per request
+    request = get_current_request()
+    if request is None:
+        return list(lineage(context))
+    return request_lineage(context, request)
@@ -0,0 +1,107 @@
+from repoze.lru import LRUCache
+
+_marker = object()
+
+# name -> BoundedCache
+_caches = {}
+
+class BoundedCache(object):
+    """ A thread-safe cache of at most ``size`` entries which discards
+    the least recently used entries first.  The ``hits``, ``misses``
+    and ``evictions`` attributes count the lookups which found an
+    entry, the lookups which did not and the entries discarded to make
+    room for new ones."""
+    def __init__(self, name, size):
+        self.name = name
+        self.resize(size)
+
+    def resize(self, size):
+        """ Discard all entries and bound the cache to ``size``
+        entries """
+        self.size = size
+        self.cache = LRUCache(size)
+        self.hits = self.misses = self.evictions = 0
+
+    def clear(self):
+        """ Discard all entries and reset the counters """
+        self.resize(self.size)
+
+    def get(self, key, default=None):
+        """ Return the value cached for ``key`` or ``default`` """
+        value = self.cache.get(key, _marker)
+        if value is _marker:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """ Cache ``value`` for ``key`` """
+        data = self.cache.data
+        if len(data) >= self.size and not key in data:
+            self.evictions += 1
+        self.cache.put(key, value)
+
+    def stats(self):
+        """ Return a dictionary of the cache's ``size``, its number of
+        entries (``length``) and its counters """
+        return {'size':self.size, 'length':len(self.cache.data),
+                'hits':self.hits, 'misses':self.misses,
+                'evictions':self.evictions}
+
+def register_cache(name, size):
+    """ Return the :class:`BoundedCache` named ``name``, creating one of
+    ``size`` entries if there is none (if its size has been configured
+    by :func:`configure_caches`, it is not changed)."""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = BoundedCache(name, size)
+    return cache
+
+def get_cache(name):
+    """ Return the :class:`BoundedCache` named ``name``; raise a
+    :exc:`KeyError` if there is none."""
+    return _caches[name]
+
+def cache_stats():
+    """ Return a dictionary mapping the name of each registered cache to
+    its statistics (see :meth:`BoundedCache.stats`) """
+    result = {}
+    for name, cache in _caches.items():
+        result[name] = cache.stats()
+    return result
+
+def configure_caches(settings):
+    """ Size the caches named in the ``cache_sizes`` value of the
+    ``settings`` dictionary, a whitespace-separated list of
+    ``name=size`` items.  A cache which is resized loses its entries;
+    a cache which is not registered yet is registered with the
+    configured size."""
+    for item in settings.get('cache_sizes', '').split():
+        name, size = item.split('=', 1)
+        size = int(size)
+        cache = register_cache(name, size)
+        if cache.size != size:
+            cache.resize(size)
+
+def cached(name, size):
+    """ Decorator which caches the results of a function of hashable
+    positional arguments in the :class:`BoundedCache` registered as
+    ``name`` (with ``size`` entries unless configured otherwise).  The
+    cache and the undecorated function are available as the ``cache``
+    and ``func`` attributes of the decorated function."""
+    def decorator(func):
+        cache = register_cache(name, size)
+        def wrapper(*arg):
+            result = cache.get(arg, _marker)
+            if result is _marker:
+                result = func(*arg)
+                cache.put(arg, result)
+            return result
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__module__ = func.__module__
+        wrapper.cache = cache
+        wrapper.func = func
+        return wrapper
+    return decorator
@@ -33,6 +33,7 @@ from pyramid.interfaces import IRendererFactory
 from pyramid.interfaces import IRendererGlobalsFactory
 from pyramid.interfaces import IRequest
 from pyramid.interfaces import IRequestFactory
+from pyramid.interfaces import IRequestTimer
 from pyramid.interfaces import IRootFactory
 from pyramid.interfaces import IRouteRequest
 from pyramid.interfaces import IRoutesMapper
@@ -55,6 +56,8 @@ except TypeError: # pragma: no cover
 
 from pyramid import renderers
 from pyramid.authorization import ACLAuthorizationPolicy
+from pyramid.caches import configure_caches
+from pyramid.caches import register_cache
 from pyramid.compat import all
 from pyramid.compat import md5
 from pyramid.events import ApplicationCreated
@@ -72,14 +75,20 @@ from pyramid.renderers import RendererHelper
 from pyramid.request import route_request_iface
 from pyramid.resource import PackageOverrides
 from pyramid.resource import resolve_resource_spec
+from pyramid.scanning import ScanCache
+from pyramid.scanning import scan_package
 from pyramid.settings import Settings
+from pyramid.snapshot import ConfigurationRecorder
+from pyramid.snapshot import read_snapshot
 from pyramid.static import StaticURLInfo
+from pyramid.tasks import task_pool_from_settings
 from pyramid.threadlocal import get_current_registry
 from pyramid.threadlocal import get_current_request
 from pyramid.threadlocal import manager
 from pyramid.traversal import DefaultRootFactory
 from pyramid.traversal import find_interface
 from pyramid.traversal import traversal_path
+from pyramid.urldispatch import IndexedRoutesMapper
 from pyramid.urldispatch import RoutesMapper
 from pyramid.util import DottedNameResolver
 from pyramid.view import default_exceptionresponse_view
@@ -95,6 +104,18 @@ DEFAULT_RENDERERS = (
     ('string', renderers.string_renderer_factory),
     )
 
+ROUTE_DISPATCHERS = {
+    'linear':RoutesMapper,
+    'indexed':IndexedRoutesMapper,
+    }
+
+# (multiview, generation, Accept header) -> negotiated media types
+_negotiation_cache = register_cache('accept_negotiation', 1000)
+# (Accept header, media type) -> whether the header accepts the type
+_accept_cache = register_cache('accept_predicate', 1000)
+# predicate identity -> predicate; see _intern_predicate
+_interned_predicates = {}
+
 if chameleon_text:
     DEFAULT_RENDERERS += (('.pt', chameleon_zpt.renderer_factory),)
 if chameleon_zpt:
@@ -251,6 +272,10 @@ class Configurator(object):
                 default_permission=default_permission,
                 session_factory=session_factory,
                 )
+        else:
+            recorder = getattr(registry, 'configuration_recorder', None)
+            if recorder is not None:
+                recorder.attach(self)
 
     def _set_settings(self, mapping):
         settings = Settings(mapping or {})
@@ -307,13 +332,9 @@ class Configurator(object):
         logger = self.registry.queryUtility(IDebugLogger)
         mapped_view = _map_view(view, self.registry, attr, renderer)
         owrapped_view = _owrap_view(mapped_view, viewname, wrapper_viewname)
-        secured_view = _secure_view(owrapped_view, permission,
-                                    authn_policy, authz_policy)
-        debug_view = _authdebug_view(secured_view, permission,
+        derived_view = _compile_view(owrapped_view, permission, predicates,
                                      authn_policy, authz_policy, settings,
-                                     logger)
-        predicated_view = _predicate_wrap(debug_view, predicates)
-        derived_view = _attr_wrap(predicated_view, accept, order, phash)
+                                     logger, accept, order, phash)
         return derived_view
 
     def _override(self, package, path, override_package, override_prefix,
@@ -410,15 +431,26 @@ class Configurator(object):
         security policies, renderers, a debug logger, a locale
         negotiator, and various other settings using the
         configurator's current registry, as per the descriptions in
-        the Configurator constructor."""
+        the Configurator constructor.  If the settings include
+        ``cache_sizes``, it also resizes the caches of
+        :mod:`pyramid.caches`, which are shared by all the
+        applications of the process.  If the
+        ``background_task_threads`` setting is a positive integer, it
+        also starts the pool of threads which call background tasks
+        (see :func:`pyramid.tasks.task_pool_from_settings`)."""
         self._fix_registry()
-        self._set_settings(settings)
+        settings = self._set_settings(settings)
+        if 'cache_sizes' in settings:
+            # the caches are shared by all the applications of the
+            # process: size them once, when the application is set up
+            configure_caches(settings)
         self._set_root_factory(root_factory)
         debug_logger = self.maybe_dotted(debug_logger)
         if debug_logger is None:
             debug_logger = make_stream_logger('pyramid.debug', sys.stderr)
         registry = self.registry
         registry.registerUtility(debug_logger, IDebugLogger)
+        task_pool_from_settings(registry)
         if authentication_policy or authorization_policy:
             self._set_security_policies(authentication_policy,
                                         authorization_policy)
@@ -485,6 +517,148 @@ class Configurator(object):
         """
         return self.manager.pop()
 
+    def begin_bulk(self):
+        """ Begin registering views in bulk.  Until the matching call to
+        :meth:`pyramid.configuration.Configurator.commit_bulk`, the views
+        added with :meth:`pyramid.configuration.Configurator.add_view`
+        (including those added by
+        :meth:`pyramid.configuration.Configurator.add_route` and by
+        other configurators of the same registry) are derived but not
+        registered.  ``commit_bulk`` then registers all the views added
+        for the same context, request type and view name at once: the
+        outcome is the same as if they had been registered one after
+        the other, but the multiview which dispatches to the views
+        added with different predicates is built once rather than being
+        registered again for each of its views, which makes registering
+        many views faster.  Routes are registered
+        immediately.
+
+        Bulk registrations may be nested; the views are registered when
+        the outermost one is committed.  Until then, the views added
+        are not found by view lookup."""
+        pending = getattr(self.registry, 'pending_views', None)
+        if pending is None:
+            pending = self.registry.pending_views = PendingViews()
+        pending.begin()
+
+    def commit_bulk(self):
+        """ End a bulk registration begun with
+        :meth:`pyramid.configuration.Configurator.begin_bulk`, registering
+        the views added since it began unless it is nested in another
+        one."""
+        self._end_bulk(True)
+
+    def _end_bulk(self, commit):
+        pending = getattr(self.registry, 'pending_views', None)
+        if pending is None:
+            raise ConfigurationError('No bulk registration has begun')
+        pending.end(commit)
+        if not pending.marks:
+            del self.registry.pending_views
+            if commit:
+                pending.register(self.registry)
+
+    def bulk(self):
+        """ Return a context manager for use with the ``with``
+        statement (Python 2.5 and better) which begins a bulk
+        registration (see
+        :meth:`pyramid.configuration.Configurator.begin_bulk`) on entry
+        and commits it on exit.  If the block raises an exception, the
+        views added in it are discarded (including those added in a
+        block nested in another one, whose views are kept).
+
+        .. code-block:: python
+
+           with config.bulk():
+               for name, view in views:
+                   config.add_view(view, name=name)
+        """
+        return BulkRegistration(self)
+
+    def snapshot(self, filename, configure):
+        """ Configure the application from the configuration snapshot
+        stored in the file named ``filename`` if it is up to date;
+        otherwise call ``configure``, a callable which accepts this
+        configurator as its only argument, to configure the application
+        and store a snapshot of the configuration it performed in
+        ``filename`` to speed up later startups.  Return ``True`` if the
+        configuration was read from the snapshot, ``False`` otherwise.
+
+        .. code-block:: python
+
+           def configure(config):
+               config.load_zcml('configure.zcml')
+               config.scan()
+
+           config = Configurator(settings=settings)
+           config.snapshot('/var/cache/myapp/config.snapshot', configure)
+           app = config.make_wsgi_app()
+
+        The snapshot records the calls made to the declarative methods
+        of the configurators of this configurator's registry while
+        ``configure`` runs (including those made by ZCML directives and
+        by :meth:`pyramid.configuration.Configurator.scan`):
+        ``add_view``, ``add_route``, ``add_handler``, ``add_renderer``,
+        ``add_static_view``, ``add_subscriber``, ``add_settings``,
+        ``add_translation_dirs``, ``override_resource`` and the
+        ``set_*`` methods, as well as the setting of the :term:`root
+        factory` and of the security policies (by
+        :meth:`pyramid.configuration.Configurator.setup_registry`, for
+        instance).  Reading it repeats those calls (registering
+        the views in bulk, see
+        :meth:`pyramid.configuration.Configurator.begin_bulk`), without
+        parsing ZCML or scanning packages.  Registrations made by other
+        means while ``configure`` runs, such as
+        ``config.registry.registerUtility`` calls or the ``utility``
+        and ``adapter`` ZCML directives, are not part of the snapshot.
+
+        The arguments of the calls are pickled: functions, classes and
+        interfaces are stored by :term:`dotted Python name`.  If an
+        argument cannot be pickled (a lambda or a function defined
+        within another function, for instance), no snapshot is written
+        and a warning is logged to the debug logger.
+
+        A snapshot is up to date when this configurator's settings are
+        those with which it was written and no source file of the
+        modules which define the objects passed to the recorded calls
+        or of the modules loaded from the packages configured, nor any
+        ZCML file of those packages, has been added, removed or modified
+        (according to its modification time and size) since.  Only the
+        settings whose values are strings, numbers, booleans or ``None``
+        are compared; a change to any other setting is not noticed.  The
+        snapshot file must not be writable by anyone who should not be
+        able to run code in the application.
+        """
+        settings = self.registry.settings
+        calls = read_snapshot(filename, settings)
+        if calls is not None:
+            configurators = {}
+            self.begin_bulk()
+            try:
+                for package_name, name, arg, kw in calls:
+                    config = configurators.get(package_name)
+                    if config is None:
+                        config = self.with_package(package_name)
+                        configurators[package_name] = config
+                    getattr(config, name)(*arg, **kw)
+            except:
+                self._end_bulk(False)
+                raise
+            self.commit_bulk()
+            return True
+        recorder = ConfigurationRecorder()
+        self.registry.configuration_recorder = recorder
+        recorder.attach(self)
+        try:
+            configure(self)
+        finally:
+            recorder.active = False
+            recorder.detach(self)
+            del self.registry.configuration_recorder
+        logger = self.registry.queryUtility(IDebugLogger)
+        recorder.save(filename, settings, logger)
+        return False
+
     def derive_view(self, view, attr=None, renderer=None):
         """
 
@@ -628,13 +802,25 @@ class Configurator(object):
            """
         return self.registry.settings
 
-    def make_wsgi_app(self):
+    def make_wsgi_app(self, specialize=False):
         """ Returns a :app:`Pyramid` WSGI application representing
         the current configuration state and sends a
         :class:`pyramid.events.ApplicationCreated`
-        event to all listeners."""
+        event to all listeners.
+
+        If ``specialize`` is true, the application is a
+        :class:`pyramid.router.SpecializedRouter`, which handles
+        requests using a function composed (after the
+        ``ApplicationCreated`` event is sent) of the phases of request
+        processing which the configuration actually uses.  The
+        application does not notice configuration changes made after
+        it has been created when ``specialize`` is true."""
         from pyramid.router import Router # avoid circdep
-        app = Router(self.registry)
+        from pyramid.router import SpecializedRouter
+        if specialize:
+            app = SpecializedRouter(self.registry)
+        else:
+            app = Router(self.registry)
         # We push the registry on to the stack here in case any code
         # that depends on the registry threadlocal APIs used in
         # listeners subscribed to the IApplicationCreated event.
@@ -643,6 +829,8 @@ class Configurator(object):
             self.registry.notify(ApplicationCreated(app))
         finally:
             self.manager.pop()
+        if specialize:
+            app.specialize()
         return app
 
     def load_zcml(self, spec='configure.zcml', lock=threading.Lock()):
@@ -1092,7 +1280,7 @@ class Configurator(object):
         if renderer is not None and not isinstance(renderer, dict):
             renderer = {'name':renderer, 'package':self.package}
 
-        # NO_PERMISSION_REQUIRED handled by _secure_view
+        # NO_PERMISSION_REQUIRED handled by _compile_view
         derived_view = self._derive_view(view, permission, predicates, attr,
                                          renderer, wrapper, name, accept,
                                          order, phash)
@@ -1106,101 +1294,15 @@ class Configurator(object):
         if not IInterface.providedBy(r_context):
             r_context = implementedBy(r_context)
 
-        registered = self.registry.adapters.registered
-
-        # A multiviews is a set of views which are registered for
-        # exactly the same context type/request type/name triad.  Each
-        # consituent view in a multiview differs only by the
-        # predicates which it possesses.
-
-        # To find a previously registered view for a context
-        # type/request type/name triad, we need to use the
-        # ``registered`` method of the adapter registry rather than
-        # ``lookup``.  ``registered`` ignores interface inheritance
-        # for the required and provided arguments, returning only a
-        # view registered previously with the *exact* triad we pass
-        # in.
-
-        # We need to do this three times, because we use three
-        # different interfaces as the ``provided`` interface while
-        # doing registrations, and ``registered`` performs exact
-        # matches on all the arguments it receives.
-
-        old_view = None
-
-        for view_type in (IView, ISecuredView, IMultiView):
-            old_view = registered((IViewClassifier, request_iface, r_context),
-                                  view_type, name)
-            if old_view is not None:
-                break
-
-        isexc = isexception(context)
-
-        def regclosure():
-            if hasattr(derived_view, '__call_permissive__'):
-                view_iface = ISecuredView
-            else:
-                view_iface = IView
-            self.registry.registerAdapter(
-                derived_view,
-                (IViewClassifier, request_iface, context),
-                view_iface, name, info=_info)
-            if isexc:
-                self.registry.registerAdapter(
-                    derived_view,
-                    (IExceptionViewClassifier, request_iface, context),
-                    view_iface, name, info=_info)
-
-        is_multiview = IMultiView.providedBy(old_view)
-        old_phash = getattr(old_view, '__phash__', DEFAULT_PHASH)
-
-        if old_view is None:
-            # - No component was yet registered for any of our I*View
-            #   interfaces exactly; this is the first view for this
-            #   triad.
-            regclosure()
-
-        elif (not is_multiview) and (old_phash == phash):
-            # - A single view component was previously registered with
-            #   the same predicate hash as this view; this registration
-            #   is therefore an override.
-            regclosure()
-
-        else:
-            # - A view or multiview was already registered for this
-            #   triad, and the new view is not an override.
-
-            # XXX we could try to be more efficient here and register
-            # a non-secured view for a multiview if none of the
-            # multiview's consituent views have a permission
-            # associated with them, but this code is getting pretty
-            # rough already
-            if is_multiview:
-                multiview = old_view
-            else:
-                multiview = MultiView(name)
-                old_accept = getattr(old_view, '__accept__', None)
-                old_order = getattr(old_view, '__order__', MAX_ORDER)
-                multiview.add(old_view, old_order, old_accept, old_phash)
-            multiview.add(derived_view, order, accept, phash)
-            for view_type in (IView, ISecuredView):
-                # unregister any existing views
-                self.registry.adapters.unregister(
-                    (IViewClassifier, request_iface, r_context),
-                    view_type, name=name)
-                if isexc:
-                    self.registry.adapters.unregister(
-                        (IExceptionViewClassifier, request_iface, r_context),
-                        view_type, name=name)
-            self.registry.registerAdapter(
-                multiview,
-                (IViewClassifier, request_iface, context),
-                IMultiView, name=name, info=_info)
-            if isexc:
-                self.registry.registerAdapter(
-                    multiview,
-                    (IExceptionViewClassifier, request_iface, context),
-                    IMultiView, name=name, info=_info)
+        entry = (context, derived_view, order, accept, phash, _info)
+        pending = getattr(self.registry, 'pending_views', None)
+        if pending is not None:
+            # bulk registration: the views registered for the triad are
+            # registered together by ``commit_bulk``
+            pending.add((request_iface, r_context, name), entry)
+            return
+        _register_views(self.registry, request_iface, r_context, name,
+                        [entry])
 
     def add_route(self,
                   name,
@@ -1550,10 +1652,28 @@ class Configurator(object):
 
     def get_routes_mapper(self):
         """ Return the :term:`routes mapper` object associated with
-        this configurator's :term:`registry`."""
+        this configurator's :term:`registry`.
+
+        If no routes mapper has yet been registered, one is created.  The
+        kind of mapper created depends on the ``route_dispatch`` setting:
+        ``linear`` (the default) creates a mapper which tries each route
+        in turn, ``indexed`` creates a mapper which only tries the routes
+        whose pattern prefix matches the request path (see
+        :ref:`route_dispatch_setting`).  The ``route_match_cache_size``
+        setting, if it is a positive integer, is the size of the cache
+        of route matching results kept by the mapper (see
+        :ref:`route_match_cache_size_setting`)."""
         mapper = self.registry.queryUtility(IRoutesMapper)
         if mapper is None:
-            mapper = RoutesMapper()
+            settings = self.registry.settings or {}
+            dispatch = settings.get('route_dispatch', 'linear')
+            factory = ROUTE_DISPATCHERS.get(dispatch)
+            if factory is None:
+                raise ConfigurationError(
+                    'Unknown route_dispatch setting %r (expected one of %s)'
+                    % (dispatch, ', '.join(sorted(ROUTE_DISPATCHERS))))
+            cache_size = int(settings.get('route_match_cache_size', 0))
+            mapper = factory(cache_size=cache_size)
             self.registry.registerUtility(mapper, IRoutesMapper)
         return mapper
 
@@ -1584,13 +1704,40 @@ class Configurator(object):
         :app:`Pyramid` itself.  Or pass a sequence of Venusian scan
         categories as necessary (e.g. ``('pyramid', 'myframework')``) to
         limit the decorators called to the set of categories required.
+
+        When the ``scan_cache`` setting names a file, the scan remembers
+        in it which modules define no decorated object; later scans do
+        not import those modules until their source file changes.  Only
+        use it if importing such modules has no side effect the
+        application relies upon.  When the ``debug_scan`` setting is
+        true, the time spent importing and scanning each module is
+        logged to the debug logger, slowest module first.
         """
         package = self.maybe_dotted(package)
         if package is None: # pragma: no cover
             package = caller_package()
 
         scanner = self.venusian.Scanner(config=self)
-        scanner.scan(package, categories=categories)
+        settings = self.registry.settings or {}
+        cache_file = settings.get('scan_cache')
+        debug = settings.get('debug_scan')
+        if not (cache_file or debug):
+            scanner.scan(package, categories=categories)
+            return
+
+        cache = None
+        if cache_file:
+            cache = ScanCache(cache_file)
+        timings = []
+        scan_package(scanner, package, categories, cache, timings)
+        logger = self.registry.queryUtility(IDebugLogger)
+        if cache is not None:
+            cache.save(logger)
+        if debug and logger is not None:
+            timings.sort(key=lambda timing: -timing[1])
+            for name, seconds in timings:
+                logger.debug('debug_scan: imported and scanned module %s '
+                             'in %.1f ms' % (name, seconds * 1000))
 
     def add_renderer(self, name, factory, _info=u''):
         """
@@ -1761,6 +1908,19 @@ class Configurator(object):
         factory = self.maybe_dotted(factory)
         self.registry.registerUtility(factory, IRequestFactory)
 
+    def set_request_timer(self, timer):
+        """ The object passed as ``timer`` should be an object (or a
+        :term:`dotted Python name` which refers to an object) which
+        implements :class:`pyramid.interfaces.IRequestTimer`.  The
+        :app:`Pyramid` router will call it with the times at which
+        the phases of processing each request completed.
+        :class:`pyramid.timing.RequestTimingAggregator` is such an
+        object.  By default, no request timer is used and the router
+        does not time requests.
+        """
+        timer = self.maybe_dotted(timer)
+        self.registry.registerUtility(timer, IRequestTimer)
+
     def set_renderer_globals_factory(self, factory):
         """ The object passed as ``factory`` should be an callable (or
         a :term:`dotted Python name` which refers to an callable) that
@@ -2173,17 +2333,23 @@ def _make_predicates(xhr=None, request_method=None, path_info=None,
     h = md5()
 
     if xhr:
-        def xhr_predicate(context, request):
+        def xhr_value(request):
             return request.is_xhr
         weights.append(1 << 1)
-        predicates.append(xhr_predicate)
+        # multiviews index their views by the values of discriminators
+        predicates.append(_intern_predicate('xhr', xhr_value, bool,
+                                            ('xhr', True)))
         h.update('xhr:%r' % bool(xhr))
 
     if request_method is not None:
-        def request_method_predicate(context, request):
-            return request.method == request_method
+        def request_method_value(request):
+            return request.method
+        def request_method_test(method):
+            return method == request_method
         weights.append(1 << 2)
-        predicates.append(request_method_predicate)
+        predicates.append(_intern_predicate(
+            'request_method:%r' % request_method, request_method_value,
+            request_method_test, ('request_method', request_method)))
         h.update('request_method:%r' % request_method)
 
     if path_info is not None:
@@ -2191,22 +2357,29 @@ def _make_predicates(xhr=None, request_method=None, path_info=None,
             path_info_val = re.compile(path_info)
         except re.error, why:
             raise ConfigurationError(why[0])
-        def path_info_predicate(context, request):
-            return path_info_val.match(request.path_info) is not None
+        def path_info_value(request):
+            return request.path_info
+        def path_info_test(value):
+            return path_info_val.match(value) is not None
         weights.append(1 << 3)
-        predicates.append(path_info_predicate)
+        predicates.append(_intern_predicate('path_info:%r' % path_info,
+                                            path_info_value, path_info_test))
         h.update('path_info:%r' % path_info)
 
     if request_param is not None:
         request_param_val = None
         if '=' in request_param:
             request_param, request_param_val = request_param.split('=', 1)
-        def request_param_predicate(context, request):
+        def request_param_value(request):
+            return request.params.get(request_param)
+        def request_param_test(value):
             if request_param_val is None:
-                return request_param in request.params
-            return request.params.get(request_param) == request_param_val
+                return value is not None
+            return value == request_param_val
         weights.append(1 << 4)
-        predicates.append(request_param_predicate)
+        predicates.append(_intern_predicate(
+            'request_param:%r=%r' % (request_param, request_param_val),
+            request_param_value, request_param_test))
         h.update('request_param:%r=%r' % (request_param, request_param_val))
 
     if header is not None:
@@ -2218,27 +2391,40 @@ def _make_predicates(xhr=None, request_method=None, path_info=None,
                 header_val = re.compile(header_val)
             except re.error, why:
                 raise ConfigurationError(why[0])
-        def header_predicate(context, request):
-            if header_val is None:
-                return header_name in request.headers
-            val = request.headers.get(header_name)
+        def header_value(request):
+            return request.headers.get(header_name)
+        def header_test(val):
             if val is None:
                 return False
+            if header_val is None:
+                return True
             return header_val.match(val) is not None
         weights.append(1 << 5)
-        predicates.append(header_predicate)
+        # the header value is a compiled pattern; the original header
+        # argument identifies the predicate
+        predicates.append(_intern_predicate('header:%r' % header,
+                                            header_value, header_test))
         h.update('header:%r=%r' % (header_name, header_val))
 
     if accept is not None:
         def accept_predicate(context, request):
-            return accept in request.accept
+            header = request.environ.get('HTTP_ACCEPT')
+            if header is None:
+                return accept in request.accept
+            key = (header, accept)
+            result = _accept_cache.get(key)
+            if result is None:
+                result = accept in request.accept
+                _accept_cache.put(key, result)
+            return result
         weights.append(1 << 6)
+        # memoized per Accept header by _accept_cache
         predicates.append(accept_predicate)
         h.update('accept:%r' % accept)
 
     if containment is not None:
         def containment_predicate(context, request):
-            return find_interface(context, containment) is not None
+            return find_interface(context, containment, request) is not None
         weights.append(1 << 7)
         predicates.append(containment_predicate)
         h.update('containment:%r' % hash(containment))
@@ -2255,14 +2441,15 @@ def _make_predicates(xhr=None, request_method=None, path_info=None,
         # adds 'traverse' to the matchdict if it's specified in the
         # routing args.  This causes the ModelGraphTraverser to use
         # the resolved traverse pattern as the traversal path.
-        from pyramid.urldispatch import _compile_route
-        _, tgenerate = _compile_route(traverse)
+        # the traversal path tuple is computed from the matchdict
+        # without generating and parsing a path when possible
+        from pyramid.urldispatch import _compile_traverse
+        ttraverse = _compile_traverse(traverse)
         def traverse_predicate(context, request):
             if 'traverse' in context:
                 return True
             m = context['match']
-            tvalue = tgenerate(m)
-            m['traverse'] = traversal_path(tvalue)
+            m['traverse'] = ttraverse(m)
             return True
         # This isn't actually a predicate, it's just a infodict
         # modifier that injects ``traverse`` into the matchdict.  As a
@@ -2290,6 +2477,199 @@ def _make_predicates(xhr=None, request_method=None, path_info=None,
     phash = h.hexdigest()
     return order, predicates, phash
 
+class PendingViews(object):
+    """ The views added during a bulk registration, grouped by (request
+    type, context, view name) triad in the order in which the triads
+    were first used """
+    def __init__(self):
+        self.marks = []
+        self.added = []
+        self.triads = []
+        self.entries = {}
+
+    def begin(self):
+        # remember where the views of the block begun start
+        self.marks.append(len(self.added))
+
+    def end(self, commit):
+        mark = self.marks.pop()
+        if not commit:
+            # discard the views added since the block began, most
+            # recent first
+            while len(self.added) > mark:
+                triad = self.added.pop()
+                entries = self.entries[triad]
+                entries.pop()
+                if not entries:
+                    del self.entries[triad]
+                    self.triads.pop()
+
+    def add(self, triad, entry):
+        entries = self.entries.get(triad)
+        if entries is None:
+            entries = self.entries[triad] = []
+            self.triads.append(triad)
+        entries.append(entry)
+        self.added.append(triad)
+
+    def register(self, registry):
+        for triad in self.triads:
+            request_iface, r_context, name = triad
+            _register_views(registry, request_iface, r_context, name,
+                            self.entries[triad])
+
+class BulkRegistration(object):
+    """ The context manager returned by
+    :meth:`pyramid.configuration.Configurator.bulk` """
+    def __init__(self, config):
+        self.config = config
+
+    def __enter__(self):
+        self.config.begin_bulk()
+        return self.config
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.config._end_bulk(exc_type is None)
+        return False
+
+def _register_views(registry, request_iface, r_context, name, entries):
+    # Register the views of ``entries``, a sequence of (context, derived
+    # view, order, accept, phash, info) tuples, for the (request_iface,
+    # r_context, name) triad as if they were registered one after the
+    # other, but write each registration of the triad at most once.
+    registered = registry.adapters.registered
+
+    # A multiviews is a set of views which are registered for
+    # exactly the same context type/request type/name triad.  Each
+    # consituent view in a multiview differs only by the
+    # predicates which it possesses.
+
+    # To find a previously registered view for a context
+    # type/request type/name triad, we need to use the
+    # ``registered`` method of the adapter registry rather than
+    # ``lookup``.  ``registered`` ignores interface inheritance
+    # for the required and provided arguments, returning only a
+    # view registered previously with the *exact* triad we pass
+    # in.
+
+    # We need to do this three times, because we use three
+    # different interfaces as the ``provided`` interface while
+    # doing registrations, and ``registered`` performs exact
+    # matches on all the arguments it receives.
+
+    # view type -> registered view; the registrations of the triad are
+    # changed in this dictionary, then those which were changed
+    # (``dirty``) are written to the registry
+    current = {}
+    for view_type in (IView, ISecuredView, IMultiView):
+        current[view_type] = registered(
+            (IViewClassifier, request_iface, r_context), view_type, name)
+    dirty = {}
+
+    for context, derived_view, order, accept, phash, info in entries:
+        old_view = None
+
+        for view_type in (IView, ISecuredView, IMultiView):
+            old_view = current[view_type]
+            if old_view is not None:
+                break
+
+        is_multiview = IMultiView.providedBy(old_view)
+        old_phash = getattr(old_view, '__phash__', DEFAULT_PHASH)
+
+        if old_view is None or ((not is_multiview) and
+                                (old_phash == phash)):
+            # - No component was yet registered for any of our I*View
+            #   interfaces exactly; this is the first view for this
+            #   triad.
+            # - Or a single view component was previously registered
+            #   with the same predicate hash as this view; this
+            #   registration is therefore an override.
+            if hasattr(derived_view, '__call_permissive__'):
+                view_iface = ISecuredView
+            else:
+                view_iface = IView
+            current[view_iface] = derived_view
+            dirty[view_iface] = (context, info)
+
+        else:
+            # - A view or multiview was already registered for this
+            #   triad, and the new view is not an override.
+
+            # XXX we could try to be more efficient here and register
+            # a non-secured view for a multiview if none of the
+            # multiview's consituent views have a permission
+            # associated with them, but this code is getting pretty
+            # rough already
+            if is_multiview:
+                multiview = old_view
+            else:
+                multiview = MultiView(name)
+                old_accept = getattr(old_view, '__accept__', None)
+                old_order = getattr(old_view, '__order__', MAX_ORDER)
+                multiview.add(old_view, old_order, old_accept, old_phash)
+            multiview.add(derived_view, order, accept, phash)
+            for view_type in (IView, ISecuredView):
+                # unregister any existing views
+                current[view_type] = None
+                dirty[view_type] = None
+            current[IMultiView] = multiview
+            dirty[IMultiView] = (context, info)
+
+    isexc = isexception(entries[0][0])
+    for view_type in (IView, ISecuredView, IMultiView):
+        if view_type not in dirty:
+            continue
+        if dirty[view_type] is None:
+            registry.adapters.unregister(
+                (IViewClassifier, request_iface, r_context),
+                view_type, name=name)
+            if isexc:
+                registry.adapters.unregister(
+                    (IExceptionViewClassifier, request_iface, r_context),
+                    view_type, name=name)
+        else:
+            context, info = dirty[view_type]
+            registry.registerAdapter(
+                current[view_type],
+                (IViewClassifier, request_iface, context),
+                view_type, name, info=info)
+            if isexc:
+                registry.registerAdapter(
+                    current[view_type],
+                    (IExceptionViewClassifier, request_iface, context),
+                    view_type, name, info=info)
+
+def _intern_predicate(key, value, test, discriminator=None):
+    """ Return the predicate interned as ``key``, the identity of a
+    predicate whose result is ``test(value(request))``.  If there is
+    none, such a predicate is interned.  Its results are memoized on
+    the request by ``key`` and by the value it tests, so the views and
+    routes which share it do not test the same value again, and a
+    change of the request (for instance of its ``method``) is not
+    hidden by an earlier result.  ``discriminator`` is the
+    ``__discriminator__`` of the predicate, if any."""
+    interned = _interned_predicates.get(key)
+    if interned is None:
+        def memoized_predicate(context, request):
+            val = value(request)
+            attrs = request.__dict__
+            results = attrs.get('_predicate_results')
+            if results is None:
+                results = attrs['_predicate_results'] = {}
+            try:
+                return results[(key, val)]
+            except KeyError:
+                result = results[(key, val)] = test(val)
+                return result
+            except TypeError:
+                # an unhashable value
+                return test(val)
+        if discriminator is not None:
+            memoized_predicate.__discriminator__ = discriminator
+        interned = _interned_predicates[key] = memoized_predicate
+    return interned
+
 class MultiView(object):
     implements(IMultiView)
 
@@ -2298,8 +2678,16 @@ class MultiView(object):
         self.media_views = {}
         self.views = []
         self.accepts = []
+        # accept -> [views, methods, {(method, xhr):views}]; see
+        # _dispatch_views
+        self.dispatch = {}
+        # incremented by add to invalidate the negotiation cache entries
+        # of the multiview
+        self.generation = 0
 
     def add(self, view, order, accept=None, phash=None):
+        self.dispatch = {}
+        self.generation += 1
         if phash is not None:
             for i, (s, v, h) in enumerate(list(self.views)):
                 if phash == h:
@@ -2318,19 +2706,78 @@ class MultiView(object):
             self.accepts = list(accepts) # dedupe
 
     def get_views(self, request):
+        method = getattr(request, 'method', None)
+        xhr = bool(getattr(request, 'is_xhr', False))
         if self.accepts and hasattr(request, 'accept'):
-            accepts = self.accepts[:]
             views = []
-            while accepts:
-                match = request.accept.best_match(accepts)
-                if match is None:
-                    break
-                subset = self.media_views[match]
-                views.extend(subset)
-                accepts.remove(match)
-            views.extend(self.views)
+            for match in self._negotiate(request):
+                views.extend(self._dispatch_views(match, method, xhr))
+            views.extend(self._dispatch_views(None, method, xhr))
+            return views
+        return self._dispatch_views(None, method, xhr)
+
+    def _negotiate(self, request):
+        """ Return the accept values of the views added with one, in the
+        order of preference of ``request``, leaving out those it does
+        not accept.  The result is cached by Accept header until a view
+        is added."""
+        header = request.environ.get('HTTP_ACCEPT')
+        if header is not None:
+            key = (self, self.generation, header)
+            matches = _negotiation_cache.get(key)
+            if matches is not None:
+                return matches
+        accepts = self.accepts[:]
+        matches = []
+        while accepts:
+            match = request.accept.best_match(accepts)
+            if match is None:
+                break
+            matches.append(match)
+            accepts.remove(match)
+        if header is not None:
+            _negotiation_cache.put(key, matches)
+        return matches
+
+    def _dispatch_views(self, accept, method, xhr):
+        """ Return the views added for ``accept`` (or without an accept
+        value if it is ``None``), in order, leaving out those whose
+        ``request_method`` or ``xhr`` predicate cannot match a request
+        with the ``method`` and ``xhr`` given.  The views are indexed by
+        those values the first time they are needed after a view is
+        added."""
+        index = self.dispatch.get(accept)
+        if index is None:
+            if accept is None:
+                views = self.views
+            else:
+                views = self.media_views[accept]
+            discriminated = False
+            methods = set()
+            for entry in views:
+                discriminators = getattr(entry[1], '__discriminators__', {})
+                if discriminators:
+                    discriminated = True
+                    if 'request_method' in discriminators:
+                        methods.add(discriminators['request_method'])
+            table = None
+            if discriminated:
+                table = {}
+            index = self.dispatch[accept] = [views, methods, table]
+        views, methods, table = index
+        if table is None:
             return views
-        return self.views
+        if method not in methods:
+            # no view requires this method: index all such methods
+            # under one key
+            method = None
+        key = (method, xhr)
+        result = table.get(key)
+        if result is None:
+            result = table[key] = [
+                entry for entry in views
+                if _may_match(entry[1], method, xhr) ]
+        return result
 
     def match(self, context, request):
         for order, view, phash in self.get_views(request):
@@ -2359,6 +2806,18 @@ class MultiView(object):
                 continue
         raise PredicateMismatch(self.name)
 
+def _may_match(view, method, xhr):
+    """ Return ``False`` if the ``request_method`` or ``xhr`` predicate
+    of ``view`` (a :class:`MultiView` constituent) cannot match a request
+    with the ``method`` and ``xhr`` given """
+    discriminators = getattr(view, '__discriminators__', None)
+    if discriminators:
+        if discriminators.get('xhr') and not xhr:
+            return False
+        if discriminators.get('request_method', method) != method:
+            return False
+    return True
+
 def decorate_view(wrapped_view, original_view):
     if wrapped_view is original_view:
         return False
@@ -2380,6 +2839,10 @@ def decorate_view(wrapped_view, original_view):
         wrapped_view.__predicated__ = original_view.__predicated__
     except AttributeError:
         pass
+    try:
+        wrapped_view.__discriminators__ = original_view.__discriminators__
+    except AttributeError:
+        pass
     try:
         wrapped_view.__accept__ = original_view.__accept__
     except AttributeError:
@@ -2576,63 +3039,54 @@ def _owrap_view(view, viewname, wrapper_viewname):
     decorate_view(_owrapped_view, view)
     return _owrapped_view
 
-def _predicate_wrap(view, predicates):
-    if not predicates:
-        return view
-    def predicate_wrapper(context, request):
-        if all((predicate(context, request) for predicate in predicates)):
-            return view(context, request)
-        raise PredicateMismatch('predicate mismatch for view %s' % view)
-    def checker(context, request):
-        return all((predicate(context, request) for predicate in
-                    predicates))
-    predicate_wrapper.__predicated__ = checker
-    decorate_view(predicate_wrapper, view)
-    return predicate_wrapper
-
-def _secure_view(view, permission, authn_policy, authz_policy):
+def _compile_view(view, permission=None, predicates=(), authn_policy=None,
+                  authz_policy=None, settings=None, logger=None, accept=None,
+                  order=MAX_ORDER, phash=DEFAULT_PHASH):
+    # Return a single callable which evaluates the predicates of
+    # ``view``, logs the debug_authorization message, checks the
+    # permission and calls ``view``, specialized to perform only the
+    # stages which apply; ``view`` itself is returned if none of them
+    # do.  The callable has the attributes of the equivalent stack of
+    # wrappers: __predicated__ (and __discriminators__) if there are
+    # predicates, __call_permissive__ and __permitted__ if there is a
+    # permission to check and __accept__, __order__ and __phash__
+    # unless they are the defaults.
+    debug_permission = permission # not normalized, for b/c
     if permission == '__no_permission_required__':
         # allow views registered within configurations that have a
         # default permission to explicitly override the default
         # permission, replacing it with no permission at all
         permission = None
+    predicates = tuple(predicates)
+    secured = bool(authn_policy and authz_policy and (permission is not None))
+    authdebug = bool(settings and settings.get('debug_authorization', False))
+    attributed = not ((accept is None) and (order == MAX_ORDER) and
+                      (phash == DEFAULT_PHASH))
+    if not (predicates or secured or authdebug or attributed):
+        return view
 
-    wrapped_view = view
-    if authn_policy and authz_policy and (permission is not None):
-        def _secured_view(context, request):
-            principals = authn_policy.effective_principals(request)
-            if authz_policy.permits(context, principals, permission):
-                return view(context, request)
-            msg = getattr(request, 'authdebug_message',
-                          'Unauthorized: %s failed permission check' % view)
-            raise Forbidden(msg)
-        _secured_view.__call_permissive__ = view
-        def _permitted(context, request):
-            principals = authn_policy.effective_principals(request)
-            return authz_policy.permits(context, principals, permission)
-        _secured_view.__permitted__ = _permitted
-        wrapped_view = _secured_view
-        decorate_view(wrapped_view, view)
-
-    return wrapped_view
-
-def _authdebug_view(view, permission, authn_policy, authz_policy, settings,
-                    logger):
-    wrapped_view = view
-    if settings and settings.get('debug_authorization', False):
-        def _authdebug_view(context, request):
-            view_name = getattr(request, 'view_name', None)
-
+    def forbidden(request):
+        msg = getattr(request, 'authdebug_message',
+                      'Unauthorized: %s failed permission check' % view)
+        return Forbidden(msg)
+
+    if authdebug:
+        def derived_view(context, request):
+            for predicate in predicates:
+                if not predicate(context, request):
+                    raise PredicateMismatch(
+                        'predicate mismatch for view %s' % view)
+            permitted = None
             if authn_policy and authz_policy:
-                if permission is None:
+                if debug_permission is None:
                     msg = 'Allowed (no permission registered)'
                 else:
                     principals = authn_policy.effective_principals(request)
-                    msg = str(authz_policy.permits(context, principals,
-                                                   permission))
+                    permitted = authz_policy.permits(context, principals,
+                                                     debug_permission)
+                    msg = str(permitted)
             else:
                 msg = 'Allowed (no authorization policy in use)'
-
             view_name = getattr(request, 'view_name', None)
             url = getattr(request, 'url', None)
             msg = ('debug_authorization of url %s (view name %r against '
@@ -2640,26 +3094,64 @@ def _authdebug_view(view, permission, authn_policy, authz_policy, settings,
             logger and logger.debug(msg)
             if request is not None:
                 request.authdebug_message = msg
+            if secured:
+                # the permission is the one checked above
+                if not permitted:
+                    raise forbidden(request)
+            return view(context, request)
+    elif predicates and secured:
+        def derived_view(context, request):
+            for predicate in predicates:
+                if not predicate(context, request):
+                    raise PredicateMismatch(
+                        'predicate mismatch for view %s' % view)
+            principals = authn_policy.effective_principals(request)
+            if authz_policy.permits(context, principals, permission):
+                return view(context, request)
+            raise forbidden(request)
+    elif predicates:
+        def derived_view(context, request):
+            for predicate in predicates:
+                if not predicate(context, request):
+                    raise PredicateMismatch(
+                        'predicate mismatch for view %s' % view)
+            return view(context, request)
+    elif secured:
+        def derived_view(context, request):
+            principals = authn_policy.effective_principals(request)
+            if authz_policy.permits(context, principals, permission):
+                return view(context, request)
+            raise forbidden(request)
+    else:
+        def derived_view(context, request):
             return view(context, request)
 
-        wrapped_view = _authdebug_view
-        decorate_view(wrapped_view, view)
-
-    return wrapped_view
-
-def _attr_wrap(view, accept, order, phash):
-    # this is a little silly but we don't want to decorate the original
-    # function with attributes that indicate accept, order, and phash,
-    # so we use a wrapper
-    if (accept is None) and (order == MAX_ORDER) and (phash == DEFAULT_PHASH):
-        return view # defaults
-    def attr_view(context, request):
-        return view(context, request)
-    attr_view.__accept__ = accept
-    attr_view.__order__ = order
-    attr_view.__phash__ = phash
-    decorate_view(attr_view, view)
-    return attr_view
+    if predicates:
+        def checker(context, request):
+            return all((predicate(context, request) for predicate in
+                        predicates))
+        derived_view.__predicated__ = checker
+        discriminators = {}
+        for predicate in predicates:
+            discriminator = getattr(predicate, '__discriminator__', None)
+            if discriminator is not None:
+                discriminators[discriminator[0]] = discriminator[1]
+        if discriminators:
+            derived_view.__discriminators__ = discriminators
+    if secured:
+        derived_view.__call_permissive__ = view
+        def _permitted(context, request):
+            principals = authn_policy.effective_principals(request)
+            return authz_policy.permits(context, principals, permission)
+        derived_view.__permitted__ = _permitted
+    if attributed:
+        derived_view.__accept__ = accept
+        derived_view.__order__ = order
+        derived_view.__phash__ = phash
+    # attributes of the view take precedence, as they would if the
+    # stages were separate wrappers
+    decorate_view(derived_view, view)
+    return derived_view
 
 def isexception(o):
     if IInterface.providedBy(o):
@@ -188,6 +188,34 @@ class IRequestFactory(Interface):
         """ Return an empty request object (see
         :meth:`pyramid.request.Request.blank`)"""
 
+class IRequestTimer(Interface):
+    """ A utility which is told how long each phase of the processing
+    of a request by the router took """
+    def __call__(route_name, view_name, timings):
+        """ Called by the router once per request, after the request
+        has been processed (successfully or not).  ``route_name`` is
+        the name of the route the request matched (or ``None``) and
+        ``view_name`` is its :term:`view name` (or ``None`` if no view
+        name was found).  ``timings`` is a sequence of ``(phase,
+        timestamp)`` two-tuples in the order the phases completed; the
+        first is ``('start', timestamp)``.  Possible phase names are
+        ``new_request``, ``route_match``, ``root_factory``,
+        ``traversal``, ``view_lookup``, ``view``, ``exception_view``,
+        ``response_callbacks`` and ``finished_callbacks``; a phase is
+        left out if it was not performed.  Timestamps are values
+        returned by :func:`time.time`."""
+
+class ITaskPool(Interface):
+    """ A utility which calls the background tasks of requests (see
+    :meth:`pyramid.request.Request.add_background_task`) """
+    def submit(request):
+        """ Arrange for the background tasks of ``request`` to be
+        called.  May block while the pool is busy."""
+
+    def shutdown():
+        """ Wait for all submitted tasks to be called and stop the
+        pool."""
+
 class IViewClassifier(Interface):
     """ *Internal only* marker interface for views."""
 
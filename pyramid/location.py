@@ -64,3 +64,48 @@ def lineage(model):
         except AttributeError:
             model = None
 
+def request_lineage(model, request):
+    """
+    Return a tuple of the :term:`lineage` of ``model`` (see
+    :func:`pyramid.location.lineage`).  The tuple is memoized on
+    ``request`` along with the tuples of the lineages of the parents of
+    ``model``.  A memoized lineage is computed again if ``model`` has
+    been given another ``__parent__`` since; code which moves an
+    ancestor of ``model`` during the request must call
+    :func:`pyramid.location.forget_request_lineages`.
+    """
+    return _lineage_entry(model, request)[1]
+
+def forget_request_lineages(request):
+    """
+    Discard the lineages memoized on ``request`` by
+    :func:`pyramid.location.request_lineage` and
+    :func:`pyramid.traversal.find_interface`.
+    """
+    request.__dict__.pop('_lineages', None)
+
+def _lineage_entry(model, request):
+    # the memo maps the id of a model to a tuple of the model, its
+    # lineage and a dictionary mapping classes and interfaces to the
+    # result of find_interface for the model
+    attrs = request.__dict__
+    memo = attrs.get('_lineages')
+    if memo is None:
+        memo = attrs['_lineages'] = {}
+    entry = memo.get(id(model))
+    if entry is None or entry[0] is not model or not _current(entry[1]):
+        locations = tuple(lineage(model))
+        entry = memo[id(model)] = (model, locations, {})
+        for i in range(1, len(locations)):
+            location = locations[i]
+            if not id(location) in memo:
+                memo[id(location)] = (location, locations[i:], {})
+    return entry
+
+def _current(locations):
+    # whether the model of a memoized lineage still has the parent it
+    # had when the lineage was computed; its ancestors are not checked
+    parent = getattr(locations[0], '__parent__', None)
+    if len(locations) > 1:
+        return parent is locations[1]
+    return parent is None
@@ -23,13 +23,14 @@ class Request(WebobRequest):
     view callable (and to other subsystems) as the ``request``
     argument.
 
-    The documentation below (save for the ``add_response_callback`` and
-    ''add_finished_callback`` methods, which are defined in this subclass
-    itself, and the attributes ``context``, ``registry``, ``root``,
-    ``subpath``, ``traversed``, ``view_name``, ``virtual_root`` , and
-    ``virtual_root_path``, each of which is added to the request by the
-    :term:`router` at request ingress time) are autogenerated from the WebOb
-    source code used when this documentation was generated.
+    The documentation below (save for the ``add_response_callback``,
+    ``add_finished_callback`` and ``add_background_task`` methods,
+    which are defined in this subclass itself, and the attributes
+    ``context``, ``registry``, ``root``, ``subpath``, ``traversed``,
+    ``view_name``, ``virtual_root`` , and ``virtual_root_path``, each
+    of which is added to the request by the :term:`router` at request
+    ingress time) are autogenerated from the WebOb source code used
+    when this documentation was generated.
 
     Due to technical constraints, we can't yet display the WebOb
     version number from which this documentation is autogenerated, but
@@ -40,6 +41,7 @@ class Request(WebobRequest):
     implements(IRequest)
     response_callbacks = ()
     finished_callbacks = ()
+    background_tasks = ()
     exception = None
     matchdict = None
     matched_route = None
@@ -154,6 +156,42 @@ class Request(WebobRequest):
             callback = callbacks.pop(0)
             callback(self)
 
+    def add_background_task(self, task):
+        """
+        Add a task to the set of tasks to be called after the response
+        to this request has been sent to the client.
+
+        ``task`` is a callable which accepts a single positional
+        parameter: ``request``.  Use background tasks rather than
+        finished callbacks for slow work whose result the client does
+        not need to wait for (audit logging, cache warming, analytics
+        writes and the like): finished callbacks are called before the
+        :term:`router` returns the response to the WSGI server, while
+        background tasks are called only once the server has closed the
+        response's ``app_iter``.
+
+        Background tasks are called in the order they're added.  They
+        are only called if the router returns a response; they are not
+        called if an exception propagates out of the router.  If the
+        ``background_task_threads`` setting is a positive integer, the
+        tasks are called by a thread of a pool owned by the
+        :term:`application registry` (see
+        :ref:`background_task_settings`); otherwise they are called by
+        the thread which closes the ``app_iter``.  Either way,
+        :func:`pyramid.threadlocal.get_current_request` and
+        :func:`pyramid.threadlocal.get_current_registry` return the
+        request and its registry while a task is running.
+
+        Errors raised by background tasks are logged to the
+        :app:`Pyramid` debug logger; they do not prevent other tasks
+        from being called.
+        """
+        tasks = self.background_tasks
+        if not tasks:
+            tasks = []
+        tasks.append(task)
+        self.background_tasks = tasks
+
     @reify
     def session(self):
         """ Obtain the :term:`session` object associated with this
@@ -1,6 +1,11 @@
+from time import time
+
+from zope.interface import implementedBy
 from zope.interface import implements
 from zope.interface import providedBy
 
+from repoze.lru import LRUCache
+
 from pyramid.interfaces import IDebugLogger
 from pyramid.interfaces import IExceptionViewClassifier
 from pyramid.interfaces import IRequest
@@ -8,29 +13,78 @@ from pyramid.interfaces import IRootFactory
 from pyramid.interfaces import IRouteRequest
 from pyramid.interfaces import IRouter
 from pyramid.interfaces import IRequestFactory
+from pyramid.interfaces import IRequestTimer
 from pyramid.interfaces import IRoutesMapper
+from pyramid.interfaces import ITaskPool
 from pyramid.interfaces import ITraverser
 from pyramid.interfaces import IView
 from pyramid.interfaces import IViewClassifier
+from pyramid.interfaces import VH_ROOT_KEY
 
+from pyramid.admission import RequestShed
+from pyramid.admission import admission_controller_from_settings
 from pyramid.events import ContextFound
 from pyramid.events import NewRequest
 from pyramid.events import NewResponse
 from pyramid.exceptions import NotFound
 from pyramid.request import Request
+from pyramid.tasks import BackgroundTaskIterator
+from pyramid.settings import asbool
 from pyramid.threadlocal import manager
 from pyramid.traversal import DefaultRootFactory
 from pyramid.traversal import ModelGraphTraverser
+from pyramid.traversal import traversal_path
 
 from pyramid.configuration import make_app # b/c
 
 make_app # prevent PyFlakes from complaining
 
+_marker = object()
+
+class ViewLookupCache(object):
+    """ A bounded memo of the results of ``lookup`` calls made against
+    the adapter registry ``adapters``, including lookups which found
+    nothing.  At most ``size`` results are remembered; the least
+    recently used results are discarded first.  The memo is emptied
+    whenever an adapter is registered with or unregistered from
+    ``adapters``.  The ``hits`` and ``misses`` attributes count
+    lookups which were (and were not) answered from the memo."""
+    hits = 0
+    misses = 0
+
+    def __init__(self, adapters, size):
+        self.adapters = adapters
+        self.generation = adapters._generation
+        self.cache = LRUCache(size)
+
+    def lookup(self, required, provided, name=u'', default=None):
+        adapters = self.adapters
+        if adapters._generation != self.generation:
+            self.clear()
+        key = (required, provided, name)
+        result = self.cache.get(key, _marker)
+        if result is _marker:
+            self.misses += 1
+            result = adapters.lookup(required, provided, name=name)
+            self.cache.put(key, result)
+        else:
+            self.hits += 1
+        if result is None:
+            return default
+        return result
+
+    def clear(self):
+        self.generation = self.adapters._generation
+        self.cache.clear()
+
 
 class Router(object):
     implements(IRouter)
 
     debug_notfound = False
+    admission = None
+    bind_route_views = False
+    view_lookup_cache = None
     threadlocal_manager = manager
 
     def __init__(self, registry):
@@ -39,11 +93,50 @@ class Router(object):
         self.root_factory = q(IRootFactory, default=DefaultRootFactory)
         self.routes_mapper = q(IRoutesMapper)
         self.request_factory = q(IRequestFactory, default=Request)
+        self.request_timer = q(IRequestTimer)
+        self.task_pool = q(ITaskPool)
         self.root_policy = self.root_factory # b/w compat
         self.registry = registry
         settings = registry.settings
         if settings is not None:
             self.debug_notfound = settings['debug_notfound']
+            self.bind_route_views = asbool(
+                settings.get('bind_route_views', False))
+            self.admission = admission_controller_from_settings(settings)
+            cache_size = int(settings.get('view_lookup_cache_size', 0))
+            if cache_size:
+                self.view_lookup_cache = ViewLookupCache(registry.adapters,
+                                                         cache_size)
+
+    def bind_route(self, route):
+        """ Return a two-tuple ``(request_iface, view_callable)`` for
+        the :term:`route` ``route``.  ``view_callable`` is the view
+        that a request matching the route will be dispatched to when
+        the route has no ``factory``, the application uses the
+        default root factory and traverser, and the request is not
+        traversed (its matchdict has no ``traverse`` key); it is
+        ``None`` if the route cannot be bound to a view in this way.
+        The result is stored on the route and recomputed whenever the
+        registry's adapters or utilities change."""
+        registry = self.registry
+        generation = (registry.adapters._generation,
+                      registry.utilities._generation)
+        binding = route.binding
+        if binding is None or binding[0] != generation:
+            request_iface = registry.queryUtility(
+                IRouteRequest, name=route.name, default=IRequest)
+            view_callable = None
+            if (route.factory is None and
+                self.root_factory is DefaultRootFactory):
+                adapters = registry.adapters
+                context_iface = implementedBy(DefaultRootFactory)
+                if adapters.lookup((context_iface,), ITraverser) is None:
+                    view_callable = adapters.lookup(
+                        (IViewClassifier, request_iface, context_iface),
+                        IView, name=u'', default=None)
+            binding = route.binding = (generation, request_iface,
+                                       view_callable)
+        return binding[1], binding[2]
 
     def __call__(self, environ, start_response):
         """
@@ -55,9 +148,20 @@ class Router(object):
         """
         registry = self.registry
         adapters = registry.adapters
+        view_lookup_cache = self.view_lookup_cache
+        if view_lookup_cache is None:
+            lookup = adapters.lookup
+        else:
+            lookup = view_lookup_cache.lookup
         has_listeners = registry.has_listeners
         logger = self.logger
         manager = self.threadlocal_manager
+        timer = self.request_timer
+        if timer is not None:
+            timings = [('start', time())]
+        admission = self.admission
+        if admission is not None:
+            gates = []
         request = None
         threadlocals = {'registry':registry, 'request':request}
         manager.push(threadlocals)
@@ -73,9 +177,13 @@ class Router(object):
                 attrs = request.__dict__
                 attrs['registry'] = registry
                 has_listeners and registry.notify(NewRequest(request))
+                timer is not None and timings.append(('new_request', time()))
                 request_iface = IRequest
+                view_callable = None
 
                 try:
+                    admission is not None and admission.admit(gates)
+
                     # find the root object
                     root_factory = self.root_factory
                     if self.routes_mapper is not None:
@@ -90,32 +198,70 @@ class Router(object):
                             environ['bfg.routes.matchdict'] = match
                             attrs['matchdict'] = match
                             attrs['matched_route'] = route
-                            request_iface = registry.queryUtility(
-                                IRouteRequest,
-                                name=route.name,
-                                default=IRequest)
+                            admission is not None and admission.admit(
+                                gates, route.name)
+                            if self.bind_route_views:
+                                request_iface, view_callable = self.bind_route(
+                                    route)
+                                if ('traverse' in match or
+                                    VH_ROOT_KEY in environ):
+                                    view_callable = None
+                            else:
+                                request_iface = registry.queryUtility(
+                                    IRouteRequest,
+                                    name=route.name,
+                                    default=IRequest)
                             root_factory = route.factory or self.root_factory
+                        timer is not None and timings.append(
+                            ('route_match', time()))
 
                     root = root_factory(request)
                     attrs['root'] = root
-
-                    # find a context
-                    traverser = adapters.queryAdapter(root, ITraverser)
-                    if traverser is None:
-                        traverser = ModelGraphTraverser(root)
-                    tdict = traverser(request)
-                    context, view_name, subpath, traversed, vroot, vroot_path =(
-                        tdict['context'], tdict['view_name'], tdict['subpath'],
-                        tdict['traversed'], tdict['virtual_root'],
-                        tdict['virtual_root_path'])
-                    attrs.update(tdict)
-                    has_listeners and registry.notify(ContextFound(request))
-
-                    # find a view callable
-                    context_iface = providedBy(context)
-                    view_callable = adapters.lookup(
-                        (IViewClassifier, request_iface, context_iface),
-                        IView, name=view_name, default=None)
+                    timer is not None and timings.append(
+                        ('root_factory', time()))
+
+                    if view_callable is not None:
+                        # the route is bound directly to a view; this is
+                        # what the default traverser would have found
+                        context = vroot = root
+                        view_name = u''
+                        subpath = match.get('subpath', ())
+                        if not hasattr(subpath, '__iter__'):
+                            subpath = traversal_path(subpath)
+                        attrs.update({'context':context,
+                                      'view_name':view_name,
+                                      'subpath':subpath,
+                                      'traversed':(),
+                                      'virtual_root':vroot,
+                                      'virtual_root_path':()})
+                        has_listeners and registry.notify(
+                            ContextFound(request))
+                        timer is not None and timings.append(
+                            ('traversal', time()))
+                    else:
+                        # find a context
+                        traverser = adapters.queryAdapter(root, ITraverser)
+                        if traverser is None:
+                            traverser = ModelGraphTraverser(root)
+                        tdict = traverser(request)
+                        (context, view_name, subpath, traversed, vroot,
+                         vroot_path) = (
+                            tdict['context'], tdict['view_name'],
+                            tdict['subpath'], tdict['traversed'],
+                            tdict['virtual_root'], tdict['virtual_root_path'])
+                        attrs.update(tdict)
+                        has_listeners and registry.notify(
+                            ContextFound(request))
+                        timer is not None and timings.append(
+                            ('traversal', time()))
+
+                        # find a view callable
+                        context_iface = providedBy(context)
+                        view_callable = lookup(
+                            (IViewClassifier, request_iface, context_iface),
+                            IView, name=view_name, default=None)
+                        timer is not None and timings.append(
+                            ('view_lookup', time()))
 
                     # invoke the view callable
                     if view_callable is None:
@@ -135,6 +281,11 @@ class Router(object):
                         raise NotFound(msg)
                     else:
                         response = view_callable(context, request)
+                        timer is not None and timings.append(('view', time()))
+
+                # respond to requests shed by admission control
+                except RequestShed:
+                    response = request.get_response(admission.response)
 
                 # handle exceptions raised during root finding and view-exec
                 except Exception, why:
@@ -143,7 +294,7 @@ class Router(object):
                     for_ = (IExceptionViewClassifier,
                             request_iface.combined,
                             providedBy(why))
-                    view_callable = adapters.lookup(for_, IView, default=None)
+                    view_callable = lookup(for_, IView, default=None)
 
                     if view_callable is None:
                         raise
@@ -157,6 +308,8 @@ class Router(object):
                     environ['repoze.bfg.message'] = msg
 
                     response = view_callable(why, request)
+                    timer is not None and timings.append(
+                        ('exception_view', time()))
 
                 # process the response
 
@@ -164,6 +317,8 @@ class Router(object):
 
                 if request.response_callbacks:
                     request._process_response_callbacks(response)
+                timer is not None and timings.append(
+                    ('response_callbacks', time()))
 
                 try:
                     headers = response.headerlist
@@ -177,14 +332,290 @@ class Router(object):
             finally:
                 if request is not None and request.finished_callbacks:
                     request._process_finished_callbacks()
+                timer is not None and timings.append(
+                    ('finished_callbacks', time()))
 
             start_response(status, headers)
+            if request.background_tasks:
+                app_iter = BackgroundTaskIterator(app_iter, request,
+                                                  self.task_pool, logger)
             return app_iter
             
         finally:
             manager.pop()
-            
+            admission is not None and admission.release(gates)
+            if timer is not None and request is not None:
+                route = request.__dict__.get('matched_route')
+                timer(route and route.name, request.__dict__.get('view_name'),
+                      timings)
+
+class SpecializedRouter(Router):
+    """ A router which handles requests using a function composed by
+    :meth:`specialize` of the phases of the request pipeline which the
+    application uses, each chosen for the contents of the registry:
+    e.g. there is no route matching if the application has no routes
+    mapper, no event notification if it has no subscribers and no
+    traverser lookup if it registers no traverser.  The function is
+    composed by :meth:`specialize` (or by the first call to the
+    router), so it reflects the state of the registry and of the
+    router's attributes at that time; use :class:`Router` if the
+    configuration of an application changes after it starts serving
+    requests.  Requests to applications which use a request timer or
+    admission control, which take part in every phase, are handled
+    by :meth:`Router.__call__`."""
+
+    handle_request = None
+
+    def specialize(self):
+        """ Compose the request handling function for the current
+        state of the registry, store it as the ``handle_request``
+        attribute of the router and return it."""
+        if self.request_timer is not None or self.admission is not None:
+            handle_request = Router.__call__.__get__(self, self.__class__)
+        else:
+            handle_request = self._compose()
+        self.handle_request = handle_request
+        return handle_request
+
+    def _compose(self):
+        registry = self.registry
+        adapters = registry.adapters
+        view_lookup_cache = self.view_lookup_cache
+        if view_lookup_cache is None:
+            lookup = adapters.lookup
+        else:
+            lookup = view_lookup_cache.lookup
+        logger = self.logger
+        manager = self.threadlocal_manager
+        request_factory = self.request_factory
+        default_root_factory = self.root_factory
+        routes_mapper = self.routes_mapper
+        task_pool = self.task_pool
+        notify = None
+        if registry.has_listeners:
+            notify = registry.notify
+
+        # create the request
+        if notify is None:
+            def new_request(environ, threadlocals):
+                request = request_factory(environ)
+                threadlocals['request'] = request
+                request.__dict__['registry'] = registry
+                return request
+        else:
+            def new_request(environ, threadlocals):
+                request = request_factory(environ)
+                threadlocals['request'] = request
+                request.__dict__['registry'] = registry
+                notify(NewRequest(request))
+                return request
+
+        # find the root factory, the request interface and the view
+        # bound to the matched route (if any)
+        if routes_mapper is None:
+            def match_route(request, attrs, environ):
+                return default_root_factory, IRequest, None, None
+        else:
+            if self.bind_route_views:
+                bind_route = self.bind_route
+                def route_view(route, match, environ):
+                    request_iface, view_callable = bind_route(route)
+                    if 'traverse' in match or VH_ROOT_KEY in environ:
+                        view_callable = None
+                    return request_iface, view_callable
+            else:
+                queryUtility = registry.queryUtility
+                def route_view(route, match, environ):
+                    return queryUtility(IRouteRequest, name=route.name,
+                                        default=IRequest), None
+            def match_route(request, attrs, environ):
+                info = routes_mapper(request)
+                match, route = info['match'], info['route']
+                if route is None:
+                    return default_root_factory, IRequest, None, match
+                environ['bfg.routes.route'] = route
+                environ['bfg.routes.matchdict'] = match
+                attrs['matchdict'] = match
+                attrs['matched_route'] = route
+                request_iface, view_callable = route_view(route, match,
+                                                          environ)
+                return (route.factory or default_root_factory,
+                        request_iface, view_callable, match)
+
+        # find a context
+        traversers = [ reg for reg in registry.registeredAdapters()
+                       if reg.provided.isOrExtends(ITraverser) ]
+        if traversers or registry.__bases__:
+            queryAdapter = adapters.queryAdapter
+            def find_context(request, attrs, root):
+                traverser = queryAdapter(root, ITraverser)
+                if traverser is None:
+                    traverser = ModelGraphTraverser(root)
+                tdict = traverser(request)
+                attrs.update(tdict)
+                return tdict['context'], tdict['view_name']
+        else:
+            def find_context(request, attrs, root):
+                tdict = ModelGraphTraverser(root)(request)
+                attrs.update(tdict)
+                return tdict['context'], tdict['view_name']
+        if notify is not None:
+            find_context = _notifying(find_context, notify, ContextFound)
+
+        # find a view callable
+        def find_view(request, attrs, root, request_iface, view_callable,
+                      match):
+            context, view_name = find_context(request, attrs, root)
+            view_callable = lookup(
+                (IViewClassifier, request_iface, providedBy(context)),
+                IView, name=view_name, default=None)
+            return context, view_callable
+        if self.bind_route_views:
+            bound_context = _bound_context
+            if notify is not None:
+                bound_context = _notifying(bound_context, notify,
+                                           ContextFound)
+            traverse_view = find_view
+            def find_view(request, attrs, root, request_iface,
+                          view_callable, match):
+                if view_callable is None:
+                    return traverse_view(request, attrs, root,
+                                         request_iface, view_callable,
+                                         match)
+                # the route is bound directly to a view; this is what
+                # the default traverser would have found
+                context = bound_context(request, attrs, root, match)
+                return context, view_callable
+
+        # the message of the NotFound raised when there is no view
+        if self.debug_notfound:
+            def not_found(request, attrs):
+                msg = (
+                    'debug_notfound of url %s; path_info: %r, '
+                    'context: %r, view_name: %r, subpath: %r, '
+                    'traversed: %r, root: %r, vroot: %r, '
+                    'vroot_path: %r' % (
+                        request.url, request.path_info, attrs['context'],
+                        attrs['view_name'], attrs['subpath'],
+                        attrs['traversed'], attrs['root'],
+                        attrs['virtual_root'], attrs['virtual_root_path'])
+                    )
+                logger and logger.debug(msg)
+                return msg
+        else:
+            def not_found(request, attrs):
+                return request.path_info
+
+        # process the response
+        if notify is None:
+            def process_response(request, response):
+                if request.response_callbacks:
+                    request._process_response_callbacks(response)
+        else:
+            def process_response(request, response):
+                notify(NewResponse(request, response))
+                if request.response_callbacks:
+                    request._process_response_callbacks(response)
+
+        def handle_request(environ, start_response):
+            request = None
+            threadlocals = {'registry':registry, 'request':request}
+            manager.push(threadlocals)
+
+            try: # matches finally: manager.pop()
+
+                try: # matches finally: ... call finished callbacks ...
+
+                    request = new_request(environ, threadlocals)
+                    attrs = request.__dict__
+                    request_iface = IRequest
+
+                    try:
+                        (root_factory, request_iface, view_callable,
+                         match) = match_route(request, attrs, environ)
+                        root = root_factory(request)
+                        attrs['root'] = root
+                        context, view_callable = find_view(
+                            request, attrs, root, request_iface,
+                            view_callable, match)
+                        if view_callable is None:
+                            raise NotFound(not_found(request, attrs))
+                        response = view_callable(context, request)
+
+                    # handle exceptions raised during root finding and
+                    # view-exec
+                    except Exception, why:
+                        attrs['exception'] = why
+
+                        for_ = (IExceptionViewClassifier,
+                                request_iface.combined,
+                                providedBy(why))
+                        view_callable = lookup(for_, IView, default=None)
 
+                        if view_callable is None:
+                            raise
 
+                        try:
+                            msg = why[0]
+                        except:
+                            msg = ''
 
+                        # repoze.bfg.message docs-deprecated in Pyramid 1.0
+                        environ['repoze.bfg.message'] = msg
 
+                        response = view_callable(why, request)
+
+                    process_response(request, response)
+
+                    try:
+                        headers = response.headerlist
+                        app_iter = response.app_iter
+                        status = response.status
+                    except AttributeError:
+                        raise ValueError(
+                            'Non-response object returned from view named '
+                            '%s (and no renderer): %r' % (
+                                attrs.get('view_name'), response))
+
+                finally:
+                    if request is not None and request.finished_callbacks:
+                        request._process_finished_callbacks()
+
+                start_response(status, headers)
+                if request.background_tasks:
+                    app_iter = BackgroundTaskIterator(app_iter, request,
+                                                      task_pool, logger)
+                return app_iter
+
+            finally:
+                manager.pop()
+
+        return handle_request
+
+    def __call__(self, environ, start_response):
+        handle_request = self.handle_request
+        if handle_request is None:
+            handle_request = self.specialize()
+        return handle_request(environ, start_response)
+
+def _bound_context(request, attrs, root, match):
+    # the context of a request to a route bound to a view: its root
+    subpath = match.get('subpath', ())
+    if not hasattr(subpath, '__iter__'):
+        subpath = traversal_path(subpath)
+    attrs.update({'context':root,
+                  'view_name':u'',
+                  'subpath':subpath,
+                  'traversed':(),
+                  'virtual_root':root,
+                  'virtual_root_path':()})
+    return root
+
+def _notifying(phase, notify, event_class):
+    # ``phase``, followed by the notification of an ``event_class``
+    # event for the request it is passed
+    def notifying(request, *arg):
+        result = phase(request, *arg)
+        notify(event_class(request))
+        return result
+    return notifying
@@ -0,0 +1,157 @@
+import cPickle
+import os
+import sys
+import time
+import types
+
+from pyramid.util import replace_file
+
+# the attribute in which venusian keeps the callbacks attached to a
+# decorated object
+ATTACH_ATTR = '__venusian_callbacks__'
+
+class ScanCache(object):
+    """ Remembers, in the file named ``filename``, whether each module
+    scanned defines objects decorated with :term:`configuration
+    decoration` along with the modification time and size of its
+    source file, so that the modules which define none need not be
+    imported by later scans until their source file changes."""
+    def __init__(self, filename):
+        self.filename = filename
+        self.changed = False
+        self.modules = {}
+        try:
+            f = open(filename, 'rb')
+        except IOError:
+            return
+        try:
+            try:
+                self.modules = cPickle.load(f)
+            except Exception:
+                # a truncated or corrupt file
+                pass
+        finally:
+            f.close()
+
+    def undecorated(self, name, filename):
+        """ Return ``True`` if the module named ``name`` defined no
+        decorated object when it was last scanned and its source file
+        ``filename`` has not changed since """
+        entry = self.modules.get(name)
+        return entry == (filename,) + _stat(filename) + (False,)
+
+    def set(self, name, filename, decorated):
+        """ Remember whether the module named ``name`` (whose source file
+        is ``filename``) defines decorated objects """
+        entry = (filename,) + _stat(filename) + (decorated,)
+        if self.modules.get(name) != entry:
+            self.modules[name] = entry
+            self.changed = True
+
+    def save(self, logger=None):
+        """ Write the cache to its file if it has changed, logging the
+        reason as a warning of ``logger`` if it cannot be written """
+        if self.changed:
+            try:
+                replace_file(self.filename, cPickle.dumps(self.modules, 2))
+            except (IOError, OSError), why:
+                if logger is not None:
+                    logger.warn('Scan cache %r not written: %s' %
+                                (self.filename, why))
+                return
+            self.changed = False
+
+def scan_package(scanner, package, categories=None, cache=None,
+                 timings=None):
+    """ Scan the package or module ``package`` and its subpackages with
+    the venusian ``scanner`` as ``scanner.scan(package, categories)``
+    does, but one module at a time.  If ``cache`` is a
+    :class:`ScanCache`, the modules it knows to define no decorated
+    object are not imported.  If ``timings`` is a list, a ``(module
+    name, seconds)`` tuple is appended to it for each module imported
+    and scanned.  Packages which are not directories (such as packages
+    in zip files) are scanned by ``scanner.scan`` as a whole."""
+    paths = getattr(package, '__path__', None)
+    if paths is not None:
+        for path in paths:
+            if not os.path.isdir(path):
+                start = time.time()
+                scanner.scan(package, categories=categories)
+                if timings is not None:
+                    timings.append((package.__name__, time.time() - start))
+                return
+    modules = [(package.__name__, _source(package.__file__), paths)]
+    while modules:
+        name, filename, paths = modules.pop(0)
+        _scan_module(scanner, name, filename, categories, cache, timings)
+        if paths is not None:
+            # scan the modules and subpackages of a package right after
+            # it, in the order of their names, as venusian does
+            modules[0:0] = _submodules(name, paths)
+
+def _scan_module(scanner, name, filename, categories, cache, timings):
+    if cache is not None and cache.undecorated(name, filename):
+        return
+    start = time.time()
+    __import__(name)
+    module = sys.modules[name]
+    if hasattr(module, '__path__'):
+        # the scanner would scan the modules of the package too: give
+        # it a module which has the members of the package only
+        members = types.ModuleType(name)
+        members.__dict__.update(module.__dict__)
+        del members.__path__
+    else:
+        members = module
+    scanner.scan(members, categories=categories)
+    if timings is not None:
+        timings.append((name, time.time() - start))
+    if cache is not None:
+        cache.set(name, filename, _decorated(module))
+
+def _submodules(package_name, paths):
+    # the (name, source file name, package paths or None) of the modules
+    # and subpackages in the directories ``paths`` of a package, sorted
+    # by file name; compiled files without a source file are ignored
+    result = []
+    seen = {}
+    for path in paths:
+        filenames = os.listdir(path)
+        filenames.sort()
+        for filename in filenames:
+            fullname = os.path.join(path, filename)
+            init = os.path.join(fullname, '__init__.py')
+            name = None
+            if os.path.isfile(init):
+                name, source, subpaths = filename, init, [fullname]
+            elif filename.endswith('.py'):
+                name, source, subpaths = filename[:-3], fullname, None
+            if name and not ('.' in name or name == '__init__' or
+                             name in seen):
+                seen[name] = True
+                result.append(('%s.%s' % (package_name, name), source,
+                               subpaths))
+    return result
+
+def _decorated(module):
+    for value in module.__dict__.values():
+        try:
+            if getattr(value, ATTACH_ATTR, None) is not None:
+                return True
+        except Exception:
+            # an object which misbehaves when asked for an attribute
+            # cannot be decorated
+            pass
+    return False
+
+def _source(filename):
+    if filename.endswith('.pyc') or filename.endswith('.pyo'):
+        filename = filename[:-1]
+    return filename
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (None, None)
+    return (st.st_mtime, st.st_size)
@@ -32,6 +32,8 @@ class Settings(dict):
         config_debug_templates = self.get('debug_templates', '')
         eff_debug_templates = asbool(eget('BFG_DEBUG_TEMPLATES',
                                           config_debug_templates))
+        config_debug_scan = self.get('debug_scan', '')
+        eff_debug_scan = asbool(eget('BFG_DEBUG_SCAN', config_debug_scan))
         config_reload_templates = self.get('reload_templates', '')
         eff_reload_templates = asbool(eget('BFG_RELOAD_TEMPLATES',
                                            config_reload_templates))
@@ -47,6 +49,7 @@ class Settings(dict):
             'debug_authorization': eff_debug_all or eff_debug_auth,
             'debug_notfound': eff_debug_all or eff_debug_notfound,
             'debug_templates': eff_debug_all or eff_debug_templates,
+            'debug_scan': eff_debug_all or eff_debug_scan,
             'reload_templates': eff_reload_all or eff_reload_templates,
             'reload_resources':eff_reload_all or eff_reload_resources,
             'configure_zcml':eff_configure_zcml,
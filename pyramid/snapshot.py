@@ -0,0 +1,233 @@
+import cPickle
+import os
+import sys
+import types
+
+from cStringIO import StringIO
+
+from pyramid.compat import md5
+from pyramid.util import replace_file
+
+# the version of the snapshot file format
+FORMAT = 2
+
+# the extensions of compiled Python files
+COMPILED = ('.pyc', '.pyo')
+
+# the types of the setting values which are part of snapshot keys
+STABLE_TYPES = (str, unicode, int, long, float, bool, type(None))
+
+# the configurator methods whose calls are recorded in snapshots
+RECORDED_METHODS = (
+    'add_handler',
+    'add_renderer',
+    'add_route',
+    'add_settings',
+    'add_static_view',
+    'add_subscriber',
+    'add_translation_dirs',
+    'add_view',
+    'override_resource',
+    'set_default_permission',
+    'set_forbidden_view',
+    'set_locale_negotiator',
+    'set_notfound_view',
+    'set_renderer_globals_factory',
+    'set_request_factory',
+    'set_request_timer',
+    'set_session_factory',
+    '_set_authentication_policy',
+    '_set_authorization_policy',
+    '_set_root_factory',
+    )
+
+class ConfigurationRecorder(object):
+    """ Records the calls made to the methods named in
+    ``RECORDED_METHODS`` of the configurators it is attached to, as
+    ``(package name, method name, args, keyword args)`` tuples.  Calls
+    made while another recorded call is in progress (such as the
+    ``add_view`` call made by ``add_route``) are not recorded: replaying
+    the outer call makes them again.
+
+    The recorder also collects what the snapshot depends on: the names
+    of the ``packages`` of the configurators, the names of the
+    ``modules`` which define the objects passed to the calls, and the
+    names of the ``files`` (such as ZCML files) the calls were made
+    from."""
+    def __init__(self):
+        self.calls = []
+        self.packages = set()
+        self.modules = set()
+        self.files = set()
+        self.depth = 0
+        self.active = True
+
+    def attach(self, config):
+        for name in RECORDED_METHODS:
+            method = getattr(config, name)
+            setattr(config, name, self._wrap(config, name, method))
+
+    def detach(self, config):
+        for name in RECORDED_METHODS:
+            config.__dict__.pop(name, None)
+
+    def _wrap(self, config, name, method):
+        def wrapper(*arg, **kw):
+            if self.active and not self.depth:
+                self.record(config.package_name, name, arg, kw)
+            self.depth += 1
+            try:
+                return method(*arg, **kw)
+            finally:
+                self.depth -= 1
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def record(self, package_name, name, arg, kw):
+        kw = kw.copy()
+        filename = getattr(kw.pop('_info', None), 'file', None)
+        if isinstance(filename, str):
+            self.files.add(filename)
+        self.calls.append((package_name, name, arg, kw))
+        self.packages.add(package_name.split('.')[0])
+        for value in arg + tuple(kw.values()):
+            if isinstance(value, types.ModuleType):
+                module = value.__name__
+            else:
+                module = getattr(value, '__module__', None)
+            if isinstance(module, str):
+                self.modules.add(module)
+
+    def save(self, filename, settings, logger=None):
+        """ Write the calls recorded to the snapshot file ``filename``
+        along with the key of ``settings`` and of the modules and files
+        they depend on (see :func:`snapshot_key`).  Return ``True`` if
+        the snapshot was written; if it could not be (for instance
+        because an argument of a recorded call cannot be pickled), log
+        the reason as a warning of ``logger`` and return ``False``."""
+        sources = (sorted(self.packages), sorted(self.modules),
+                   sorted(self.files))
+        try:
+            header = (FORMAT, sources, snapshot_key(sources, settings))
+            buffer = StringIO()
+            pickler = cPickle.Pickler(buffer, 2)
+            pickler.persistent_id = _persistent_id
+            pickler.dump(header)
+            pickler.dump(self.calls)
+            replace_file(filename, buffer.getvalue())
+        except (cPickle.PicklingError, TypeError, IOError, OSError), why:
+            if logger is not None:
+                logger.warn('Configuration snapshot %r not written: %s' %
+                            (filename, why))
+            return False
+        return True
+
+def snapshot_key(sources, settings):
+    """ Return a key which changes when one of the ``sources`` of a
+    snapshot, a ``(packages, modules, files)`` tuple of lists of names,
+    changes, or when a setting of the ``settings`` dictionary whose
+    value is a string, a number, a boolean or ``None`` changes (other
+    settings are not part of the key).  A source changes when the
+    modification time or the size of one of these files changes:
+
+    - the Python source files of the ``modules``,
+
+    - the Python source files of the modules of the ``packages`` which
+      are imported, and the ZCML files of their subpackages which are
+      imported; the directories of these subpackages are included too,
+      so adding or removing a module changes the key,
+
+    - the ``files``."""
+    packages, modules, files = sources
+    paths = {}
+    missing = []
+    for name in modules:
+        module = _import(name)
+        if module is None:
+            missing.append(name)
+        else:
+            _add_module_paths(module, paths)
+    for name, module in sys.modules.items():
+        if module is not None and name.split('.')[0] in packages:
+            _add_module_paths(module, paths)
+            for directory in getattr(module, '__path__', ()):
+                paths[directory] = None
+                for filename in _listdir(directory):
+                    if filename.endswith('.zcml'):
+                        paths[os.path.join(directory, filename)] = None
+    for filename in files:
+        paths[filename] = None
+    stats = [ _stat(path) for path in paths ]
+    stats.sort()
+    items = [ item for item in (settings or {}).items()
+              if isinstance(item[1], STABLE_TYPES) ]
+    items.sort()
+    missing.sort()
+    data = repr((FORMAT, sys.version, stats, missing, items))
+    return md5(data).hexdigest()
+
+def _import(name):
+    module = sys.modules.get(name)
+    if module is None:
+        try:
+            __import__(name)
+        except ImportError:
+            return None
+        module = sys.modules[name]
+    return module
+
+def _add_module_paths(module, paths):
+    filename = getattr(module, '__file__', None)
+    if filename is not None:
+        if os.path.splitext(filename)[1] in COMPILED:
+            filename = filename[:-1]
+        paths[filename] = None
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return ()
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_mtime, st.st_size)
+
+def read_snapshot(filename, settings):
+    """ Return the list of calls stored in the snapshot file
+    ``filename`` by :meth:`ConfigurationRecorder.save`, or ``None`` if
+    there is no such file, if it cannot be read or if its key does not
+    match the current key of ``settings`` and of the sources it
+    depends on."""
+    try:
+        f = open(filename, 'rb')
+    except IOError:
+        return None
+    try:
+        try:
+            unpickler = cPickle.Unpickler(f)
+            unpickler.persistent_load = _persistent_load
+            format, sources, key = unpickler.load()
+            if format != FORMAT or key != snapshot_key(sources, settings):
+                return None
+            return unpickler.load()
+        except Exception:
+            # a truncated or corrupt file, or one which refers to
+            # objects which no longer exist
+            return None
+    finally:
+        f.close()
+
+def _persistent_id(ob):
+    # modules (such as the package of a renderer) are stored by name
+    if isinstance(ob, types.ModuleType):
+        return ob.__name__
+    return None
+
+def _persistent_load(name):
+    __import__(name)
+    return sys.modules[name]
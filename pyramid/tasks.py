@@ -0,0 +1,136 @@
+import atexit
+import sys
+import threading
+import traceback
+import Queue
+
+from zope.interface import implements
+
+from pyramid.interfaces import IDebugLogger
+from pyramid.interfaces import ITaskPool
+from pyramid import threadlocal
+
+def run_background_tasks(request, logger=None):
+    """ Call each of the background tasks of ``request`` with the
+    request as its argument, with the request and its registry
+    pushed on to the threadlocal stack.  Errors raised by tasks are
+    logged to ``logger`` (if it is not ``None``) and otherwise
+    ignored."""
+    tasks = request.background_tasks
+    manager = threadlocal.manager
+    manager.push({'registry':request.registry, 'request':request})
+    try:
+        while tasks:
+            task = tasks.pop(0)
+            try:
+                task(request)
+            except Exception:
+                if logger is not None:
+                    logger.error(
+                        'Error in background task %r of request for %s:\n%s'
+                        % (task, request.url,
+                           ''.join(traceback.format_exception(
+                               *sys.exc_info()))))
+    finally:
+        manager.pop()
+
+class TaskPool(object):
+    """ A pool of ``size`` threads which call the background tasks of
+    requests.  At most ``queue_size`` requests' tasks wait to be
+    called; :meth:`submit` blocks while that many are waiting.
+    Errors raised by tasks are logged to ``logger``."""
+    implements(ITaskPool)
+
+    def __init__(self, size, queue_size=100, logger=None):
+        self.queue = Queue.Queue(queue_size)
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.threads = []
+        for i in range(size):
+            thread = threading.Thread(target=self._work)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self):
+        queue = self.queue
+        while True:
+            request = queue.get()
+            if request is None:
+                break
+            run_background_tasks(request, self.logger)
+
+    def submit(self, request):
+        """ Queue the background tasks of ``request`` to be called by a
+        thread of the pool.  If the pool has been shut down, the tasks
+        are called immediately instead."""
+        # the lock keeps requests from being queued behind the
+        # sentinels put by a concurrent shutdown
+        self.lock.acquire()
+        try:
+            queued = bool(self.threads)
+            if queued:
+                self.queue.put(request)
+        finally:
+            self.lock.release()
+        if not queued:
+            run_background_tasks(request, self.logger)
+
+    def shutdown(self):
+        """ Wait until all queued tasks have been called, then stop the
+        threads of the pool."""
+        self.lock.acquire()
+        try:
+            threads = self.threads
+            self.threads = []
+            for thread in threads:
+                self.queue.put(None)
+        finally:
+            self.lock.release()
+        for thread in threads:
+            thread.join()
+
+def task_pool_from_settings(registry):
+    """ Return the :class:`pyramid.interfaces.ITaskPool` utility of
+    ``registry``.  If there is none and the ``background_task_threads``
+    setting is a positive integer, first register a
+    :class:`TaskPool` with that many threads (and a queue of
+    ``background_task_queue_size`` requests, default ``100``) which is
+    shut down when the process exits.  Return ``None`` if there is no
+    pool."""
+    pool = registry.queryUtility(ITaskPool)
+    if pool is None:
+        settings = registry.settings or {}
+        size = int(settings.get('background_task_threads', 0))
+        if size:
+            queue_size = int(settings.get('background_task_queue_size', 100))
+            logger = registry.queryUtility(IDebugLogger)
+            pool = TaskPool(size, queue_size, logger)
+            registry.registerUtility(pool, ITaskPool)
+            atexit.register(pool.shutdown)
+    return pool
+
+class BackgroundTaskIterator(object):
+    """ Wraps the ``app_iter`` of the response to ``request``; when the
+    WSGI server closes it, the background tasks of ``request`` are
+    submitted to ``pool`` (or called immediately if ``pool`` is
+    ``None``)."""
+    def __init__(self, app_iter, request, pool=None, logger=None):
+        self.app_iter = app_iter
+        self.request = request
+        self.pool = pool
+        self.logger = logger
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            close = getattr(self.app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if self.pool is None:
+                run_background_tasks(self.request, self.logger)
+            else:
+                self.pool.submit(self.request)
@@ -20,7 +20,7 @@ from pyramid.security import Authenticated
 from pyramid.security import Everyone
 from pyramid.security import has_permission
 from pyramid.threadlocal import get_current_registry
-from pyramid.threadlocal import manager
+from pyramid import threadlocal
 
 _marker = object()
 
@@ -615,7 +615,7 @@ def setUp(registry=None, request=None, hook_zca=True):
                  ``pyramid.testing.tearDown``.  See
                  :ref:`unittesting_chapter` for more information.
     """
-    manager.clear()
+    threadlocal.manager.clear()
     if registry is None:
         registry = Registry('testing')
     config = Configurator(registry=registry)
@@ -667,8 +667,8 @@ def tearDown(unhook_zca=True):
             getSiteManager.reset()
         except ImportError: # pragma: no cover
             pass
-    info = manager.pop()
-    manager.clear()
+    info = threadlocal.manager.pop()
+    threadlocal.manager.clear()
     if info is not None:
         registry = info['registry']
         if hasattr(registry, '__init__') and hasattr(registry, '__name__'):
@@ -0,0 +1,149 @@
+import unittest
+
+class TestAdmissionGate(unittest.TestCase):
+    def _makeOne(self, limit, max_wait=0):
+        from pyramid.admission import AdmissionGate
+        return AdmissionGate(limit, max_wait)
+
+    def test_enter_exit(self):
+        gate = self._makeOne(1)
+        self.assertEqual(gate.enter(), True)
+        self.assertEqual(gate.in_flight, 1)
+        gate.exit()
+        self.assertEqual(gate.in_flight, 0)
+        self.assertEqual(gate.enter(), True)
+        self.assertEqual(gate.admitted, 2)
+        self.assertEqual(gate.queued, 0)
+        self.assertEqual(gate.shed, 0)
+
+    def test_enter_full_no_wait(self):
+        gate = self._makeOne(1)
+        gate.enter()
+        self.assertEqual(gate.enter(), False)
+        self.assertEqual(gate.admitted, 1)
+        self.assertEqual(gate.queued, 1)
+        self.assertEqual(gate.shed, 1)
+        self.assertEqual(gate.wait_time, 0)
+        self.assertEqual(gate.in_flight, 1)
+
+    def test_enter_full_wait_exceeded(self):
+        gate = self._makeOne(1, max_wait=0.01)
+        gate.enter()
+        self.assertEqual(gate.enter(), False)
+        self.assertEqual(gate.queued, 1)
+        self.assertEqual(gate.shed, 1)
+        self.failUnless(gate.wait_time >= 0.01)
+
+    def test_enter_full_admitted_after_wait(self):
+        import threading
+        gate = self._makeOne(1, max_wait=10)
+        gate.enter()
+        timer = threading.Timer(0.01, gate.exit)
+        timer.start()
+        try:
+            self.assertEqual(gate.enter(), True)
+        finally:
+            timer.join()
+        self.assertEqual(gate.admitted, 2)
+        self.assertEqual(gate.queued, 1)
+        self.assertEqual(gate.shed, 0)
+        self.assertEqual(gate.in_flight, 1)
+        self.failUnless(gate.wait_time > 0)
+
+    def test_stats(self):
+        gate = self._makeOne(1)
+        gate.enter()
+        gate.enter()
+        self.assertEqual(gate.stats(),
+                         {'admitted':1, 'shed':1, 'queued':1, 'wait_time':0,
+                          'in_flight':1})
+
+class TestAdmissionController(unittest.TestCase):
+    def _makeOne(self, *arg, **kw):
+        from pyramid.admission import AdmissionController
+        return AdmissionController(*arg, **kw)
+
+    def test_ctor_defaults(self):
+        from pyramid.httpexceptions import HTTPServiceUnavailable
+        controller = self._makeOne()
+        self.assertEqual(controller.gate, None)
+        self.assertEqual(controller.route_gates, {})
+        self.failUnless(isinstance(controller.response,
+                                   HTTPServiceUnavailable))
+
+    def test_ctor(self):
+        response = object()
+        controller = self._makeOne(2, 0.5, {'foo':1}, response)
+        self.assertEqual(controller.gate.limit, 2)
+        self.assertEqual(controller.gate.max_wait, 0.5)
+        self.assertEqual(controller.route_gates['foo'].limit, 1)
+        self.assertEqual(controller.route_gates['foo'].max_wait, 0.5)
+        self.assertEqual(controller.response, response)
+
+    def test_admit_no_gate(self):
+        controller = self._makeOne()
+        gates = []
+        controller.admit(gates)
+        controller.admit(gates, 'foo')
+        self.assertEqual(gates, [])
+
+    def test_admit_and_release(self):
+        controller = self._makeOne(1, route_limits={'foo':1})
+        gates = []
+        controller.admit(gates)
+        controller.admit(gates, 'foo')
+        self.assertEqual(gates,
+                         [controller.gate, controller.route_gates['foo']])
+        controller.release(gates)
+        self.assertEqual(controller.gate.in_flight, 0)
+        self.assertEqual(controller.route_gates['foo'].in_flight, 0)
+
+    def test_admit_shed(self):
+        from pyramid.admission import RequestShed
+        controller = self._makeOne(route_limits={'foo':1})
+        controller.admit([], 'foo')
+        gates = []
+        self.assertRaises(RequestShed, controller.admit, gates, 'foo')
+        self.assertEqual(gates, [])
+
+    def test_stats(self):
+        controller = self._makeOne(1, route_limits={'foo':1})
+        controller.admit([])
+        stats = controller.stats()
+        self.assertEqual(sorted(stats.keys()), [None, 'foo'])
+        self.assertEqual(stats[None]['admitted'], 1)
+        self.assertEqual(stats['foo']['admitted'], 0)
+
+    def test_stats_no_router_gate(self):
+        controller = self._makeOne()
+        self.assertEqual(controller.stats(), {})
+
+class Test_admission_controller_from_settings(unittest.TestCase):
+    def _callFUT(self, settings):
+        from pyramid.admission import admission_controller_from_settings
+        return admission_controller_from_settings(settings)
+
+    def test_no_limits(self):
+        self.assertEqual(self._callFUT({}), None)
+        self.assertEqual(self._callFUT({'admission_max_wait':'1'}), None)
+
+    def test_max_requests(self):
+        controller = self._callFUT({'admission_max_requests':'10',
+                                    'admission_max_wait':'0.5'})
+        self.assertEqual(controller.gate.limit, 10)
+        self.assertEqual(controller.gate.max_wait, 0.5)
+        self.assertEqual(controller.route_gates, {})
+        self.assertEqual(controller.response.headers.get('Retry-After'),
+                         None)
+
+    def test_route_limits(self):
+        controller = self._callFUT(
+            {'admission_route_limits':'search=2\n  export=1'})
+        self.assertEqual(controller.gate, None)
+        self.assertEqual(controller.route_gates['search'].limit, 2)
+        self.assertEqual(controller.route_gates['export'].limit, 1)
+
+    def test_retry_after(self):
+        controller = self._callFUT({'admission_max_requests':'1',
+                                    'admission_retry_after':'30'})
+        self.assertEqual(controller.response.headers['Retry-After'], '30')
@@ -169,6 +169,46 @@ class TestACLAuthorizationPolicy(unittest.TestCase):
         result = sorted(policy.principals_allowed_by_permission(context,'read'))
         self.assertEqual(result, [])
 
+class TestACLAuthorizationPolicyWithRequest(TestACLAuthorizationPolicy):
+    def setUp(self):
+        from pyramid.threadlocal import manager
+        cleanUp()
+        self.request = DummyRequest()
+        manager.get()['request'] = self.request
+
+    def test_lineage_memoized_on_request(self):
+        from pyramid.security import Allow
+        from pyramid.security import Authenticated
+        root = DummyContext()
+        root.__acl__ = [(Allow, Authenticated, 'view')]
+        context = DummyContext(__parent__=root)
+        policy = self._makeOne()
+        self.failUnless(policy.permits(context, [Authenticated], 'view'))
+        self.assertEqual(
+            policy.principals_allowed_by_permission(context, 'view'),
+            set([Authenticated]))
+        self.assertEqual(self.request._lineages[id(context)][1],
+                         (context, root))
+
+    def test_context_moved_during_request(self):
+        from pyramid.security import Allow
+        from pyramid.security import Authenticated
+        public = DummyContext()
+        public.__acl__ = [(Allow, Authenticated, 'view')]
+        private = DummyContext()
+        private.__acl__ = []
+        context = DummyContext(__parent__=public)
+        policy = self._makeOne()
+        self.failUnless(policy.permits(context, [Authenticated], 'view'))
+        context.__parent__ = private
+        self.failIf(policy.permits(context, [Authenticated], 'view'))
+        self.assertEqual(
+            policy.principals_allowed_by_permission(context, 'view'),
+            set())
+
+class DummyRequest:
+    pass
+
 class DummyContext:
     def __init__(self, *arg, **kw):
         self.__dict__.update(kw)
@@ -0,0 +1,181 @@
+import unittest
+
+class TestBoundedCache(unittest.TestCase):
+    def _getTargetClass(self):
+        from pyramid.caches import BoundedCache
+        return BoundedCache
+
+    def _makeOne(self, name='cache', size=2):
+        return self._getTargetClass()(name, size)
+
+    def test_ctor(self):
+        cache = self._makeOne('name', 10)
+        self.assertEqual(cache.name, 'name')
+        self.assertEqual(cache.size, 10)
+        self.assertEqual(cache.stats(),
+                         {'size':10, 'length':0, 'hits':0, 'misses':0,
+                          'evictions':0})
+
+    def test_get_miss(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 0)
+
+    def test_put_and_get(self):
+        cache = self._makeOne()
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(cache.stats()['length'], 1)
+
+    def test_put_evicts(self):
+        cache = self._makeOne(size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('b', 3)
+        self.assertEqual(cache.evictions, 0)
+        cache.put('c', 4)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.stats()['length'], 2)
+        self.assertEqual(cache.get('c'), 4)
+
+    def test_resize(self):
+        cache = self._makeOne(size=2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.resize(5)
+        self.assertEqual(cache.stats(),
+                         {'size':5, 'length':0, 'hits':0, 'misses':0,
+                          'evictions':0})
+
+    def test_clear(self):
+        cache = self._makeOne(size=2)
+        cache.put('a', 1)
+        cache.get('b')
+        cache.clear()
+        self.assertEqual(cache.stats(),
+                         {'size':2, 'length':0, 'hits':0, 'misses':0,
+                          'evictions':0})
+
+class CacheRegistryTests(unittest.TestCase):
+    def setUp(self):
+        from pyramid import caches
+        self.saved = caches._caches.copy()
+        caches._caches.clear()
+
+    def tearDown(self):
+        from pyramid import caches
+        caches._caches.clear()
+        caches._caches.update(self.saved)
+
+class Test_register_cache(CacheRegistryTests):
+    def _callFUT(self, name, size):
+        from pyramid.caches import register_cache
+        return register_cache(name, size)
+
+    def test_new(self):
+        from pyramid.caches import BoundedCache
+        from pyramid.caches import _caches
+        cache = self._callFUT('name', 10)
+        self.failUnless(isinstance(cache, BoundedCache))
+        self.assertEqual(cache.size, 10)
+        self.failUnless(_caches['name'] is cache)
+
+    def test_existing(self):
+        cache = self._callFUT('name', 10)
+        self.failUnless(self._callFUT('name', 20) is cache)
+        self.assertEqual(cache.size, 10)
+
+class Test_get_cache(CacheRegistryTests):
+    def _callFUT(self, name):
+        from pyramid.caches import get_cache
+        return get_cache(name)
+
+    def test_it(self):
+        from pyramid.caches import register_cache
+        cache = register_cache('name', 10)
+        self.failUnless(self._callFUT('name') is cache)
+
+    def test_missing(self):
+        self.assertRaises(KeyError, self._callFUT, 'name')
+
+class Test_cache_stats(CacheRegistryTests):
+    def _callFUT(self):
+        from pyramid.caches import cache_stats
+        return cache_stats()
+
+    def test_it(self):
+        from pyramid.caches import register_cache
+        register_cache('one', 10).put('a', 1)
+        register_cache('two', 20).get('a')
+        self.assertEqual(self._callFUT(),
+                         {'one':{'size':10, 'length':1, 'hits':0,
+                                 'misses':0, 'evictions':0},
+                          'two':{'size':20, 'length':0, 'hits':0,
+                                 'misses':1, 'evictions':0}})
+
+class Test_configure_caches(CacheRegistryTests):
+    def _callFUT(self, settings):
+        from pyramid.caches import configure_caches
+        return configure_caches(settings)
+
+    def test_no_setting(self):
+        from pyramid.caches import _caches
+        self._callFUT({})
+        self.assertEqual(_caches, {})
+
+    def test_resize(self):
+        from pyramid.caches import register_cache
+        one = register_cache('one', 10)
+        one.put('a', 1)
+        two = register_cache('two', 20)
+        two.put('a', 1)
+        self._callFUT({'cache_sizes':'one=30\n  two=20'})
+        self.assertEqual(one.size, 30)
+        self.assertEqual(one.stats()['length'], 0)
+        self.assertEqual(two.stats()['length'], 1)
+
+    def test_not_yet_registered(self):
+        from pyramid.caches import register_cache
+        self._callFUT({'cache_sizes':'one=30'})
+        self.assertEqual(register_cache('one', 10).size, 30)
+
+class Test_cached(CacheRegistryTests):
+    def _callFUT(self, name, size):
+        from pyramid.caches import cached
+        return cached(name, size)
+
+    def test_it(self):
+        from pyramid.caches import get_cache
+        calls = []
+        def func(a, b):
+            """ doc """
+            calls.append((a, b))
+            return a + b
+        wrapper = self._callFUT('func', 10)(func)
+        self.assertEqual(wrapper.__name__, 'func')
+        self.assertEqual(wrapper.__doc__, ' doc ')
+        self.assertEqual(wrapper.__module__, func.__module__)
+        self.failUnless(wrapper.cache is get_cache('func'))
+        self.failUnless(wrapper.func is func)
+        self.assertEqual(wrapper(1, 2), 3)
+        self.assertEqual(wrapper(1, 2), 3)
+        self.assertEqual(wrapper(2, 2), 4)
+        self.assertEqual(calls, [(1, 2), (2, 2)])
+        self.assertEqual(wrapper.cache.hits, 1)
+        self.assertEqual(wrapper.cache.misses, 2)
+
+class TestPyramidCaches(unittest.TestCase):
+    def test_registered(self):
+        import pyramid.configuration
+        import pyramid.traversal
+        import pyramid.url
+        from pyramid.caches import cache_stats
+        stats = cache_stats()
+        for name in ('traversal_path', 'join_path_tuple', 'join_elements',
+                     'quote_path_segment', 'accept_negotiation',
+                     'accept_predicate'):
+            self.failUnless(name in stats)
@@ -8,6 +8,13 @@ except:
     __pypy__ = None
 
 class ConfiguratorTests(unittest.TestCase):
+    tempdir = None
+
+    def tearDown(self):
+        import shutil
+        if self.tempdir is not None:
+            shutil.rmtree(self.tempdir)
+
     def _makeOne(self, *arg, **kw):
         from pyramid.configuration import Configurator
         return Configurator(*arg, **kw)
@@ -251,6 +258,8 @@ class ConfiguratorTests(unittest.TestCase):
                 return events
             def registerUtility(self, *arg, **kw):
                 pass
+            def queryUtility(self, *arg, **kw):
+                pass
         reg = DummyRegistry()
         config = self._makeOne(reg)
         config.add_view = lambda *arg, **kw: False
@@ -265,6 +274,8 @@ class ConfiguratorTests(unittest.TestCase):
         class DummyRegistry(object):
             def registerUtility(self, *arg, **kw):
                 pass
+            def queryUtility(self, *arg, **kw):
+                pass
         reg = DummyRegistry()
         config = self._makeOne(reg)
         views = []
@@ -303,6 +314,56 @@ class ConfiguratorTests(unittest.TestCase):
         self.assertEqual(settings['debug_authorization'], False)
         self.assertEqual(settings['mysetting'], True)
 
+    def test_setup_registry_cache_sizes(self):
+        from pyramid.registry import Registry
+        from pyramid.caches import get_cache
+        cache = get_cache('traversal_path')
+        size = cache.size
+        reg = Registry()
+        config = self._makeOne(reg)
+        try:
+            config.setup_registry(
+                settings={'cache_sizes':'traversal_path=5'})
+            self.assertEqual(cache.size, 5)
+        finally:
+            cache.resize(size)
+
+    def test_setup_registry_no_cache_sizes(self):
+        from pyramid.registry import Registry
+        from pyramid.caches import get_cache
+        cache = get_cache('traversal_path')
+        cache.put('key', 'value')
+        reg = Registry()
+        config = self._makeOne(reg)
+        config.setup_registry()
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_setup_registry_background_task_threads(self):
+        import atexit
+        from pyramid.registry import Registry
+        from pyramid.interfaces import ITaskPool
+        reg = Registry()
+        config = self._makeOne(reg)
+        registered = []
+        original = atexit.register
+        atexit.register = registered.append
+        try:
+            config.setup_registry(
+                settings={'background_task_threads':'1'})
+        finally:
+            atexit.register = original
+        pool = reg.getUtility(ITaskPool)
+        pool.shutdown()
+        self.assertEqual(registered, [pool.shutdown])
+
+    def test_setup_registry_no_background_task_threads(self):
+        from pyramid.registry import Registry
+        from pyramid.interfaces import ITaskPool
+        reg = Registry()
+        config = self._makeOne(reg)
+        config.setup_registry()
+        self.assertEqual(reg.queryUtility(ITaskPool), None)
+
     def test_setup_registry_debug_logger_None_default(self):
         from pyramid.registry import Registry
         from pyramid.interfaces import IDebugLogger
@@ -585,6 +646,19 @@ class ConfiguratorTests(unittest.TestCase):
         self.assertEqual(len(subscriber), 1)
         self.failUnless(IApplicationCreated.providedBy(subscriber[0]))
 
+    def test_make_wsgi_app_specialize(self):
+        from pyramid.router import SpecializedRouter
+        from pyramid.interfaces import IApplicationCreated
+        manager = DummyThreadLocalManager()
+        config = self._makeOne()
+        subscriber = self._registerEventListener(config, IApplicationCreated)
+        config.manager = manager
+        app = config.make_wsgi_app(specialize=True)
+        self.assertEqual(app.__class__, SpecializedRouter)
+        self.failIf(app.handle_request is None)
+        self.assertEqual(len(subscriber), 1)
+        self.failUnless(IApplicationCreated.providedBy(subscriber[0]))
+
     def test_load_zcml_default(self):
         import pyramid.tests.fixtureapp
         config = self._makeOne(package=pyramid.tests.fixtureapp)
@@ -1341,6 +1415,294 @@ class ConfiguratorTests(unittest.TestCase):
         request.params = {'param':'1'}
         self.assertEqual(wrapper(ctx, request), 'view8')
 
+    def test_add_view_multiview_dispatch_by_request_method_and_xhr(self):
+        def get(context, request): return 'get'
+        def get_xhr(context, request): return 'get_xhr'
+        def post(context, request): return 'post'
+        def other(context, request): return 'other'
+        config = self._makeOne()
+        config.add_view(view=get, request_method='GET')
+        config.add_view(view=get_xhr, request_method='GET', xhr=True)
+        config.add_view(view=post, request_method='POST')
+        config.add_view(view=other)
+        wrapper = self._getViewCallable(config)
+        def views(method, xhr):
+            request = self._makeRequest(config)
+            request.method = method
+            request.is_xhr = xhr
+            return [ x[1](None, request) for x in
+                     wrapper.get_views(request) ]
+        self.assertEqual(views('GET', False), ['get', 'other'])
+        self.assertEqual(views('GET', True), ['get_xhr', 'get', 'other'])
+        self.assertEqual(views('POST', True), ['post', 'other'])
+        self.assertEqual(views('PUT', True), ['other'])
+        request = self._makeRequest(config)
+        request.method = 'GET'
+        request.is_xhr = True
+        self.assertEqual(wrapper(None, request), 'get_xhr')
+        request.is_xhr = False
+        self.assertEqual(wrapper(None, request), 'get')
+        config.add_view(view=get_xhr, name='', request_method='PUT')
+        self.assertEqual(views('PUT', False), ['get_xhr', 'other'])
+
+    def _assertSameViews(self, config, other):
+        # the views found by exact lookups for the triads registered by
+        # either configurator are the same
+        from pyramid.interfaces import IMultiView
+        keys = set()
+        for c in (config, other):
+            for reg in c.registry.registeredAdapters():
+                keys.add((reg.required, reg.provided, reg.name))
+        def views(c):
+            result = []
+            for required, provided, name in sorted(keys):
+                view = c.registry.adapters.registered(required, provided,
+                                                      name)
+                if IMultiView.providedBy(view):
+                    # views of the same order are sorted by identity
+                    view = sorted([ (x[0], x[1].__name__, x[2]) for x in
+                                    view.views ])
+                elif view is not None:
+                    view = view.__name__
+                result.append(view)
+            return result
+        self.assertEqual(views(config), views(other))
+
+    def _addViews(self, config):
+        def view1(context, request): return 'view1'
+        def view2(context, request): return 'view2'
+        def view3(context, request): return 'view3'
+        def view4(context, request): return 'view4'
+        def error(context, request): return 'error'
+        config.add_view(view=view1)
+        config.add_view(view=view2, name='two')
+        config.add_view(view=view3, request_method='POST')
+        config.add_view(view=view4, request_method='POST')
+        config.add_view(view=view4, request_method='GET', name='two')
+        config.add_view(view=error, context=RuntimeError)
+        config.add_view(view=error, context=RuntimeError, xhr=True)
+        config.add_view(view=view1, name='three', permission='view')
+        config.add_view(view=view2, name='three', permission='view')
+
+    def test_begin_bulk_commit_bulk(self):
+        sequential = self._makeOne()
+        self._registerSecurityPolicy(sequential, True)
+        self._addViews(sequential)
+        config = self._makeOne()
+        self._registerSecurityPolicy(config, True)
+        registered = []
+        def registerAdapter(*arg, **kw):
+            registered.append(arg)
+            return register(*arg, **kw)
+        register = config.registry.registerAdapter
+        config.registry.registerAdapter = registerAdapter
+        config.begin_bulk()
+        self._addViews(config)
+        self.assertEqual(self._getViewCallable(config), None)
+        self.assertEqual(registered, [])
+        config.commit_bulk()
+        self.failIf(hasattr(config.registry, 'pending_views'))
+        self._assertSameViews(config, sequential)
+        # one view or multiview per triad, and per exception triad
+        self.assertEqual(len(registered), 5)
+
+    def test_begin_bulk_existing_views(self):
+        sequential = self._makeOne()
+        config = self._makeOne()
+        def view(context, request): return 'view'
+        for c in (sequential, config):
+            c.add_view(view=view, request_method='PUT')
+            c.add_view(view=view, request_method='PUT', name='two')
+            c.add_view(view=view, request_method='GET', name='two')
+        self._addViews(sequential)
+        config.begin_bulk()
+        self._addViews(config)
+        config.commit_bulk()
+        self._assertSameViews(config, sequential)
+        wrapper = self._getViewCallable(config)
+        request = self._makeRequest(config)
+        request.method = 'POST'
+        # view4 overrides view3, which has the same predicates
+        self.assertEqual(wrapper(None, request), 'view4')
+
+    def test_begin_bulk_nested(self):
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        config.begin_bulk()
+        config.begin_bulk()
+        config.add_view(view=view)
+        config.commit_bulk()
+        self.assertEqual(self._getViewCallable(config), None)
+        config.commit_bulk()
+        wrapper = self._getViewCallable(config)
+        self.assertEqual(wrapper(None, None), 'OK')
+
+    def test_begin_bulk_route_views(self):
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        config.begin_bulk()
+        config.add_route('name', 'path', view=view)
+        request_iface = self._getRouteRequestIface(config, 'name')
+        self.failIf(request_iface is None)
+        self.assertEqual(
+            self._getViewCallable(config, request_iface=request_iface), None)
+        config.commit_bulk()
+        wrapper = self._getViewCallable(config, request_iface=request_iface)
+        self.assertEqual(wrapper(None, None), 'OK')
+
+    def test_commit_bulk_not_begun(self):
+        from pyramid.exceptions import ConfigurationError
+        config = self._makeOne()
+        self.assertRaises(ConfigurationError, config.commit_bulk)
+
+    def test_bulk(self):
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        bulk = config.bulk()
+        self.failUnless(bulk.__enter__() is config)
+        config.add_view(view=view)
+        self.assertEqual(bulk.__exit__(None, None, None), False)
+        wrapper = self._getViewCallable(config)
+        self.assertEqual(wrapper(None, None), 'OK')
+
+    def test_bulk_exception(self):
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        bulk = config.bulk()
+        bulk.__enter__()
+        config.add_view(view=view)
+        self.assertEqual(bulk.__exit__(ValueError, ValueError(), None),
+                         False)
+        self.failIf(hasattr(config.registry, 'pending_views'))
+        self.assertEqual(self._getViewCallable(config), None)
+
+    def test_bulk_nested_exception(self):
+        def view1(context, request): return 'view1'
+        def view2(context, request): return 'view2'
+        def view3(context, request): return 'view3'
+        config = self._makeOne()
+        config.begin_bulk()
+        config.add_view(view=view1)
+        bulk = config.bulk()
+        bulk.__enter__()
+        config.add_view(view=view2, request_method='POST')
+        config.add_view(view=view3, name='three')
+        self.assertEqual(bulk.__exit__(ValueError, ValueError(), None),
+                         False)
+        config.add_view(view=view3, name='other')
+        config.commit_bulk()
+        self.failIf(hasattr(config.registry, 'pending_views'))
+        wrapper = self._getViewCallable(config)
+        request = self._makeRequest(config)
+        request.method = 'POST'
+        self.assertEqual(wrapper(None, request), 'view1')
+        self.failIf(hasattr(wrapper, 'views'))
+        self.assertEqual(self._getViewCallable(config, name='three'), None)
+        wrapper = self._getViewCallable(config, name='other')
+        self.assertEqual(wrapper(None, request), 'view3')
+
+    def _tempFilename(self):
+        import os
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+        return os.path.join(self.tempdir, 'file')
+
+    def test_snapshot_written_and_read(self):
+        from pyramid.snapshot import read_snapshot
+        filename = self._tempFilename()
+        def configure(config):
+            config.add_route('home', '/', view=dummy_view)
+            other = config.with_package('pyramid.tests')
+            other.add_view(dummy_view, name='name', _info='info')
+        config = self._makeOne(settings={'a':'1'})
+        self.assertEqual(config.snapshot(filename, configure), False)
+        self.failIf(hasattr(config.registry, 'configuration_recorder'))
+        self.failIf('add_view' in config.__dict__)
+        self.assertEqual(
+            read_snapshot(filename, config.registry.settings),
+            [('pyramid.tests', 'add_route', ('home', '/'),
+              {'view':dummy_view}),
+             ('pyramid.tests', 'add_view', (dummy_view,), {'name':'name'})])
+        def fail(config): # pragma: no cover
+            raise AssertionError
+        config = self._makeOne(settings={'a':'1'})
+        self.assertEqual(config.snapshot(filename, fail), True)
+        self.failIf(hasattr(config.registry, 'pending_views'))
+        mapper = config.get_routes_mapper()
+        self.assertEqual([route.name for route in mapper.get_routes()],
+                         ['home'])
+        request_iface = self._getRouteRequestIface(config, 'home')
+        self.failIf(self._getViewCallable(
+            config, request_iface=request_iface) is None)
+        self.failIf(self._getViewCallable(config, name='name') is None)
+
+    def test_snapshot_root_factory(self):
+        from pyramid.interfaces import IRootFactory
+        filename = self._tempFilename()
+        def configure(config):
+            config.setup_registry(root_factory=dummyfactory)
+        config = self._makeOne()
+        self.assertEqual(config.snapshot(filename, configure), False)
+        self.assertEqual(config.registry.getUtility(IRootFactory),
+                         dummyfactory)
+        def fail(config): # pragma: no cover
+            raise AssertionError
+        config = self._makeOne()
+        self.assertEqual(config.snapshot(filename, fail), True)
+        self.assertEqual(config.registry.getUtility(IRootFactory),
+                         dummyfactory)
+
+    def test_snapshot_stale(self):
+        filename = self._tempFilename()
+        calls = []
+        def configure(config):
+            calls.append(config)
+            config.add_view(dummy_view)
+        self.assertEqual(self._makeOne(settings={'a':'1'}).snapshot(
+            filename, configure), False)
+        config = self._makeOne(settings={'a':'2'})
+        self.assertEqual(config.snapshot(filename, configure), False)
+        self.assertEqual(len(calls), 2)
+        self.failIf(self._getViewCallable(config) is None)
+
+    def test_snapshot_unpicklable(self):
+        import os
+        from pyramid.interfaces import IDebugLogger
+        filename = self._tempFilename()
+        config = self._makeOne()
+        logger = DummyLogger()
+        config.registry.registerUtility(logger, IDebugLogger)
+        def configure(config):
+            config.add_view(lambda *arg: 'OK')
+        self.assertEqual(config.snapshot(filename, configure), False)
+        self.failIf(os.path.exists(filename))
+        self.assertEqual(len(logger.messages), 1)
+        self.failIf(self._getViewCallable(config) is None)
+
+    def test_snapshot_configure_raises(self):
+        import os
+        filename = self._tempFilename()
+        config = self._makeOne()
+        def configure(config):
+            config.add_view(dummy_view)
+            raise ValueError
+        self.assertRaises(ValueError, config.snapshot, filename, configure)
+        self.failIf(hasattr(config.registry, 'configuration_recorder'))
+        self.failIf('add_view' in config.__dict__)
+        self.failIf(os.path.exists(filename))
+
+    def test_snapshot_replay_raises(self):
+        from pyramid.snapshot import ConfigurationRecorder
+        filename = self._tempFilename()
+        recorder = ConfigurationRecorder()
+        recorder.record('pyramid.tests', 'add_view', (dummy_view,), {})
+        recorder.record('pyramid.tests', 'add_route', (), {})
+        config = self._makeOne()
+        recorder.save(filename, config.registry.settings)
+        self.assertRaises(TypeError, config.snapshot, filename, None)
+        self.failIf(hasattr(config.registry, 'pending_views'))
+        self.assertEqual(self._getViewCallable(config), None)
+
     def test_add_view_with_template_renderer(self):
         import pyramid.tests
         from pyramid.interfaces import ISettings
@@ -1612,6 +1974,24 @@ class ConfiguratorTests(unittest.TestCase):
         request.accept = ['text/html']
         self._assertNotFound(wrapper, None, request)
 
+    def test_add_view_with_accept_cached_by_header(self):
+        from pyramid.configuration import _accept_cache
+        _accept_cache.clear()
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        config.add_view(view=view, accept='text/xml')
+        wrapper = self._getViewCallable(config)
+        request = self._makeRequest(config)
+        request.environ['HTTP_ACCEPT'] = 'text/xml'
+        request.accept = ['text/xml']
+        self.assertEqual(wrapper(None, request), 'OK')
+        request = self._makeRequest(config)
+        request.environ['HTTP_ACCEPT'] = 'text/xml'
+        request.accept = []
+        self.assertEqual(wrapper(None, request), 'OK')
+        self.assertEqual(_accept_cache.hits, 1)
+        _accept_cache.clear()
+
     def test_add_view_with_containment_true(self):
         from zope.interface import directlyProvides
         view = lambda *arg: 'OK'
@@ -1630,6 +2010,20 @@ class ConfiguratorTests(unittest.TestCase):
         context = DummyContext()
         self._assertNotFound(wrapper, context, None)
 
+    def test_add_view_with_containment_memoized_on_request(self):
+        from zope.interface import directlyProvides
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        config.add_view(view=view, containment=IDummy)
+        wrapper = self._getViewCallable(config)
+        root = DummyContext()
+        directlyProvides(root, IDummy)
+        context = DummyContext()
+        context.__parent__ = root
+        request = DummyRequest()
+        self.assertEqual(wrapper(context, request), 'OK')
+        self.assertEqual(request._lineages[id(context)][2], {IDummy:root})
+
     def test_add_view_with_containment_dottedname(self):
         from zope.interface import directlyProvides
         view = lambda *arg: 'OK'
@@ -2041,6 +2435,28 @@ class ConfiguratorTests(unittest.TestCase):
         mapper = config.get_routes_mapper()
         self.assertEqual(mapper.routelist, [])
 
+    def test_get_routes_mapper_linear(self):
+        from pyramid.urldispatch import RoutesMapper
+        config = self._makeOne(settings={'route_dispatch':'linear'})
+        mapper = config.get_routes_mapper()
+        self.assertEqual(mapper.__class__, RoutesMapper)
+
+    def test_get_routes_mapper_indexed(self):
+        from pyramid.urldispatch import IndexedRoutesMapper
+        config = self._makeOne(settings={'route_dispatch':'indexed'})
+        mapper = config.get_routes_mapper()
+        self.assertEqual(mapper.__class__, IndexedRoutesMapper)
+
+    def test_get_routes_mapper_match_cache_size(self):
+        config = self._makeOne(settings={'route_match_cache_size':'100'})
+        mapper = config.get_routes_mapper()
+        self.assertEqual(mapper.cache.size, 100)
+
+    def test_get_routes_mapper_unknown_dispatch(self):
+        from pyramid.exceptions import ConfigurationError
+        config = self._makeOne(settings={'route_dispatch':'wrong'})
+        self.assertRaises(ConfigurationError, config.get_routes_mapper)
+
     def test_get_routes_mapper_already_registered(self):
         from pyramid.interfaces import IRoutesMapper
         config = self._makeOne()
@@ -2459,6 +2875,21 @@ class ConfiguratorTests(unittest.TestCase):
         self.assertEqual(config.registry.getUtility(IRequestFactory),
                          dummyfactory)
 
+    def test_set_request_timer(self):
+        from pyramid.interfaces import IRequestTimer
+        config = self._makeOne()
+        timer = object()
+        config.set_request_timer(timer)
+        self.assertEqual(config.registry.getUtility(IRequestTimer), timer)
+
+    def test_set_request_timer_dottedname(self):
+        from pyramid.interfaces import IRequestTimer
+        config = self._makeOne()
+        config.set_request_timer(
+            'pyramid.tests.test_configuration.dummyfactory')
+        self.assertEqual(config.registry.getUtility(IRequestTimer),
+                         dummyfactory)
+
     def test_set_renderer_globals_factory(self):
         from pyramid.interfaces import IRendererGlobalsFactory
         config = self._makeOne()
@@ -2890,6 +3321,89 @@ class ConfiguratorTests(unittest.TestCase):
         self.assertRaises(NotFound, result, None, None)
         self.assertEqual(predicates, [True, True])
 
+    def test__derive_view_all_stages_flattened(self):
+        from pyramid.exceptions import Forbidden
+        from pyramid.exceptions import NotFound
+        from pyramid.interfaces import IAuthenticationPolicy
+        from pyramid.interfaces import IAuthorizationPolicy
+        calls = []
+        def view(context, request):
+            calls.append('view')
+            return 'OK'
+        def predicate(context, request):
+            calls.append('predicate')
+            return request.method == 'GET'
+        class Policy(DummySecurityPolicy):
+            def permits(self, context, principals, permission):
+                calls.append('permits')
+                return self.permitted
+        policy = Policy()
+        config = self._makeOne()
+        self._registerSettings(config, debug_authorization=True)
+        self._registerLogger(config)
+        config.registry.registerUtility(policy, IAuthenticationPolicy)
+        config.registry.registerUtility(policy, IAuthorizationPolicy)
+        result = config._derive_view(view, permission='view',
+                                     predicates=[predicate],
+                                     accept='text/html', order=10,
+                                     phash='abc')
+        # the stages are performed by one function which calls the view
+        self.failUnless(result.__call_permissive__ is view)
+        self.assertEqual(result.func_code.co_name, 'derived_view')
+        self.assertEqual(result.__accept__, 'text/html')
+        self.assertEqual(result.__order__, 10)
+        self.assertEqual(result.__phash__, 'abc')
+        request = self._makeRequest(config)
+        request.method = 'GET'
+        self.assertEqual(result(None, request), 'OK')
+        # debug_authorization and the permission share one check
+        self.assertEqual(calls, ['predicate', 'permits', 'view'])
+        policy.permitted = False
+        self.assertRaises(Forbidden, result, None, request)
+        request.method = 'POST'
+        self.assertRaises(NotFound, result, None, request)
+
+    def test__derive_view_predicates_and_permission(self):
+        from pyramid.exceptions import Forbidden
+        from pyramid.exceptions import NotFound
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        self._registerSecurityPolicy(config, True)
+        predicate = lambda context, request: request.method == 'GET'
+        result = config._derive_view(view, permission='view',
+                                     predicates=[predicate])
+        self.failUnless(result.__call_permissive__ is view)
+        request = self._makeRequest(config)
+        request.method = 'GET'
+        self.assertEqual(result(None, request), 'OK')
+        request.method = 'POST'
+        self.assertRaises(NotFound, result, None, request)
+        self._registerSecurityPolicy(config, False)
+        result = config._derive_view(view, permission='view',
+                                     predicates=[predicate])
+        request.method = 'GET'
+        self.assertRaises(Forbidden, result, None, request)
+
+    def test__derive_view_accept_only(self):
+        view = lambda *arg: 'OK'
+        config = self._makeOne()
+        result = config._derive_view(view, accept='text/html')
+        self.failIf(result is view)
+        self.assertEqual(result.__accept__, 'text/html')
+        self.failIf(hasattr(result, '__call_permissive__'))
+        self.failIf(hasattr(result, '__predicated__'))
+        self.assertEqual(result(None, None), 'OK')
+
+    def test__derive_view_view_attributes_take_precedence(self):
+        def view(context, request):
+            """ """
+        def predicated(context, request):
+            """ """
+        view.__predicated__ = predicated
+        config = self._makeOne()
+        result = config._derive_view(view, predicates=[lambda *arg: True])
+        self.failUnless(result.__predicated__ is predicated)
+
     def test__derive_view_with_wrapper_viewname(self):
         from webob import Response
         from pyramid.interfaces import IView
@@ -3094,6 +3608,52 @@ class ConfiguratorTests(unittest.TestCase):
         result = render_view_to_response(ctx, req, '')
         self.assertEqual(result, 'grokked')
 
+    def _scanAndRender(self, config):
+        from zope.interface import alsoProvides
+        from pyramid.interfaces import IRequest
+        from pyramid.view import render_view_to_response
+        config.scan('pyramid.tests.grokkedapp')
+        req = DummyRequest()
+        alsoProvides(req, IRequest)
+        req.registry = config.registry
+        req.method = 'GET'
+        return (render_view_to_response(DummyContext(), req, ''),
+                render_view_to_response(DummyContext(), req,
+                                        'subsubpackage_init'))
+
+    def test_scan_debug_scan(self):
+        from pyramid.interfaces import IDebugLogger
+        config = self._makeOne(settings={'debug_scan':'true'})
+        logger = DummyLogger()
+        config.registry.registerUtility(logger, IDebugLogger)
+        self.assertEqual(self._scanAndRender(config),
+                         ('grokked', 'subsubpackage_init'))
+        prefix = 'debug_scan: imported and scanned module '
+        names = []
+        for message in logger.messages:
+            self.failUnless(message.startswith(prefix))
+            self.failUnless(message.endswith(' ms'))
+            names.append(message[len(prefix):].split()[0])
+        names.sort()
+        self.assertEqual(names,
+                         ['pyramid.tests.grokkedapp',
+                          'pyramid.tests.grokkedapp.another',
+                          'pyramid.tests.grokkedapp.subpackage',
+                          'pyramid.tests.grokkedapp.subpackage.notinit',
+                          'pyramid.tests.grokkedapp.subpackage.'
+                          'subsubpackage'])
+
+    def test_scan_scan_cache(self):
+        from pyramid.scanning import ScanCache
+        filename = self._tempFilename()
+        config = self._makeOne(settings={'scan_cache':filename})
+        self.assertEqual(self._scanAndRender(config),
+                         ('grokked', 'subsubpackage_init'))
+        self.assertEqual(len(ScanCache(filename).modules), 5)
+        config = self._makeOne(settings={'scan_cache':filename})
+        self.assertEqual(self._scanAndRender(config),
+                         ('grokked', 'subsubpackage_init'))
+
     def test_testing_securitypolicy(self):
         from pyramid.testing import DummySecurityPolicy
         config = self._makeOne()
@@ -3615,6 +4175,7 @@ class Test_decorate_view(unittest.TestCase):
                 """ """
             def __permitted__(self, context, request):
                 """ """
+            __discriminators__ = {'xhr':True}
         view1 = DummyView1()
         view2 = DummyView2()
         result = self._callFUT(view1, view2)
@@ -3628,12 +4189,21 @@ class Test_decorate_view(unittest.TestCase):
                         view2.__permitted__.im_func)
         self.failUnless(view1.__predicated__.im_func is
                         view2.__predicated__.im_func)
+        self.failUnless(view1.__discriminators__ is
+                        view2.__discriminators__)
 
 class Test__make_predicates(unittest.TestCase):
     def _callFUT(self, **kw):
         from pyramid.configuration import _make_predicates
         return _make_predicates(**kw)
 
+    def test_discriminators(self):
+        _, predicates, _ = self._callFUT(xhr=True, request_method='GET',
+                                         request_param='abc')
+        self.assertEqual([getattr(p, '__discriminator__', None)
+                          for p in predicates],
+                         [('xhr', True), ('request_method', 'GET'), None])
+
     def test_ordering_xhr_and_request_method_trump_only_containment(self):
         order1, _, _ = self._callFUT(xhr=True, request_method='GET')
         order2, _, _ = self._callFUT(containment=True)
@@ -3838,6 +4408,92 @@ class Test__make_predicates(unittest.TestCase):
         self.assertEqual(info, {'match':
                                 {'a':'a', 'b':'b', 'traverse':('1', 'a', 'b')}})
 
+    def test_predicates_interned(self):
+        _, predicates1, _ = self._callFUT(request_method='GET',
+                                          header='X-Foo:a.*')
+        _, predicates2, _ = self._callFUT(request_method='GET',
+                                          header='X-Foo:a.*')
+        _, predicates3, _ = self._callFUT(request_method='POST')
+        self.failUnless(predicates1[0] is predicates2[0])
+        self.failUnless(predicates1[1] is predicates2[1])
+        self.failIf(predicates1[0] is predicates3[0])
+
+    def test_predicate_results_memoized_per_request(self):
+        _, predicates1, _ = self._callFUT(request_method='GET')
+        _, predicates2, _ = self._callFUT(request_method='GET',
+                                          request_param='abc')
+        request = DummyRequest()
+        request.method = 'POST'
+        self.assertEqual(predicates1[0](None, request), False)
+        self.assertEqual(predicates2[0](None, request), False)
+        self.assertEqual(request._predicate_results,
+                         {("request_method:'GET'", 'POST'):False})
+
+    def test_predicate_results_follow_request_changes(self):
+        _, predicates, _ = self._callFUT(request_method='GET',
+                                         request_param='abc=1',
+                                         header='X-Foo', path_info='/a')
+        request = DummyRequest()
+        request.method = 'POST'
+        request.params = {}
+        request.headers = {}
+        request.path_info = '/b'
+        for predicate in predicates:
+            self.assertEqual(predicate(None, request), False)
+        request.method = 'GET'
+        request.params = {'abc':'1'}
+        request.headers = {'X-Foo':'bar'}
+        request.path_info = '/a'
+        for predicate in predicates:
+            self.assertEqual(predicate(None, request), True)
+
+class Test__intern_predicate(unittest.TestCase):
+    def setUp(self):
+        from pyramid.configuration import _interned_predicates
+        self.saved = _interned_predicates.copy()
+
+    def tearDown(self):
+        from pyramid.configuration import _interned_predicates
+        _interned_predicates.clear()
+        _interned_predicates.update(self.saved)
+
+    def _callFUT(self, key, value, test, discriminator=None):
+        from pyramid.configuration import _intern_predicate
+        return _intern_predicate(key, value, test, discriminator)
+
+    def test_it(self):
+        calls = []
+        def value(request):
+            return request.value
+        def test(value):
+            calls.append(value)
+            return len(calls)
+        interned = self._callFUT('key', value, test, ('xhr', True))
+        self.failUnless(self._callFUT('key', None, None) is interned)
+        self.assertEqual(interned.__discriminator__, ('xhr', True))
+        request1 = DummyRequest()
+        request1.value = 'a'
+        request2 = DummyRequest()
+        request2.value = 'a'
+        self.assertEqual(interned(None, request1), 1)
+        self.assertEqual(interned(None, request1), 1)
+        self.assertEqual(interned(None, request2), 2)
+        request1.value = 'b'
+        self.assertEqual(interned(None, request1), 3)
+        self.assertEqual(calls, ['a', 'a', 'b'])
+
+    def test_no_discriminator(self):
+        interned = self._callFUT('key', None, None)
+        self.failIf(hasattr(interned, '__discriminator__'))
+
+    def test_unhashable_value(self):
+        def value(request):
+            return []
+        interned = self._callFUT('key', value, len)
+        request = DummyRequest()
+        self.assertEqual(interned(None, request), 0)
+        self.assertEqual(request._predicate_results, {})
+
 class TestMultiView(unittest.TestCase):
     def _getTargetClass(self):
         from pyramid.configuration import MultiView
@@ -3919,6 +4575,60 @@ class TestMultiView(unittest.TestCase):
         mv.views = [(99, lambda *arg: None)]
         self.assertEqual(mv.get_views(request), mv.views)
 
+    def test_get_views_dispatched(self):
+        def view(context, request):
+            """ """
+        get_view = DummyDiscriminatedView(request_method='GET')
+        xhr_view = DummyDiscriminatedView(xhr=True)
+        html_view = DummyDiscriminatedView(request_method='POST')
+        mv = self._makeOne()
+        mv.add(view, 100)
+        mv.add(get_view, 99)
+        mv.add(xhr_view, 98)
+        mv.add(html_view, 97, 'text/html')
+        request = DummyRequest()
+        request.method = 'GET'
+        request.is_xhr = False
+        self.assertEqual([x[1] for x in mv.get_views(request)],
+                         [get_view, view])
+        request.accept = DummyAccept('text/html')
+        request.method = 'POST'
+        request.is_xhr = True
+        self.assertEqual([x[1] for x in mv.get_views(request)],
+                         [html_view, xhr_view, view])
+        self.assertEqual(sorted(mv.dispatch[None][2].keys()),
+                         [(None, True), ('GET', False)])
+        request.method = 'PUT'
+        request.is_xhr = False
+        self.assertEqual([x[1] for x in mv.get_views(request)], [view])
+        mv.add(view, 96)
+        self.assertEqual(mv.dispatch, {})
+
+    def test_get_views_negotiation_cached_by_header(self):
+        def view(context, request):
+            """ """
+        def html_view(context, request):
+            """ """
+        mv = self._makeOne()
+        mv.add(view, 100, phash='abc')
+        mv.add(html_view, 100, 'text/html')
+        request = DummyRequest()
+        request.environ['HTTP_ACCEPT'] = 'text/html'
+        request.accept = DummyAccept('text/html')
+        self.assertEqual([x[1] for x in mv.get_views(request)],
+                         [html_view, view])
+        request.accept = DummyAccept()
+        self.assertEqual([x[1] for x in mv.get_views(request)],
+                         [html_view, view])
+        mv.add(view, 100, phash='abc')
+        self.assertEqual([x[1] for x in mv.get_views(request)], [view])
+
+    def test_get_views_dispatched_request_without_method(self):
+        view = DummyDiscriminatedView(request_method='GET')
+        mv = self._makeOne()
+        mv.add(view, 100)
+        self.assertEqual(mv.get_views(DummyRequest()), [])
+
     def test_match_not_found(self):
         from pyramid.exceptions import NotFound
         mv = self._makeOne()
@@ -4473,6 +5183,12 @@ class DummyAccept(object):
     def __contains__(self, val):
         return val in self.matches
 
+class DummyDiscriminatedView(object):
+    def __init__(self, **discriminators):
+        self.__discriminators__ = discriminators
+    def __call__(self, context, request):
+        """ """
+
 from zope.interface import implements
 from pyramid.interfaces import IMultiView
 class DummyMultiView:
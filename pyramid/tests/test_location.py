@@ -33,6 +33,97 @@ class TestLineage(unittest.TestCase):
         result = list(self._callFUT(o1))
         self.assertEqual(result, [o1])
 
+class TestRequestLineage(unittest.TestCase):
+    def _callFUT(self, context, request):
+        from pyramid.location import request_lineage
+        return request_lineage(context, request)
+
+    def test_memoized(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        o3 = Location(); o3.__parent__ = o2
+        request = DummyRequest()
+        result = self._callFUT(o3, request)
+        self.assertEqual(result, (o3, o2, o1))
+        self.failUnless(self._callFUT(o3, request) is result)
+
+    def test_model_moved(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        o3 = Location(); o3.__parent__ = o2
+        request = DummyRequest()
+        self._callFUT(o3, request)
+        o3.__parent__ = o1
+        self.assertEqual(self._callFUT(o3, request), (o3, o1))
+
+    def test_ancestor_moved(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        o3 = Location(); o3.__parent__ = o2
+        request = DummyRequest()
+        self._callFUT(o3, request)
+        o2.__parent__ = None
+        # only the parent of the model itself is checked
+        self.assertEqual(self._callFUT(o3, request), (o3, o2, o1))
+        from pyramid.location import forget_request_lineages
+        forget_request_lineages(request)
+        self.assertEqual(self._callFUT(o3, request), (o3, o2))
+
+    def test_root_attached(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        request = DummyRequest()
+        self._callFUT(o2, request)
+        o0 = Location()
+        o1.__parent__ = o0
+        self.assertEqual(self._callFUT(o1, request), (o1, o0))
+
+    def test_parents_memoized(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        o3 = Location(); o3.__parent__ = o2
+        request = DummyRequest()
+        result = self._callFUT(o3, request)
+        self.assertEqual(self._callFUT(o2, request), (o2, o1))
+        self.assertEqual(self._callFUT(o1, request), (o1,))
+        self.assertEqual(request._lineages[id(o2)][1], result[1:])
+
+    def test_parents_not_overwritten(self):
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        request = DummyRequest()
+        result = self._callFUT(o2, request)
+        o3 = Location(); o3.__parent__ = o2
+        self._callFUT(o3, request)
+        self.failUnless(self._callFUT(o2, request) is result)
+
+    def test_other_model_with_same_id(self):
+        o1 = Location()
+        request = DummyRequest()
+        o2 = Location()
+        request._lineages = {id(o2):(o1, (o1,), {})}
+        self.assertEqual(self._callFUT(o2, request), (o2,))
+
+class TestForgetRequestLineages(unittest.TestCase):
+    def _callFUT(self, request):
+        from pyramid.location import forget_request_lineages
+        return forget_request_lineages(request)
+
+    def test_it(self):
+        from pyramid.location import request_lineage
+        o1 = Location()
+        o2 = Location(); o2.__parent__ = o1
+        request = DummyRequest()
+        self._callFUT(request)
+        request_lineage(o2, request)
+        o2.__parent__ = None
+        self._callFUT(request)
+        self.failIf('_lineages' in request.__dict__)
+        self.assertEqual(request_lineage(o2, request), (o2,))
+
+class DummyRequest:
+    pass
+
 from pyramid.interfaces import ILocation
 from zope.interface import implements
 class Location(object):
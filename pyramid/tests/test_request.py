@@ -241,6 +241,16 @@ class TestRequest(unittest.TestCase):
         self.assertEqual(inst.called2, True)
         self.assertEqual(inst.finished_callbacks, [])
 
+    def test_add_background_task(self):
+        inst = self._makeOne({})
+        self.assertEqual(inst.background_tasks, ())
+        def task(request):
+            """ """
+        inst.add_background_task(task)
+        self.assertEqual(inst.background_tasks, [task])
+        inst.add_background_task(task)
+        self.assertEqual(inst.background_tasks, [task, task])
+
     def test_model_url(self):
         self._registerContextURL()
         inst = self._makeOne({})
@@ -27,6 +27,11 @@ class TestRouter(unittest.TestCase):
             self.registry.registerUtility(mapper, IRoutesMapper)
         mapper.connect(name, path, factory)
 
+    def _getRoute(self, name):
+        from pyramid.interfaces import IRoutesMapper
+        mapper = self.registry.getUtility(IRoutesMapper)
+        return mapper.get_route(name)
+
     def _registerLogger(self):
         from pyramid.interfaces import IDebugLogger
         logger = DummyLogger()
@@ -125,6 +130,142 @@ class TestRouter(unittest.TestCase):
         router = self._makeOne()
         self.assertEqual(router.request_factory, DummyRequestFactory)
 
+    def test_request_timer(self):
+        from pyramid.interfaces import IRequestTimer
+        timer = DummyRequestTimer()
+        self.registry.registerUtility(timer, IRequestTimer)
+        router = self._makeOne()
+        self.assertEqual(router.request_timer, timer)
+
+    def test_admission_default(self):
+        self._registerSettings()
+        router = self._makeOne()
+        self.assertEqual(router.admission, None)
+
+    def test_admission_settings(self):
+        self._registerSettings(admission_max_requests='3')
+        router = self._makeOne()
+        self.assertEqual(router.admission.gate.limit, 3)
+
+    def test_cache_sizes_setting_ignored(self):
+        from pyramid.caches import get_cache
+        cache = get_cache('traversal_path')
+        size = cache.size
+        self._registerSettings(cache_sizes='traversal_path=5')
+        self._makeOne()
+        self.assertEqual(cache.size, size)
+
+    def test_task_pool(self):
+        from pyramid.interfaces import ITaskPool
+        pool = object()
+        self.registry.registerUtility(pool, ITaskPool)
+        router = self._makeOne()
+        self.assertEqual(router.task_pool, pool)
+
+    def test_task_pool_setting_ignored(self):
+        from pyramid.interfaces import ITaskPool
+        self._registerSettings(background_task_threads='1')
+        router = self._makeOne()
+        self.assertEqual(router.task_pool, None)
+        self.assertEqual(self.registry.queryUtility(ITaskPool), None)
+
+    def test_bind_route_views_default(self):
+        self._registerSettings()
+        router = self._getTargetClass()(self.registry)
+        self.assertEqual(router.bind_route_views, False)
+
+    def test_bind_route_views_setting(self):
+        self._registerSettings(bind_route_views='true')
+        router = self._makeOne()
+        self.assertEqual(router.bind_route_views, True)
+
+    def test_view_lookup_cache_default(self):
+        self._registerSettings()
+        router = self._getTargetClass()(self.registry)
+        self.assertEqual(router.view_lookup_cache, None)
+
+    def test_view_lookup_cache_setting(self):
+        self._registerSettings(view_lookup_cache_size='10')
+        router = self._getTargetClass()(self.registry)
+        self.assertEqual(router.view_lookup_cache.adapters,
+                         self.registry.adapters)
+        self.assertEqual(router.view_lookup_cache.cache.size, 10)
+
+    def test_bind_route(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (req_iface, view))
+        self.assertEqual(route.binding[1:], (req_iface, view))
+
+    def test_bind_route_cached(self):
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        route.binding = (
+            (self.registry.adapters._generation,
+             self.registry.utilities._generation), 'iface', 'view')
+        self.assertEqual(router.bind_route(route), ('iface', 'view'))
+
+    def test_bind_route_registry_changed(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (req_iface, None))
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        self.assertEqual(router.bind_route(route), (req_iface, view))
+
+    def test_bind_route_no_route_request(self):
+        from pyramid.interfaces import IRequest
+        from pyramid.interfaces import IViewClassifier
+        self._connectRoute('foo', 'archives/:action/:article')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, IRequest, None)
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (IRequest, view))
+
+    def test_bind_route_with_factory(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article',
+                           factory=DummyRootFactory(None))
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (req_iface, None))
+
+    def test_bind_route_with_root_factory(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        self._registerRootFactory(DummyContext())
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (req_iface, None))
+
+    def test_bind_route_with_traverser(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        self._registerTraverserFactory(DummyContext())
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        router = self._makeOne()
+        route = self._getRoute('foo')
+        self.assertEqual(router.bind_route(route), (req_iface, None))
+
     def test_call_traverser_default(self):
         from pyramid.exceptions import NotFound
         environ = self._makeEnviron()
@@ -491,6 +632,205 @@ class TestRouter(unittest.TestCase):
         self.assertEqual(len(router.threadlocal_manager.pushed), 1)
         self.assertEqual(len(router.threadlocal_manager.popped), 1)
 
+    def _registerRequestTimer(self):
+        from pyramid.interfaces import IRequestTimer
+        timer = DummyRequestTimer()
+        self.registry.registerUtility(timer, IRequestTimer)
+        return timer
+
+    def test_call_request_timer_traversal(self):
+        from pyramid.interfaces import IViewClassifier
+        timer = self._registerRequestTimer()
+        context = DummyContext()
+        self._registerTraverserFactory(context, view_name='foo')
+        view = DummyView(DummyResponse())
+        self._registerView(view, 'foo', IViewClassifier, None, None)
+        router = self._makeOne()
+        router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(len(timer.calls), 1)
+        route_name, view_name, timings = timer.calls[0]
+        self.assertEqual(route_name, None)
+        self.assertEqual(view_name, 'foo')
+        self.assertEqual([phase for phase, timestamp in timings],
+                         ['start', 'new_request', 'root_factory',
+                          'traversal', 'view_lookup', 'view',
+                          'response_callbacks', 'finished_callbacks'])
+        timestamps = [timestamp for phase, timestamp in timings]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_call_request_timer_route(self):
+        from pyramid.interfaces import IViewClassifier
+        timer = self._registerRequestTimer()
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/action1/article1')
+        router = self._makeOne()
+        router(environ, DummyStartResponse())
+        route_name, view_name, timings = timer.calls[0]
+        self.assertEqual(route_name, 'foo')
+        self.assertEqual(view_name, u'')
+        phases = [phase for phase, timestamp in timings]
+        self.assertEqual(phases[:4],
+                         ['start', 'new_request', 'route_match',
+                          'root_factory'])
+        self.assertEqual(phases[-3:],
+                         ['view', 'response_callbacks', 'finished_callbacks'])
+
+    def test_call_request_timer_exception_view(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import IExceptionViewClassifier
+        from pyramid.interfaces import IRequest
+        timer = self._registerRequestTimer()
+        view = DummyView(DummyResponse(), raise_exception=RuntimeError)
+        exception_view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, IRequest, None)
+        self._registerView(exception_view, '', IExceptionViewClassifier,
+                           IRequest, RuntimeError)
+        router = self._makeOne()
+        router(self._makeEnviron(), DummyStartResponse())
+        route_name, view_name, timings = timer.calls[0]
+        self.assertEqual([phase for phase, timestamp in timings],
+                         ['start', 'new_request', 'root_factory',
+                          'traversal', 'view_lookup', 'exception_view',
+                          'response_callbacks', 'finished_callbacks'])
+
+    def test_call_request_timer_exception_raised(self):
+        timer = self._registerRequestTimer()
+        from pyramid.exceptions import NotFound
+        router = self._makeOne()
+        self.assertRaises(NotFound, router, self._makeEnviron(),
+                          DummyStartResponse())
+        route_name, view_name, timings = timer.calls[0]
+        self.assertEqual([phase for phase, timestamp in timings],
+                         ['start', 'new_request', 'root_factory',
+                          'traversal', 'view_lookup', 'finished_callbacks'])
+
+    def test_call_request_timer_request_factory_raises(self):
+        timer = self._registerRequestTimer()
+        router = self._makeOne()
+        def request_factory(environ):
+            raise RuntimeError
+        router.request_factory = request_factory
+        self.assertRaises(RuntimeError, router, self._makeEnviron(),
+                          DummyStartResponse())
+        self.assertEqual(timer.calls, [])
+
+    def test_call_admission_admitted(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.admission import AdmissionController
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        response = DummyResponse()
+        response.app_iter = ['Hello world']
+        view = DummyView(response)
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/action1/article1')
+        router = self._makeOne()
+        admission = AdmissionController(1, route_limits={'foo':1})
+        router.admission = admission
+        result = router(environ, DummyStartResponse())
+        self.assertEqual(result, ['Hello world'])
+        self.assertEqual(admission.gate.admitted, 1)
+        self.assertEqual(admission.gate.in_flight, 0)
+        self.assertEqual(admission.route_gates['foo'].admitted, 1)
+        self.assertEqual(admission.route_gates['foo'].in_flight, 0)
+
+    def test_call_admission_shed_by_router(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.admission import AdmissionController
+        context = DummyContext()
+        self._registerTraverserFactory(context)
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, None, None)
+        router = self._makeOne()
+        admission = AdmissionController(1)
+        admission.gate.enter()
+        router.admission = admission
+        start_response = DummyStartResponse()
+        result = router(self._makeEnviron(), start_response)
+        self.assertEqual(start_response.status, '503 Service Unavailable')
+        self.failUnless('Service Unavailable' in ''.join(result))
+        self.failIf(hasattr(view, 'request'))
+        self.assertEqual(admission.gate.shed, 1)
+        self.assertEqual(admission.gate.in_flight, 1)
+
+    def test_call_admission_shed_by_route(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.admission import AdmissionController
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/:article')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/action1/article1')
+        router = self._makeOne()
+        admission = AdmissionController(2, route_limits={'foo':1})
+        admission.route_gates['foo'].enter()
+        router.admission = admission
+        start_response = DummyStartResponse()
+        router(environ, start_response)
+        self.assertEqual(start_response.status, '503 Service Unavailable')
+        self.failIf(hasattr(view, 'request'))
+        self.assertEqual(admission.route_gates['foo'].shed, 1)
+        self.assertEqual(admission.gate.admitted, 1)
+        self.assertEqual(admission.gate.in_flight, 0)
+
+    def test_call_admission_released_on_exception(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.admission import AdmissionController
+        context = DummyContext()
+        self._registerTraverserFactory(context)
+        view = DummyView(DummyResponse(), raise_exception=RuntimeError)
+        self._registerView(view, '', IViewClassifier, None, None)
+        router = self._makeOne()
+        admission = AdmissionController(1)
+        router.admission = admission
+        self.assertRaises(RuntimeError, router, self._makeEnviron(),
+                          DummyStartResponse())
+        self.assertEqual(admission.gate.in_flight, 0)
+
+    def test_call_background_tasks(self):
+        from pyramid.interfaces import IViewClassifier
+        L = []
+        def task(request):
+            L.append(request)
+        context = DummyContext()
+        self._registerTraverserFactory(context)
+        response = DummyResponse()
+        response.app_iter = ['Hello world']
+        class View(DummyView):
+            def __call__(self, context, request):
+                request.add_background_task(task)
+                return DummyView.__call__(self, context, request)
+        view = View(response)
+        self._registerView(view, '', IViewClassifier, None, None)
+        router = self._makeOne()
+        result = router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(list(result), ['Hello world'])
+        self.assertEqual(L, [])
+        result.close()
+        self.assertEqual(L, [view.request])
+
+    def test_call_background_tasks_pool(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import ITaskPool
+        pool = DummyTaskPool()
+        self.registry.registerUtility(pool, ITaskPool)
+        context = DummyContext()
+        self._registerTraverserFactory(context)
+        class View(DummyView):
+            def __call__(self, context, request):
+                request.add_background_task(lambda request: None)
+                return DummyView.__call__(self, context, request)
+        view = View(DummyResponse())
+        self._registerView(view, '', IViewClassifier, None, None)
+        router = self._makeOne()
+        result = router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(pool.submitted, [])
+        result.close()
+        self.assertEqual(pool.submitted, [view.request])
+
     def test_call_route_matches_and_has_factory(self):
         from pyramid.interfaces import IViewClassifier
         self._registerRouteRequest('foo')
@@ -965,6 +1305,280 @@ class TestRouter(unittest.TestCase):
         start_response = DummyStartResponse()
         self.assertRaises(RuntimeError, router, environ, start_response)
 
+class TestRouterWithBoundRouteViews(TestRouter):
+    def _makeOne(self):
+        router = TestRouter._makeOne(self)
+        router.bind_route_views = True
+        return router
+
+    def test_call_route_bound_view(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import IContextFound
+        from pyramid.traversal import DefaultRootFactory
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action/*subpath')
+        response = DummyResponse()
+        response.app_iter = ['Hello world']
+        view = DummyView(response)
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        events = self._registerEventListener(IContextFound)
+        environ = self._makeEnviron(PATH_INFO='/archives/action1/a/b')
+        router = self._makeOne()
+        start_response = DummyStartResponse()
+        result = router(environ, start_response)
+        self.assertEqual(result, ['Hello world'])
+        self.assertEqual(start_response.status, '200 OK')
+        request = view.request
+        self.failUnless(isinstance(request.root, DefaultRootFactory))
+        self.assertEqual(request.root.action, 'action1')
+        self.assertEqual(request.context, request.root)
+        self.assertEqual(request.virtual_root, request.root)
+        self.assertEqual(request.view_name, u'')
+        self.assertEqual(request.subpath, ('a', 'b'))
+        self.assertEqual(request.traversed, ())
+        self.assertEqual(request.virtual_root_path, ())
+        self.assertEqual(request.matched_route.name, 'foo')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].request, request)
+
+    def test_call_route_bound_view_string_subpath(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:subpath')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/a')
+        router = self._makeOne()
+        router(environ, DummyStartResponse())
+        self.assertEqual(view.request.subpath, (u'a',))
+
+    def test_call_route_bound_view_traverse(self):
+        from pyramid.interfaces import IViewClassifier
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/*traverse')
+        view = DummyView(DummyResponse())
+        self._registerView(view, 'bar', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/bar')
+        router = self._makeOne()
+        router(environ, DummyStartResponse())
+        self.assertEqual(view.request.view_name, u'bar')
+        self.assertEqual(view.request.traversed, ())
+
+    def test_call_route_bound_view_vroot(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.exceptions import NotFound
+        req_iface = self._registerRouteRequest('foo')
+        self._connectRoute('foo', 'archives/:action')
+        view = DummyView(DummyResponse())
+        self._registerView(view, '', IViewClassifier, req_iface, None)
+        environ = self._makeEnviron(PATH_INFO='/archives/action1',
+                                    HTTP_X_VHM_ROOT='/bar')
+        router = self._makeOne()
+        self.assertRaises(NotFound, router, environ, DummyStartResponse())
+
+class TestRouterWithViewLookupCache(TestRouter):
+    def _makeOne(self):
+        from pyramid.router import ViewLookupCache
+        router = TestRouter._makeOne(self)
+        router.view_lookup_cache = ViewLookupCache(self.registry.adapters,
+                                                   100)
+        return router
+
+    def test_call_view_lookup_cached(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import IRequest
+        from zope.interface import Interface
+        from zope.interface import directlyProvides
+        class IContext(Interface):
+            pass
+        context = DummyContext()
+        directlyProvides(context, IContext)
+        self._registerTraverserFactory(context, view_name='foo')
+        response = DummyResponse()
+        view = DummyView(response)
+        self._registerView(view, 'foo', IViewClassifier, IRequest, IContext)
+        router = self._makeOne()
+        router(self._makeEnviron(), DummyStartResponse())
+        router(self._makeEnviron(), DummyStartResponse())
+        cache = router.view_lookup_cache
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        view2 = DummyView(response)
+        self._registerView(view2, 'foo', IViewClassifier, IRequest, IContext)
+        router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.failUnless(hasattr(view2, 'request'))
+
+class TestSpecializedRouter(TestRouter):
+    # runs every TestRouter test against a generated request pipeline
+    def _getTargetClass(self):
+        from pyramid.router import SpecializedRouter
+        return SpecializedRouter
+
+    def test_specialize(self):
+        router = self._makeOne()
+        handle_request = router.specialize()
+        self.assertEqual(router.handle_request, handle_request)
+
+    def test_call_specialized_once(self):
+        from pyramid.exceptions import NotFound
+        router = self._makeOne()
+        self.assertRaises(NotFound, router, self._makeEnviron(),
+                          DummyStartResponse())
+        handle_request = router.handle_request
+        self.failIf(handle_request is None)
+        self.assertRaises(NotFound, router, self._makeEnviron(),
+                          DummyStartResponse())
+        self.assertEqual(router.handle_request, handle_request)
+
+    def test_specialize_registry_with_bases(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import IRequest
+        from pyramid.registry import Registry
+        context = DummyContext()
+        self._registerTraverserFactory(context, view_name='foo')
+        response = DummyResponse()
+        view = DummyView(response)
+        self._registerView(view, 'foo', IViewClassifier, IRequest, None)
+        registry = Registry(bases=(self.registry,))
+        registry.settings = None
+        router = self._getTargetClass()(registry)
+        router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(view.context, context)
+
+    def test_specialize_registry_with_bases_no_traverser(self):
+        from pyramid.interfaces import IViewClassifier
+        from pyramid.interfaces import IRequest
+        from pyramid.registry import Registry
+        response = DummyResponse()
+        view = DummyView(response)
+        self._registerView(view, '', IViewClassifier, IRequest, None)
+        registry = Registry(bases=(self.registry,))
+        registry.settings = None
+        router = self._getTargetClass()(registry)
+        router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(view.request.view_name, '')
+
+    def test_specialize_with_listeners_and_response_callbacks(self):
+        from pyramid.interfaces import INewResponse
+        from pyramid.interfaces import IViewClassifier
+        context = DummyContext()
+        self._registerTraverserFactory(context)
+        response = DummyResponse('200 OK')
+        L = []
+        def view(context, request):
+            def callback(request, response):
+                L.append(response)
+            request.response_callbacks = [callback]
+            return response
+        self._registerView(view, '', IViewClassifier, None, None)
+        events = self._registerEventListener(INewResponse)
+        router = self._makeOne()
+        router(self._makeEnviron(), DummyStartResponse())
+        self.assertEqual(len(events), 1)
+        self.assertEqual(L, [response])
+
+    def test_specialize_with_request_timer(self):
+        from pyramid.interfaces import IRequestTimer
+        from pyramid.router import Router
+        self.registry.registerUtility(DummyRequestTimer(), IRequestTimer)
+        router = self._makeOne()
+        handle_request = router.specialize()
+        self.assertEqual(handle_request.im_func, Router.__call__.im_func)
+        self.assertEqual(handle_request.im_self, router)
+
+class TestSpecializedRouterWithBoundRouteViews(
+    TestSpecializedRouter, TestRouterWithBoundRouteViews):
+    pass
+
+class TestSpecializedRouterWithViewLookupCache(
+    TestSpecializedRouter, TestRouterWithViewLookupCache):
+    pass
+
+class TestViewLookupCache(unittest.TestCase):
+    def _makeOne(self, adapters, size=10):
+        from pyramid.router import ViewLookupCache
+        return ViewLookupCache(adapters, size)
+
+    def _makeAdapters(self):
+        from pyramid.registry import Registry
+        return Registry().adapters
+
+    def _register(self, adapters, value, name=u''):
+        from zope.interface import Interface
+        adapters.register((Interface,), IDummy, name, value)
+
+    def test_lookup_miss_then_hit(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        self._register(adapters, 'value')
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        self.assertEqual(cache.lookup(required, IDummy), 'value')
+        self.assertEqual(cache.lookup(required, IDummy), 'value')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lookup_name(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        self._register(adapters, 'value')
+        self._register(adapters, 'named', name=u'foo')
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        self.assertEqual(cache.lookup(required, IDummy, name=u'foo'), 'named')
+        self.assertEqual(cache.lookup(required, IDummy), 'value')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_lookup_negative_result_cached(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        self.assertEqual(cache.lookup(required, IDummy), None)
+        self.assertEqual(cache.lookup(required, IDummy, default=1), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_register_invalidates(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        self.assertEqual(cache.lookup(required, IDummy), None)
+        self._register(adapters, 'value')
+        self.assertEqual(cache.lookup(required, IDummy), 'value')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_unregister_invalidates(self):
+        from zope.interface import Interface
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        self._register(adapters, 'value')
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        self.assertEqual(cache.lookup(required, IDummy), 'value')
+        adapters.unregister((Interface,), IDummy, u'', 'value')
+        self.assertEqual(cache.lookup(required, IDummy), None)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_bounded(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        cache = self._makeOne(adapters, size=1)
+        required = (implementedBy(DummyContext),)
+        cache.lookup(required, IDummy, name=u'a')
+        cache.lookup(required, IDummy, name=u'b')
+        cache.lookup(required, IDummy, name=u'a')
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_clear(self):
+        from zope.interface import implementedBy
+        adapters = self._makeAdapters()
+        cache = self._makeOne(adapters)
+        required = (implementedBy(DummyContext),)
+        cache.lookup(required, IDummy)
+        cache.clear()
+        cache.lookup(required, IDummy)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
 class DummyContext:
     pass
 
@@ -1014,6 +1628,20 @@ class DummyThreadLocalManager:
 class DummyAuthenticationPolicy:
     pass
 
+class DummyRequestTimer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, route_name, view_name, timings):
+        self.calls.append((route_name, view_name, timings))
+
+class DummyTaskPool:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, request):
+        self.submitted.append(request)
+
 class DummyLogger:
     def __init__(self):
         self.messages = []
@@ -1022,6 +1650,11 @@ class DummyLogger:
     warn = info
     debug = info
 
+from zope.interface import Interface
+
+class IDummy(Interface):
+    pass
+
 def exc_raised(exc, func, *arg, **kw):
     try:
         func(*arg, **kw)
@@ -0,0 +1,277 @@
+import unittest
+
+class ScanningTestBase(unittest.TestCase):
+    def setUp(self):
+        import os
+        import sys
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'scan.cache')
+        self.package = os.path.join(self.tempdir, 'scanpackage')
+        os.mkdir(self.package)
+        self._write('__init__.py', DECORATED)
+        self._write('plain.py', '')
+        self._write('decorated.py', DECORATED)
+        self._write('a.b.py', '')
+        self._write('README.txt', '')
+        self._write('orphan.pyc', '')
+        os.mkdir(os.path.join(self.package, 'data'))
+        os.mkdir(os.path.join(self.package, 'sub'))
+        self._write('sub/__init__.py', '')
+        self._write('sub/module.py', '')
+        sys.path.insert(0, self.tempdir)
+
+    def tearDown(self):
+        import shutil
+        import sys
+        sys.path.remove(self.tempdir)
+        for name in list(sys.modules.keys()):
+            if name.startswith('scanpackage'):
+                del sys.modules[name]
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, name, data):
+        import os
+        f = open(os.path.join(self.package, name), 'w')
+        f.write(data)
+        f.close()
+
+    def _path(self, name):
+        import os
+        return os.path.join(self.package, name)
+
+class TestScanCache(ScanningTestBase):
+    def _makeOne(self):
+        from pyramid.scanning import ScanCache
+        return ScanCache(self.filename)
+
+    def test_ctor_no_file(self):
+        cache = self._makeOne()
+        self.assertEqual(cache.filename, self.filename)
+        self.assertEqual(cache.modules, {})
+        self.assertEqual(cache.changed, False)
+
+    def test_ctor_corrupt_file(self):
+        open(self.filename, 'wb').write('garbage')
+        cache = self._makeOne()
+        self.assertEqual(cache.modules, {})
+
+    def test_set_save_and_reload(self):
+        cache = self._makeOne()
+        plain = self._path('plain.py')
+        cache.set('scanpackage.plain', plain, False)
+        cache.set('scanpackage', self._path('__init__.py'), True)
+        self.assertEqual(cache.changed, True)
+        cache.save()
+        self.assertEqual(cache.changed, False)
+        cache = self._makeOne()
+        self.failUnless(cache.undecorated('scanpackage.plain', plain))
+        self.failIf(cache.undecorated('scanpackage',
+                                      self._path('__init__.py')))
+        self.failIf(cache.undecorated('scanpackage.sub',
+                                      self._path('sub/__init__.py')))
+
+    def test_undecorated_file_changed(self):
+        cache = self._makeOne()
+        plain = self._path('plain.py')
+        cache.set('scanpackage.plain', plain, False)
+        self._write('plain.py', 'changed = True')
+        self.failIf(cache.undecorated('scanpackage.plain', plain))
+
+    def test_undecorated_file_moved(self):
+        cache = self._makeOne()
+        cache.set('scanpackage.plain', self._path('plain.py'), False)
+        self.failIf(cache.undecorated('scanpackage.plain',
+                                      self._path('decorated.py')))
+
+    def test_set_unchanged(self):
+        cache = self._makeOne()
+        plain = self._path('plain.py')
+        cache.set('scanpackage.plain', plain, False)
+        cache.changed = False
+        cache.set('scanpackage.plain', plain, False)
+        self.assertEqual(cache.changed, False)
+
+    def test_set_missing_file(self):
+        cache = self._makeOne()
+        missing = self._path('missing.py')
+        cache.set('scanpackage.missing', missing, False)
+        self.assertEqual(cache.modules['scanpackage.missing'],
+                         (missing, None, None, False))
+
+    def test_save_unchanged(self):
+        import os
+        cache = self._makeOne()
+        cache.save()
+        self.failIf(os.path.exists(self.filename))
+
+    def test_save_fails(self):
+        import os
+        from pyramid.scanning import ScanCache
+        cache = ScanCache(os.path.join(self.tempdir, 'missing', 'cache'))
+        cache.set('scanpackage.plain', self._path('plain.py'), False)
+        logger = DummyLogger()
+        cache.save(logger)
+        self.assertEqual(cache.changed, True)
+        self.assertEqual(len(logger.messages), 1)
+        self.failUnless(logger.messages[0].startswith('Scan cache '))
+        cache.save()
+
+class Test_scan_package(ScanningTestBase):
+    def _callFUT(self, package, categories=None, cache=None, timings=None):
+        from pyramid.scanning import scan_package
+        scanner = DummyScanner()
+        scan_package(scanner, package, categories, cache, timings)
+        self.scanner = scanner
+        return scanner.scanned
+
+    def _import(self):
+        import scanpackage
+        return scanpackage
+
+    def test_package(self):
+        timings = []
+        scanned = self._callFUT(self._import(), ('pyramid',),
+                                timings=timings)
+        names = ['scanpackage', 'scanpackage.decorated',
+                 'scanpackage.plain', 'scanpackage.sub',
+                 'scanpackage.sub.module']
+        self.assertEqual(scanned, [(name, ('pyramid',)) for name in names])
+        self.assertEqual(self.scanner.packages, [])
+        self.assertEqual([name for name, seconds in timings], names)
+
+    def test_module(self):
+        import scanpackage.plain
+        scanned = self._callFUT(scanpackage.plain)
+        self.assertEqual(scanned, [('scanpackage.plain', None)])
+
+    def test_package_not_a_directory(self):
+        package = self._import()
+        package.__path__.append(self._path('README.txt'))
+        timings = []
+        scanned = self._callFUT(package, timings=timings)
+        self.assertEqual(scanned, [('scanpackage', None)])
+        self.assertEqual(self.scanner.packages, ['scanpackage'])
+        self.assertEqual(timings[0][0], 'scanpackage')
+
+    def test_package_not_a_directory_no_timings(self):
+        package = self._import()
+        package.__path__.append(self._path('README.txt'))
+        scanned = self._callFUT(package)
+        self.assertEqual(scanned, [('scanpackage', None)])
+
+    def test_package_several_directories(self):
+        import os
+        other = os.path.join(self.tempdir, 'other')
+        os.mkdir(other)
+        open(os.path.join(other, 'plain.py'), 'w').write('')
+        open(os.path.join(other, 'extra.py'), 'w').write('')
+        package = self._import()
+        package.__path__.append(other)
+        scanned = self._callFUT(package)
+        self.assertEqual(scanned[-2:], [('scanpackage.sub.module', None),
+                                        ('scanpackage.extra', None)])
+        self.assertEqual(len(scanned), 6)
+
+    def test_cache(self):
+        from pyramid.scanning import ScanCache
+        cache = ScanCache(self.filename)
+        package = self._import()
+        self._callFUT(package, cache=cache)
+        self.assertEqual(
+            sorted([(name, entry[-1]) for name, entry in
+                    cache.modules.items()]),
+            [('scanpackage', True), ('scanpackage.decorated', True),
+             ('scanpackage.plain', False), ('scanpackage.sub', False),
+             ('scanpackage.sub.module', False)])
+        timings = []
+        scanned = self._callFUT(package, cache=cache, timings=timings)
+        self.assertEqual(scanned, [('scanpackage', None),
+                                   ('scanpackage.decorated', None)])
+        self.assertEqual(len(timings), 2)
+
+    def test_cache_modules_not_imported(self):
+        import sys
+        from pyramid.scanning import ScanCache
+        cache = ScanCache(self.filename)
+        self._callFUT(self._import(), cache=cache)
+        cache.save()
+        for name in list(sys.modules.keys()):
+            if name.startswith('scanpackage'):
+                del sys.modules[name]
+        cache = ScanCache(self.filename)
+        self._callFUT(self._import(), cache=cache)
+        self.failUnless('scanpackage.decorated' in sys.modules)
+        self.failIf('scanpackage.plain' in sys.modules)
+        self.failIf('scanpackage.sub' in sys.modules)
+        self.failIf('scanpackage.sub.module' in sys.modules)
+
+    def test_cache_module_changed(self):
+        from pyramid.scanning import ScanCache
+        cache = ScanCache(self.filename)
+        package = self._import()
+        self._callFUT(package, cache=cache)
+        self._write('plain.py', DECORATED)
+        scanned = self._callFUT(package, cache=cache)
+        self.assertEqual(scanned, [('scanpackage', None),
+                                   ('scanpackage.decorated', None),
+                                   ('scanpackage.plain', None)])
+
+class Test_decorated(unittest.TestCase):
+    def _callFUT(self, module):
+        from pyramid.scanning import _decorated
+        return _decorated(module)
+
+    def test_decorated(self):
+        import types
+        module = types.ModuleType('module')
+        module.view = DummyDecorated()
+        self.assertEqual(self._callFUT(module), True)
+
+    def test_undecorated(self):
+        import types
+        module = types.ModuleType('module')
+        module.view = object()
+        module.insane = DummyInsane()
+        self.assertEqual(self._callFUT(module), False)
+
+class Test_source(unittest.TestCase):
+    def _callFUT(self, filename):
+        from pyramid.scanning import _source
+        return _source(filename)
+
+    def test_source(self):
+        self.assertEqual(self._callFUT('module.py'), 'module.py')
+
+    def test_compiled(self):
+        self.assertEqual(self._callFUT('module.pyc'), 'module.py')
+        self.assertEqual(self._callFUT('module.pyo'), 'module.py')
+
+DECORATED = """
+class Decorated(object):
+    __venusian_callbacks__ = {}
+decorated = Decorated()
+"""
+
+class DummyScanner(object):
+    def __init__(self):
+        self.scanned = []
+        self.packages = []
+
+    def scan(self, module, categories=None):
+        self.scanned.append((module.__name__, categories))
+        if hasattr(module, '__path__'):
+            self.packages.append(module.__name__)
+
+class DummyDecorated(object):
+    __venusian_callbacks__ = {}
+
+class DummyInsane(object):
+    def __getattr__(self, name):
+        raise ValueError(name)
+
+class DummyLogger:
+    def __init__(self):
+        self.messages = []
+    def warn(self, msg):
+        self.messages.append(msg)
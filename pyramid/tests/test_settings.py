@@ -123,6 +123,21 @@ class TestSettings(unittest.TestCase):
                              {'BFG_DEBUG_TEMPLATES':'1'})
         self.assertEqual(result['debug_templates'], True)
 
+    def test_debug_scan(self):
+        result = self._makeOne({})
+        self.assertEqual(result['debug_scan'], False)
+        result = self._makeOne({'debug_scan':'false'})
+        self.assertEqual(result['debug_scan'], False)
+        result = self._makeOne({'debug_scan':'t'})
+        self.assertEqual(result['debug_scan'], True)
+        result = self._makeOne({}, {'BFG_DEBUG_SCAN':'1'})
+        self.assertEqual(result['debug_scan'], True)
+        result = self._makeOne({'debug_scan':'false'},
+                             {'BFG_DEBUG_SCAN':'1'})
+        self.assertEqual(result['debug_scan'], True)
+        result = self._makeOne({'debug_all':'t'})
+        self.assertEqual(result['debug_scan'], True)
+
     def test_debug_all(self):
         result = self._makeOne({})
         self.assertEqual(result['debug_notfound'], False)
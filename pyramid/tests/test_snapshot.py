@@ -0,0 +1,333 @@
+import unittest
+
+class SnapshotTestBase(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'config.snapshot')
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+class TestConfigurationRecorder(SnapshotTestBase):
+    def _makeOne(self):
+        from pyramid.snapshot import ConfigurationRecorder
+        return ConfigurationRecorder()
+
+    def test_ctor(self):
+        recorder = self._makeOne()
+        self.assertEqual(recorder.calls, [])
+        self.assertEqual(recorder.packages, set())
+        self.assertEqual(recorder.modules, set())
+        self.assertEqual(recorder.files, set())
+        self.assertEqual(recorder.depth, 0)
+        self.assertEqual(recorder.active, True)
+
+    def test_attach_and_detach(self):
+        from pyramid.snapshot import RECORDED_METHODS
+        recorder = self._makeOne()
+        config = DummyConfigurator()
+        recorder.attach(config)
+        for name in RECORDED_METHODS:
+            self.failUnless(name in config.__dict__)
+        self.assertEqual(config.add_view.__name__, 'add_view')
+        self.assertEqual(config.add_view.__doc__, ' add a view ')
+        recorder.detach(config)
+        self.assertEqual(config.__dict__, {'package_name':'pyramid.tests',
+                                           'called':[]})
+
+    def test_wrapper_records_outermost_calls(self):
+        recorder = self._makeOne()
+        config = DummyConfigurator()
+        recorder.attach(config)
+        self.assertEqual(config.add_route('home', '/', view=dummy_view,
+                                          _info='info'), 'add_route')
+        self.assertEqual(config.called,
+                         [('add_route', ('home', '/'),
+                           {'view':dummy_view, '_info':'info'}),
+                          ('add_view', (),
+                           {'view':dummy_view, 'route_name':'home'})])
+        self.assertEqual(recorder.calls,
+                         [('pyramid.tests', 'add_route', ('home', '/'),
+                           {'view':dummy_view})])
+        self.assertEqual(recorder.depth, 0)
+
+    def test_wrapper_exception(self):
+        recorder = self._makeOne()
+        config = DummyConfigurator()
+        recorder.attach(config)
+        self.assertRaises(ValueError, config.add_renderer, 'name', None)
+        self.assertEqual(recorder.depth, 0)
+        self.assertEqual(len(recorder.calls), 1)
+
+    def test_wrapper_inactive(self):
+        recorder = self._makeOne()
+        config = DummyConfigurator()
+        recorder.attach(config)
+        recorder.active = False
+        config.add_view(view=dummy_view)
+        self.assertEqual(len(config.called), 1)
+        self.assertEqual(recorder.calls, [])
+
+    def test_record_sources(self):
+        import pyramid.tests
+        recorder = self._makeOne()
+        recorder.record('pyramid.tests', 'add_view', (DummyConfigurator,),
+                        {'view':unittest.TestCase, 'name':'name',
+                         'package':pyramid.tests,
+                         '_info':DummyInfo('configure.zcml')})
+        recorder.record('pyramid.tests', 'add_view', (), {'_info':u''})
+        self.assertEqual(recorder.packages, set(['pyramid']))
+        self.assertEqual(recorder.modules,
+                         set(['pyramid.tests.test_snapshot', 'unittest.case',
+                              'pyramid.tests']))
+        self.assertEqual(recorder.files, set(['configure.zcml']))
+        self.assertEqual(recorder.calls[0][3],
+                         {'view':unittest.TestCase, 'name':'name',
+                          'package':pyramid.tests})
+
+    def test_save(self):
+        import pyramid.tests
+        from pyramid.snapshot import read_snapshot
+        recorder = self._makeOne()
+        call = ('pyramid.tests', 'add_view', (),
+                {'view':dummy_view, 'renderer':{'name':'string',
+                                                'package':pyramid.tests}})
+        recorder.calls.append(call)
+        recorder.packages.add('pyramid')
+        recorder.modules.add('pyramid.tests')
+        self.assertEqual(recorder.save(self.filename, {'a':'1'}), True)
+        self.assertEqual(read_snapshot(self.filename, {'a':'1'}), [call])
+
+    def test_save_overwrites(self):
+        from pyramid.snapshot import read_snapshot
+        recorder = self._makeOne()
+        open(self.filename, 'wb').write('garbage')
+        self.assertEqual(recorder.save(self.filename, {}), True)
+        self.assertEqual(read_snapshot(self.filename, {}), [])
+
+    def test_save_unpicklable(self):
+        import os
+        recorder = self._makeOne()
+        recorder.calls.append(('pyramid.tests', 'add_view', (),
+                               {'view':lambda *arg: None}))
+        logger = DummyLogger()
+        self.assertEqual(recorder.save(self.filename, {}, logger), False)
+        self.failIf(os.path.exists(self.filename))
+        self.assertEqual(len(logger.messages), 1)
+        self.failUnless(logger.messages[0].startswith(
+            'Configuration snapshot %r not written: ' % self.filename))
+
+    def test_save_unwritable_no_logger(self):
+        import os
+        recorder = self._makeOne()
+        filename = os.path.join(self.tempdir, 'missing', 'config.snapshot')
+        self.assertEqual(recorder.save(filename, {}), False)
+
+    def test_save_rename_fails(self):
+        import os
+        recorder = self._makeOne()
+        os.mkdir(self.filename)
+        os.mkdir(os.path.join(self.filename, 'occupied'))
+        logger = DummyLogger()
+        self.assertEqual(recorder.save(self.filename, {}, logger), False)
+        self.assertEqual(len(logger.messages), 1)
+
+class Test_snapshot_key(SnapshotTestBase):
+    def setUp(self):
+        import os
+        import sys
+        SnapshotTestBase.setUp(self)
+        self.package = os.path.join(self.tempdir, 'snapshotpackage')
+        os.mkdir(self.package)
+        os.mkdir(os.path.join(self.package, 'templates'))
+        os.mkdir(os.path.join(self.package, 'sub'))
+        self._write('__init__.py', '')
+        self._write('templates/index.pt', '<html/>')
+        self._write('module.py', '')
+        self._write('unused.py', '')
+        self._write('configure.zcml', '<configure/>')
+        self._write('sub/__init__.py', '')
+        self._write('sub/configure.zcml', '<configure/>')
+        sys.path.insert(0, self.tempdir)
+        import snapshotpackage.module
+        import snapshotpackage.sub
+
+    def tearDown(self):
+        import sys
+        sys.path.remove(self.tempdir)
+        for name in list(sys.modules.keys()):
+            if name.startswith('snapshot') and name != 'snapshot':
+                del sys.modules[name]
+        SnapshotTestBase.tearDown(self)
+
+    def _write(self, name, data):
+        import os
+        f = open(os.path.join(self.package, name), 'w')
+        f.write(data)
+        f.close()
+
+    def _callFUT(self, packages=('snapshotpackage',), modules=(), files=(),
+                 settings=None):
+        from pyramid.snapshot import snapshot_key
+        return snapshot_key((packages, modules, files), settings)
+
+    def test_stable(self):
+        self.assertEqual(self._callFUT(), self._callFUT())
+
+    def test_imported_module_modified(self):
+        key = self._callFUT()
+        self._write('module.py', 'changed = True')
+        self.assertNotEqual(self._callFUT(), key)
+
+    def test_module_added(self):
+        key = self._callFUT()
+        self._write('other.py', '')
+        self.assertNotEqual(self._callFUT(), key)
+
+    def test_zcml_modified(self):
+        key = self._callFUT()
+        self._write('sub/configure.zcml', '<configure></configure>')
+        self.assertNotEqual(self._callFUT(), key)
+
+    def test_other_files_ignored(self):
+        key = self._callFUT()
+        self._write('unused.py', 'changed = True')
+        self._write('templates/index.pt', '<html></html>')
+        self.assertEqual(self._callFUT(), key)
+
+    def test_other_packages_ignored(self):
+        key = self._callFUT(packages=())
+        self._write('module.py', 'changed = True')
+        self.assertEqual(self._callFUT(packages=()), key)
+
+    def test_module(self):
+        import os
+        import py_compile
+        import sys
+        path = os.path.join(self.tempdir, 'snapshotmodule.py')
+        open(path, 'w').write('')
+        key = self._callFUT((), ('snapshotmodule',))
+        # imported from its compiled file this time
+        del sys.modules['snapshotmodule']
+        py_compile.compile(path)
+        self.assertEqual(self._callFUT((), ('snapshotmodule',)), key)
+        self.assertEqual(sys.modules['snapshotmodule'].__file__, path + 'c')
+        open(path, 'w').write('changed = True')
+        self.assertNotEqual(self._callFUT((), ('snapshotmodule',)), key)
+
+    def test_builtin_module(self):
+        self.assertEqual(self._callFUT((), ('sys',)), self._callFUT(()))
+
+    def test_missing_module(self):
+        self.assertNotEqual(self._callFUT((), ('nonexistentsnapshotmodule',)),
+                            self._callFUT(()))
+
+    def test_files(self):
+        import os
+        path = os.path.join(self.tempdir, 'configure.zcml')
+        key = self._callFUT((), (), (path,))
+        open(path, 'w').write('<configure/>')
+        self.assertNotEqual(self._callFUT((), (), (path,)), key)
+
+    def test_package_directory_removed(self):
+        import shutil
+        import snapshotpackage
+        key = self._callFUT()
+        shutil.rmtree(self.package)
+        self.failIf(snapshotpackage.__path__[0] is None)
+        self.assertNotEqual(self._callFUT(), key)
+
+    def test_settings(self):
+        key = self._callFUT(settings={'a':'1'})
+        self.assertEqual(self._callFUT(settings={'a':'1'}), key)
+        self.assertNotEqual(self._callFUT(settings={'a':'2'}), key)
+        self.assertNotEqual(self._callFUT(), key)
+
+    def test_unstable_settings_ignored(self):
+        key = self._callFUT(settings={'a':'1', 'b':object()})
+        self.assertEqual(self._callFUT(settings={'a':'1', 'b':object()}),
+                         key)
+        self.assertEqual(self._callFUT(settings={'a':'1'}), key)
+
+class Test_read_snapshot(SnapshotTestBase):
+    def _callFUT(self, settings=None):
+        from pyramid.snapshot import read_snapshot
+        return read_snapshot(self.filename, settings)
+
+    def _write(self, header, calls):
+        import cPickle
+        f = open(self.filename, 'wb')
+        f.write(cPickle.dumps(header, 2) + cPickle.dumps(calls, 2))
+        f.close()
+
+    def test_missing(self):
+        self.assertEqual(self._callFUT(), None)
+
+    def test_corrupt(self):
+        open(self.filename, 'wb').write('garbage')
+        self.assertEqual(self._callFUT(), None)
+
+    def test_stale(self):
+        from pyramid.snapshot import FORMAT
+        self._write((FORMAT, SOURCES, 'stale'), [])
+        self.assertEqual(self._callFUT(), None)
+
+    def test_other_format(self):
+        from pyramid.snapshot import FORMAT
+        from pyramid.snapshot import snapshot_key
+        key = snapshot_key(SOURCES, None)
+        self._write((FORMAT + 1, SOURCES, key), [])
+        self.assertEqual(self._callFUT(), None)
+
+    def test_valid(self):
+        from pyramid.snapshot import FORMAT
+        from pyramid.snapshot import snapshot_key
+        key = snapshot_key(SOURCES, {'a':'1'})
+        self._write((FORMAT, SOURCES, key), [('pyramid', 'add_view',
+                                              (), {})])
+        self.assertEqual(self._callFUT({'a':'1'}),
+                         [('pyramid', 'add_view', (), {})])
+
+SOURCES = (['pyramid'], ['pyramid.router'], [])
+
+class DummyConfigurator(object):
+    def __init__(self):
+        self.package_name = 'pyramid.tests'
+        self.called = []
+
+    def _call(self, name, arg, kw):
+        self.called.append((name, arg, kw))
+        return name
+
+    def add_route(self, *arg, **kw):
+        self.add_view(view=kw['view'], route_name=arg[0])
+        self.called.insert(0, ('add_route', arg, kw))
+        return 'add_route'
+
+    def add_view(self, *arg, **kw):
+        """ add a view """
+        return self._call('add_view', arg, kw)
+
+    def add_renderer(self, *arg, **kw):
+        raise ValueError
+
+    def __getattr__(self, name):
+        def method(*arg, **kw):
+            return self._call(name, arg, kw)
+        return method
+
+class DummyInfo:
+    def __init__(self, file):
+        self.file = file
+
+class DummyLogger:
+    def __init__(self):
+        self.messages = []
+    def warn(self, msg):
+        self.messages.append(msg)
+
+def dummy_view(context, request): # pragma: no cover
+    return 'OK'
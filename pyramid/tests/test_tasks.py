@@ -0,0 +1,273 @@
+import unittest
+
+from pyramid import testing
+
+class Test_run_background_tasks(unittest.TestCase):
+    def setUp(self):
+        testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, request, logger=None):
+        from pyramid.tasks import run_background_tasks
+        return run_background_tasks(request, logger)
+
+    def test_tasks_called_in_order(self):
+        from pyramid.threadlocal import get_current_request
+        from pyramid.threadlocal import get_current_registry
+        request = DummyRequest()
+        L = []
+        def task1(request):
+            L.append((1, get_current_request(), get_current_registry()))
+        def task2(request):
+            L.append((2, request))
+            request.add_background_task(task3)
+        def task3(request):
+            L.append(3)
+        request.background_tasks = [task1, task2]
+        self._callFUT(request)
+        self.assertEqual(L, [(1, request, request.registry), (2, request), 3])
+        self.assertEqual(request.background_tasks, [])
+        self.failIf(get_current_request() is request)
+
+    def test_task_raises_with_logger(self):
+        request = DummyRequest()
+        logger = DummyLogger()
+        L = []
+        def task1(request):
+            raise ValueError('wrong')
+        def task2(request):
+            L.append(True)
+        request.background_tasks = [task1, task2]
+        self._callFUT(request, logger)
+        self.assertEqual(L, [True])
+        self.assertEqual(len(logger.messages), 1)
+        self.failUnless('http://example.com/' in logger.messages[0])
+        self.failUnless('ValueError: wrong' in logger.messages[0])
+
+    def test_task_raises_no_logger(self):
+        request = DummyRequest()
+        def task(request):
+            raise ValueError('wrong')
+        request.background_tasks = [task]
+        self._callFUT(request)
+        self.assertEqual(request.background_tasks, [])
+
+class TestTaskPool(unittest.TestCase):
+    def _makeOne(self, size=1, queue_size=100, logger=None):
+        from pyramid.tasks import TaskPool
+        pool = TaskPool(size, queue_size, logger)
+        self.pools.append(pool)
+        return pool
+
+    def setUp(self):
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.shutdown()
+
+    def test_class_implements_ITaskPool(self):
+        from zope.interface.verify import verifyClass
+        from pyramid.interfaces import ITaskPool
+        from pyramid.tasks import TaskPool
+        verifyClass(ITaskPool, TaskPool)
+
+    def test_ctor(self):
+        logger = DummyLogger()
+        pool = self._makeOne(2, 5, logger)
+        self.assertEqual(len(pool.threads), 2)
+        self.assertEqual(pool.queue.maxsize, 5)
+        self.assertEqual(pool.logger, logger)
+
+    def test_submit_and_shutdown_drains(self):
+        import threading
+        pool = self._makeOne(2)
+        L = []
+        def task(request):
+            L.append((request, threading.currentThread()))
+        requests = [DummyRequest() for i in range(10)]
+        for request in requests:
+            request.background_tasks = [task]
+            pool.submit(request)
+        pool.shutdown()
+        self.assertEqual(pool.threads, [])
+        self.assertEqual(sorted([id(r) for r, t in L]),
+                         sorted([id(r) for r in requests]))
+        for request, thread in L:
+            self.failIf(thread is threading.currentThread())
+
+    def test_submit_after_shutdown(self):
+        import threading
+        pool = self._makeOne()
+        pool.shutdown()
+        L = []
+        def task(request):
+            L.append(threading.currentThread())
+        request = DummyRequest()
+        request.background_tasks = [task]
+        pool.submit(request)
+        self.assertEqual(L, [threading.currentThread()])
+
+    def test_submit_and_shutdown_hold_lock(self):
+        pool = self._makeOne(1)
+        queue = pool.queue
+        L = []
+        def put(item):
+            L.append((item, pool.lock.locked()))
+            queue.__class__.put(queue, item)
+        queue.put = put
+        request = DummyRequest()
+        request.background_tasks = [lambda request: None]
+        pool.submit(request)
+        pool.shutdown()
+        self.assertEqual(L, [(request, True), (None, True)])
+        self.assertEqual(pool.lock.locked(), False)
+
+    def test_submit_backpressure(self):
+        import threading
+        pool = self._makeOne(1, 1)
+        started = threading.Event()
+        release = threading.Event()
+        def blocking(request):
+            started.set()
+            release.wait()
+        first = DummyRequest()
+        first.background_tasks = [blocking]
+        pool.submit(first)
+        started.wait()
+        queued = DummyRequest()
+        queued.background_tasks = [lambda request: None]
+        pool.submit(queued)
+        self.assertEqual(pool.queue.full(), True)
+        release.set()
+
+class Test_task_pool_from_settings(unittest.TestCase):
+    def setUp(self):
+        self.config = testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _callFUT(self, registry):
+        from pyramid.tasks import task_pool_from_settings
+        return task_pool_from_settings(registry)
+
+    def test_no_settings(self):
+        registry = self.config.registry
+        registry.settings = None
+        self.assertEqual(self._callFUT(registry), None)
+
+    def test_no_threads(self):
+        registry = self.config.registry
+        registry.settings = {}
+        self.assertEqual(self._callFUT(registry), None)
+
+    def test_existing_pool(self):
+        from pyramid.interfaces import ITaskPool
+        registry = self.config.registry
+        pool = object()
+        registry.registerUtility(pool, ITaskPool)
+        self.assertEqual(self._callFUT(registry), pool)
+
+    def test_threads(self):
+        import atexit
+        from pyramid.interfaces import IDebugLogger
+        from pyramid.interfaces import ITaskPool
+        registry = self.config.registry
+        registry.settings = {'background_task_threads':'2',
+                             'background_task_queue_size':'7'}
+        logger = DummyLogger()
+        registry.registerUtility(logger, IDebugLogger)
+        registered = []
+        original = atexit.register
+        atexit.register = registered.append
+        try:
+            pool = self._callFUT(registry)
+        finally:
+            atexit.register = original
+        try:
+            self.assertEqual(len(pool.threads), 2)
+            self.assertEqual(pool.queue.maxsize, 7)
+            self.assertEqual(pool.logger, logger)
+            self.assertEqual(registry.getUtility(ITaskPool), pool)
+            self.assertEqual(registered, [pool.shutdown])
+        finally:
+            pool.shutdown()
+
+class TestBackgroundTaskIterator(unittest.TestCase):
+    def _makeOne(self, app_iter, request, pool=None, logger=None):
+        from pyramid.tasks import BackgroundTaskIterator
+        return BackgroundTaskIterator(app_iter, request, pool, logger)
+
+    def test_iter(self):
+        inst = self._makeOne(['a', 'b'], DummyRequest())
+        self.assertEqual(list(inst), ['a', 'b'])
+
+    def test_close_no_pool(self):
+        L = []
+        request = DummyRequest()
+        request.background_tasks = [L.append]
+        app_iter = DummyAppIter()
+        inst = self._makeOne(app_iter, request)
+        inst.close()
+        self.assertEqual(app_iter.closed, True)
+        self.assertEqual(L, [request])
+
+    def test_close_app_iter_has_no_close(self):
+        L = []
+        request = DummyRequest()
+        request.background_tasks = [L.append]
+        inst = self._makeOne(['a'], request)
+        inst.close()
+        self.assertEqual(L, [request])
+
+    def test_close_app_iter_close_raises(self):
+        L = []
+        request = DummyRequest()
+        request.background_tasks = [L.append]
+        app_iter = DummyAppIter(raise_exception=ValueError)
+        inst = self._makeOne(app_iter, request)
+        self.assertRaises(ValueError, inst.close)
+        self.assertEqual(L, [request])
+
+    def test_close_pool(self):
+        request = DummyRequest()
+        pool = DummyPool()
+        inst = self._makeOne([], request, pool)
+        inst.close()
+        self.assertEqual(pool.submitted, [request])
+
+class DummyRequest:
+    url = 'http://example.com/'
+    def __init__(self):
+        self.registry = object()
+        self.background_tasks = []
+
+    def add_background_task(self, task):
+        self.background_tasks.append(task)
+
+class DummyAppIter(list):
+    closed = False
+    def __init__(self, raise_exception=None):
+        self.raise_exception = raise_exception
+
+    def close(self):
+        self.closed = True
+        if self.raise_exception is not None:
+            raise self.raise_exception
+
+class DummyPool:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, request):
+        self.submitted.append(request)
+
+class DummyLogger:
+    def __init__(self):
+        self.messages = []
+
+    def error(self, msg):
+        self.messages.append(msg)
@@ -45,6 +45,137 @@ class TestThreadLocalManager(unittest.TestCase):
         local.clear()
         self.assertEqual(local.get(), 1)
 
+class TestGreenletLocalManager(unittest.TestCase):
+    def _getTargetClass(self):
+        from pyramid.threadlocal import GreenletLocalManager
+        return GreenletLocalManager
+
+    def _makeOne(self, default=lambda *x: 1, get_ident=None):
+        if get_ident is None:
+            return self._getTargetClass()(default)
+        return self._getTargetClass()(default, get_ident)
+
+    def test_init(self):
+        local = self._makeOne()
+        self.assertEqual(local.stacks, {})
+        self.assertEqual(local.get(), 1)
+
+    def test_default(self):
+        def thedefault():
+            return '123'
+        local = self._makeOne(thedefault)
+        self.assertEqual(local.get(), '123')
+
+    def test_push_and_pop(self):
+        local = self._makeOne()
+        local.push(True)
+        local.push(False)
+        self.assertEqual(local.get(), False)
+        self.assertEqual(local.pop(), False)
+        self.assertEqual(local.get(), True)
+        self.assertEqual(local.pop(), True)
+        self.assertEqual(local.stacks, {})
+        self.assertEqual(local.pop(), None)
+        self.assertEqual(local.get(), 1)
+
+    def test_set_get_and_clear(self):
+        local = self._makeOne()
+        local.set(None)
+        self.assertEqual(local.get(), None)
+        local.clear()
+        self.assertEqual(local.get(), 1)
+        local.clear()
+        self.assertEqual(local.get(), 1)
+
+    def test_separate_stacks(self):
+        idents = ['a']
+        local = self._makeOne(get_ident=lambda: idents[0])
+        local.push('in a')
+        idents[0] = 'b'
+        self.assertEqual(local.get(), 1)
+        local.push('in b')
+        self.assertEqual(local.get(), 'in b')
+        idents[0] = 'a'
+        self.assertEqual(local.get(), 'in a')
+        local.clear()
+        idents[0] = 'b'
+        self.assertEqual(local.get(), 'in b')
+
+    def test_separate_threads(self):
+        import threading
+        local = self._makeOne()
+        local.push('main')
+        L = []
+        def run():
+            L.append(local.get())
+            local.push('thread')
+            L.append(local.get())
+            local.pop()
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEqual(L, [1, 'thread'])
+        self.assertEqual(local.get(), 'main')
+        local.pop()
+
+    def test_separate_greenlets(self):
+        try:
+            import greenlet
+        except ImportError: # pragma: no cover
+            return
+        local = self._makeOne()
+        L = []
+        def run(name):
+            local.push(name)
+            main.switch()
+            L.append(local.get())
+            local.pop()
+        main = greenlet.getcurrent()
+        first = greenlet.greenlet(run)
+        second = greenlet.greenlet(run)
+        first.switch('first')
+        second.switch('second')
+        self.assertEqual(local.get(), 1)
+        first.switch()
+        second.switch()
+        self.assertEqual(L, ['first', 'second'])
+        self.assertEqual(local.stacks, {})
+
+class Test_use_manager(unittest.TestCase):
+    def setUp(self):
+        from pyramid import threadlocal
+        from pyramid.configuration import Configurator
+        from pyramid.router import Router
+        self.saved = (threadlocal.manager, Configurator.manager,
+                      Router.threadlocal_manager)
+
+    def tearDown(self):
+        from pyramid import threadlocal
+        from pyramid.configuration import Configurator
+        from pyramid.router import Router
+        (threadlocal.manager, Configurator.manager,
+         Router.threadlocal_manager) = self.saved
+
+    def _callFUT(self, new_manager):
+        from pyramid.threadlocal import use_manager
+        return use_manager(new_manager)
+
+    def test_it(self):
+        from pyramid import threadlocal
+        from pyramid.configuration import Configurator
+        from pyramid.router import Router
+        new_manager = threadlocal.GreenletLocalManager(
+            default=threadlocal.defaults)
+        self._callFUT(new_manager)
+        self.assertEqual(threadlocal.manager, new_manager)
+        self.assertEqual(Configurator.manager, new_manager)
+        self.assertEqual(Router.threadlocal_manager, new_manager)
+        request = object()
+        new_manager.push({'request':request, 'registry':None})
+        try:
+            self.assertEqual(threadlocal.get_current_request(), request)
+        finally:
+            new_manager.pop()
 
 class TestGetCurrentRequest(unittest.TestCase):
     def _callFUT(self):
@@ -0,0 +1,93 @@
+import unittest
+
+class TestRequestTimingAggregator(unittest.TestCase):
+    def _getTargetClass(self):
+        from pyramid.timing import RequestTimingAggregator
+        return RequestTimingAggregator
+
+    def _makeOne(self, precision=0.05):
+        return self._getTargetClass()(precision)
+
+    def test_class_implements_IRequestTimer(self):
+        from zope.interface.verify import verifyClass
+        from pyramid.interfaces import IRequestTimer
+        verifyClass(IRequestTimer, self._getTargetClass())
+
+    def test_instance_implements_IRequestTimer(self):
+        from zope.interface.verify import verifyObject
+        from pyramid.interfaces import IRequestTimer
+        verifyObject(IRequestTimer, self._makeOne())
+
+    def test_call_phases(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('root_factory', 1.5),
+                           ('view', 3.5)])
+        timer('foo', u'', [('start', 1.0), ('root_factory', 2.0),
+                           ('view', 2.5)])
+        self.assertEqual(timer.phase_totals('foo'),
+                         {'root_factory':1.5, 'view':2.5})
+        self.assertEqual(timer.count('foo'), 2)
+
+    def test_phase_totals_no_requests(self):
+        timer = self._makeOne()
+        self.assertEqual(timer.phase_totals('foo'), {})
+
+    def test_count_no_requests(self):
+        timer = self._makeOne()
+        self.assertEqual(timer.count('foo'), 0)
+
+    def test_count_locks(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('view', 2.0)])
+        timer.lock = DummyLock()
+        self.assertEqual(timer.count('foo'), 1)
+        self.assertEqual(timer.lock.calls, ['acquire', 'release'])
+
+    def test_route_names(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('view', 2.0)])
+        timer(None, u'', [('start', 1.0), ('view', 2.0)])
+        timer('bar', u'', [('start', 1.0), ('view', 2.0)])
+        self.assertEqual(timer.route_names(), [None, 'bar', 'foo'])
+
+    def test_percentiles_no_requests(self):
+        timer = self._makeOne()
+        self.assertEqual(timer.percentiles('foo'), {})
+
+    def test_percentiles(self):
+        timer = self._makeOne(precision=0.01)
+        for i in range(1, 101):
+            timer('foo', u'', [('start', 1.0), ('view', 1.0 + i / 1000.0)])
+        result = timer.percentiles('foo')
+        self.assertEqual(sorted(result.keys()), [50, 95, 99])
+        for percentile, expected in ((50, 0.050), (95, 0.095), (99, 0.099)):
+            self.failUnless(expected <= result[percentile] <= expected * 1.01,
+                            (percentile, result[percentile]))
+
+    def test_percentiles_custom(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('view', 1.1)])
+        result = timer.percentiles('foo', (100,))
+        self.failUnless(0.1 <= result[100] <= 0.105, result)
+
+    def test_percentiles_zero_duration(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('view', 1.0)])
+        self.assertEqual(timer.percentiles('foo', (50,)), {50:1e-6})
+
+    def test_clear(self):
+        timer = self._makeOne()
+        timer('foo', u'', [('start', 1.0), ('view', 2.0)])
+        timer.clear()
+        self.assertEqual(timer.route_names(), [])
+        self.assertEqual(timer.phase_totals('foo'), {})
+
+class DummyLock(object):
+    def __init__(self):
+        self.calls = []
+
+    def acquire(self):
+        self.calls.append('acquire')
+
+    def release(self):
+        self.calls.append('release')
@@ -23,6 +23,30 @@ class TraversalPathTests(unittest.TestCase):
         self.assertEqual(self._callFUT('/foo/space%20thing/bar'),
                          (u'foo', u'space thing', u'bar'))
 
+    def test_element_urlquoted_dots(self):
+        self.assertEqual(self._callFUT('/foo//./b%20r/../%2e%2e/baz'),
+                         (u'baz',))
+
+    def test_dots_not_segments(self):
+        self.assertEqual(self._callFUT('/foo/.bar/baz.html/'),
+                         (u'foo', u'.bar', u'baz.html'))
+
+    def test_dots_leading(self):
+        self.assertEqual(self._callFUT('./foo/..'), ())
+
+    def test_twodots_above_root(self):
+        self.assertRaises(IndexError, self._callFUT, '/foo/../..')
+
+    def test_utf8_not_urlquoted(self):
+        la = 'La Pe\xc3\xb1a'
+        self.assertEqual(self._callFUT('/%s/./bar' % la),
+                         (unicode(la, 'utf-8'), u'bar'))
+
+    def test_utf16_not_urlquoted(self):
+        from pyramid.exceptions import URLDecodeError
+        la = unicode('La Pe\xc3\xb1a', 'utf-8').encode('utf-16')
+        self.assertRaises(URLDecodeError, self._callFUT, '/foo/%s' % la)
+
     def test_segments_are_unicode(self):
         result = self._callFUT('/foo/bar')
         self.assertEqual(type(result[0]), unicode)
@@ -240,6 +264,30 @@ class ModelGraphTraverserTests(unittest.TestCase):
         self.assertEqual(result['virtual_root'], baz)
         self.assertEqual(result['virtual_root_path'], (u'foo', u'bar', u'baz'))
 
+    def test_call_with_vh_root_and_dots_leaving_it(self):
+        environ = self._getEnviron(PATH_INFO='/../baz',
+                                   HTTP_X_VHM_ROOT='/foo/bar')
+        baz = DummyContext(None, 'baz')
+        foo = DummyContext(baz, 'foo')
+        root = DummyContext(foo, 'root')
+        policy = self._makeOne(root)
+        result = policy(environ)
+        self.assertEqual(result['context'], baz)
+        self.assertEqual(result['traversed'], (u'foo', u'baz'))
+        self.assertEqual(result['virtual_root'], baz)
+        self.assertEqual(result['virtual_root_path'], (u'foo', u'bar'))
+
+    def test_call_with_vh_root_path_not_absolute(self):
+        environ = self._getEnviron(PATH_INFO='baz',
+                                   HTTP_X_VHM_ROOT='/foo/bar')
+        bar = DummyContext(None, 'barbaz')
+        foo = DummyContext(bar, 'foo')
+        root = DummyContext(foo, 'root')
+        policy = self._makeOne(root)
+        result = policy(environ)
+        self.assertEqual(result['context'], bar)
+        self.assertEqual(result['traversed'], (u'foo', u'barbaz'))
+
     def test_call_with_vh_root_path_root(self):
         policy = self._makeOne(None)
         environ = self._getEnviron(HTTP_X_VHM_ROOT='/',
@@ -336,6 +384,339 @@ class ModelGraphTraverserTests(unittest.TestCase):
         self.assertEqual(result['virtual_root'], model)
         self.assertEqual(result['virtual_root_path'], ())
 
+    def test_withroute_and_traverse_unicode_tuple(self):
+        # the segments are used as they are
+        foo = DummyContext(None, u'La Pe\xf1a/')
+        model = DummyContext(foo)
+        traverser = self._makeOne(model)
+        environ = {'bfg.routes.matchdict':
+                   {'traverse':(u'La Pe\xf1a/', u'bar')}}
+        result = traverser(environ)
+        self.assertEqual(result['context'], foo)
+        self.assertEqual(result['view_name'], u'bar')
+        self.assertEqual(result['subpath'], ())
+        self.assertEqual(result['traversed'], (u'La Pe\xf1a/',))
+
+    def test_withroute_and_traverse_tuple_with_dot_segments(self):
+        foo = DummyContext(None, 'foo')
+        model = DummyContext(foo)
+        traverser = self._makeOne(model)
+        environ = {'bfg.routes.matchdict':
+                   {'traverse':(u'bar', u'..', u'', u'.', u'foo')}}
+        result = traverser(environ)
+        self.assertEqual(result['context'], foo)
+        self.assertEqual(result['view_name'], u'')
+        self.assertEqual(result['traversed'], (u'foo',))
+
+class ModelGraphTraverserTraverseManyTests(unittest.TestCase):
+    def setUp(self):
+        cleanUp()
+
+    def tearDown(self):
+        cleanUp()
+
+    def _makeOne(self, root):
+        from pyramid.traversal import ModelGraphTraverser
+        return ModelGraphTraverser(root)
+
+    def _makeTree(self, factory, calls=None):
+        # root/a/b/c/d, root/a/x (a leaf without __getitem__)
+        root = factory('root', calls)
+        a = root.add(factory('a', calls))
+        b = a.add(factory('b', calls))
+        c = b.add(factory('c', calls))
+        c.add(factory('d', calls))
+        a.children['x'] = DummyLeaf()
+        return root
+
+    def _traverse(self, root, path, vroot=None):
+        environ = {'PATH_INFO':path}
+        if vroot is not None:
+            environ['HTTP_X_VHM_ROOT'] = vroot
+        return self._makeOne(root)(environ)
+
+    def _names(self, result):
+        names = {}
+        for key, value in result.items():
+            names[key] = getattr(value, '__name__', value)
+        return names
+
+    def test_equivalent_to_getitem(self):
+        paths = ['/', '/a', '/a/b/c/d', '/a/b/c/d/e/f', '/a/b/nope/c',
+                 '/nope', '/a/x/y/z', '/a/b/@@view/c', '/@@view',
+                 '/a/@@view', '/a/b/c/d/@@view/x', '/a/b/view']
+        vroots = [None, '/', '/a', '/a/b', '/a/b/c/d']
+        plain = self._makeTree(DummyTreeNode)
+        batched = self._makeTree(DummyBatchNode, [])
+        for path in paths:
+            for vroot in vroots:
+                self.assertEqual(
+                    self._names(self._traverse(batched, path, vroot)),
+                    self._names(self._traverse(plain, path, vroot)),
+                    (path, vroot))
+
+    def test_one_call_per_run_of_segments(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        result = self._traverse(root, '/a/b/c/d')
+        self.assertEqual(result['context'].__name__, 'd')
+        self.assertEqual(calls, [('root', (u'a', u'b', u'c', u'd'))])
+
+    def test_view_selector_ends_run(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        result = self._traverse(root, '/a/b/@@view/c')
+        self.assertEqual(result['context'].__name__, 'b')
+        self.assertEqual(result['view_name'], u'view')
+        self.assertEqual(result['subpath'], (u'c',))
+        self.assertEqual(calls, [('root', (u'a', u'b'))])
+
+    def test_partial_chain_continues_from_last_object(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        root.limit = 2
+        result = self._traverse(root, '/a/b/c/d/e')
+        self.assertEqual(result['context'].__name__, 'd')
+        self.assertEqual(result['view_name'], u'e')
+        self.assertEqual(result['traversed'], (u'a', u'b', u'c', u'd'))
+        self.assertEqual(calls, [('root', (u'a', u'b', u'c', u'd', u'e')),
+                                 ('b', (u'c', u'd', u'e')),
+                                 ('d', (u'e',))])
+
+    def test_empty_chain_is_not_found(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        result = self._traverse(root, '/nope/a')
+        self.assertEqual(result['context'], root)
+        self.assertEqual(result['view_name'], u'nope')
+        self.assertEqual(result['subpath'], (u'a',))
+        self.assertEqual(result['traversed'], ())
+
+    def test_vroot_inside_chain(self):
+        root = self._makeTree(DummyBatchNode, [])
+        result = self._traverse(root, '/c/d', '/a/b')
+        self.assertEqual(result['virtual_root'].__name__, 'b')
+        self.assertEqual(result['context'].__name__, 'd')
+        self.assertEqual(result['traversed'], (u'a', u'b', u'c', u'd'))
+
+class TraversalCacheTests(unittest.TestCase):
+    def _getTargetClass(self):
+        from pyramid.traversal import TraversalCache
+        return TraversalCache
+
+    def _makeOne(self, *arg, **kw):
+        return self._getTargetClass()(*arg, **kw)
+
+    def _makeTree(self):
+        root = DummyTreeNode('root')
+        a = root.add(DummyTreeNode('a'))
+        b = a.add(DummyTreeNode('b'))
+        b.add(DummyTreeNode('c'))
+        root.add(DummyTreeNode('d'))
+        return root
+
+    def _traverse(self, cache, root, path, **kw):
+        environ = {'PATH_INFO':path}
+        environ.update(kw)
+        return cache(root)(DummyRequest(environ))
+
+    def test_call_returns_caching_traverser(self):
+        from zope.interface.verify import verifyObject
+        from pyramid.interfaces import ITraverser
+        from pyramid.traversal import CachingTraverser
+        cache = self._makeOne()
+        root = self._makeTree()
+        traverser = cache(root)
+        self.failUnless(isinstance(traverser, CachingTraverser))
+        self.failUnless(traverser.cache is cache)
+        self.failUnless(traverser.root is root)
+        verifyObject(ITraverser, traverser)
+
+    def test_results_equal_model_graph_traverser(self):
+        from pyramid.traversal import ModelGraphTraverser
+        cache = self._makeOne()
+        root = self._makeTree()
+        for path in ['/', '/a', '/a/b/c', '/a/b/nope/x', '/a/@@view/b']:
+            for vroot in [None, '/a']:
+                environ = {'PATH_INFO':path}
+                if vroot is not None:
+                    environ['HTTP_X_VHM_ROOT'] = vroot
+                expected = ModelGraphTraverser(root)(DummyRequest(environ))
+                self.assertEqual(cache(root)(DummyRequest(environ)),
+                                 expected)
+                self.assertEqual(cache(root)(DummyRequest(environ)),
+                                 expected)
+        self.assertEqual(cache.hits, 10)
+        self.assertEqual(cache.misses, 10)
+
+    def test_hit_does_not_traverse(self):
+        traverser = DummyCountingTraverser()
+        cache = self._makeOne(traverser=traverser)
+        root = self._makeTree()
+        result1 = self._traverse(cache, root, '/a')
+        result2 = self._traverse(cache, root, '/a')
+        self.assertEqual(traverser.calls, ['/a'])
+        self.assertEqual(result1, result2)
+        self.failIf(result1 is result2)
+        result1['context'] = None
+        result3 = self._traverse(cache, root, '/a')
+        self.assertEqual(result3, result2)
+
+    def test_environ_rather_than_request(self):
+        traverser = DummyCountingTraverser()
+        cache = self._makeOne(traverser=traverser)
+        root = self._makeTree()
+        cache(root)({'PATH_INFO':'/a'})
+        cache(root)({'PATH_INFO':'/a'})
+        self.assertEqual(traverser.calls, ['/a'])
+
+    def test_keyed_by_virtual_root(self):
+        traverser = DummyCountingTraverser()
+        cache = self._makeOne(traverser=traverser)
+        root = self._makeTree()
+        self._traverse(cache, root, '/b')
+        self._traverse(cache, root, '/b', HTTP_X_VHM_ROOT='/a')
+        self.assertEqual(cache.misses, 2)
+
+    def test_keyed_by_matchdict(self):
+        traverser = DummyCountingTraverser()
+        cache = self._makeOne(traverser=traverser)
+        root = self._makeTree()
+        matchdict = {'traverse':(u'a', u'b'), 'subpath':(u'x',)}
+        self._traverse(cache, root, '/foo',
+                       **{'bfg.routes.matchdict':matchdict})
+        self._traverse(cache, root, '/bar',
+                       **{'bfg.routes.matchdict':matchdict.copy()})
+        self.assertEqual(cache.hits, 1)
+        self._traverse(cache, root, '/foo',
+                       **{'bfg.routes.matchdict':{'traverse':u'a/b'}})
+        self.assertEqual(cache.misses, 2)
+
+    def test_other_root_not_used(self):
+        cache = self._makeOne()
+        root1 = self._makeTree()
+        root2 = self._makeTree()
+        self._traverse(cache, root1, '/a')
+        result = self._traverse(cache, root2, '/a')
+        self.failUnless(result['root'] is root2)
+        self.assertEqual(cache.misses, 2)
+
+    def test_timeout(self):
+        cache = self._makeOne(timeout=1000)
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/a')
+        self.assertEqual(cache.hits, 1)
+        cache.timeout = -1
+        self._traverse(cache, root, '/a/b')
+        self._traverse(cache, root, '/a/b')
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 3)
+
+    def test_expired_entry_dropped(self):
+        cache = self._makeOne(timeout=-1)
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self.assertEqual(len(cache.entries), 1)
+        self._traverse(cache, root, '/d')
+        cache.timeout = None
+        self._traverse(cache, root, '/a/b')
+        self._traverse(cache, root, '/a')
+        self.assertEqual(cache.keys(),
+                         [('/d', None), ('/a/b', None), ('/a', None)])
+        self.assertEqual(cache.misses, 4)
+
+    def test_other_root_entry_kept(self):
+        cache = self._makeOne()
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/d')
+        self._traverse(cache, self._makeTree(), '/a')
+        self.assertEqual(cache.keys(), [('/d', None), ('/a', None)])
+
+    def test_size(self):
+        cache = self._makeOne(size=2)
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/a/b')
+        self._traverse(cache, root, '/a')
+        self.assertEqual(cache.hits, 1)
+        self._traverse(cache, root, '/d')
+        self.assertEqual(len(cache.entries), 2)
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/d')
+        self.assertEqual(cache.hits, 3)
+        self._traverse(cache, root, '/a/b')
+        self.assertEqual(cache.misses, 4)
+
+    def test_least_recently_used_discarded(self):
+        cache = self._makeOne(size=3)
+        root = self._makeTree()
+        for path in ['/a', '/a/b', '/d', '/a', '/']:
+            self._traverse(cache, root, path)
+        self.assertEqual(cache.keys(),
+                         [('/d', None), ('/a', None), ('/', None)])
+        self._traverse(cache, root, '/a')
+        self.assertEqual(cache.hits, 2)
+
+    def test_set_existing_key(self):
+        cache = self._makeOne()
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/d')
+        result = {'context':root, 'view_name':u'', 'subpath':(),
+                  'traversed':(), 'virtual_root':root,
+                  'virtual_root_path':(), 'root':root}
+        cache.set(('/a', None), result)
+        self.assertEqual(cache.keys(), [('/d', None), ('/a', None)])
+        self.assertEqual(cache.get(('/a', None), root), result)
+
+    def test_invalidate_subtree(self):
+        cache = self._makeOne()
+        root = self._makeTree()
+        for path in ['/', '/a', '/a/b/c', '/a/b/nope', '/a/x', '/d']:
+            self._traverse(cache, root, path)
+        cache.invalidate_subtree((u'', u'a', u'b'))
+        self.assertEqual(len(cache.entries), 4)
+        cache.invalidate_subtree((u'a', u'x'))
+        self.assertEqual(len(cache.entries), 3)
+        self.assertEqual(cache.misses, 6)
+        for path in ['/', '/a', '/d']:
+            self._traverse(cache, root, path)
+        self.assertEqual(cache.hits, 3)
+        cache.invalidate_subtree(('',))
+        self.assertEqual(cache.entries, {})
+        self.assertEqual(cache.keys(), [])
+
+    def test_invalidate_then_fill(self):
+        cache = self._makeOne(size=2)
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        cache.invalidate_subtree((u'a',))
+        self.assertEqual(cache.keys(), [])
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/d')
+        self.assertEqual(len(cache.entries), 2)
+        self._traverse(cache, root, '/a')
+        self._traverse(cache, root, '/d')
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.keys(), [('/a', None), ('/d', None)])
+
+    def test_size_zero(self):
+        cache = self._makeOne(size=0)
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        self.assertEqual(cache.entries, {})
+        self.assertEqual(cache.keys(), [])
+
+    def test_clear(self):
+        cache = self._makeOne()
+        root = self._makeTree()
+        self._traverse(cache, root, '/a')
+        cache.clear()
+        self.assertEqual(cache.entries, {})
+        self.assertEqual(cache.keys(), [])
+
 class FindInterfaceTests(unittest.TestCase):
     def _callFUT(self, context, iface):
         from pyramid.traversal import find_interface
@@ -381,6 +762,36 @@ class FindInterfaceTests(unittest.TestCase):
         result = self._callFUT(baz, DummyRoot)
         self.assertEqual(result.__name__, 'root')
 
+class FindInterfaceWithRequestTests(unittest.TestCase):
+    def _callFUT(self, context, iface, request):
+        from pyramid.traversal import find_interface
+        return find_interface(context, iface, request)
+
+    def test_memoized(self):
+        from zope.interface import directlyProvides
+        from zope.interface import Interface
+        class IFoo(Interface):
+            pass
+        class IBar(Interface):
+            pass
+        root = DummyContext()
+        root.__parent__ = None
+        foo = DummyContext()
+        foo.__parent__ = root
+        directlyProvides(root, IFoo)
+        request = DummyRequest()
+        self.assertEqual(self._callFUT(foo, IFoo, request), root)
+        self.assertEqual(self._callFUT(foo, IBar, request), None)
+        self.assertEqual(self._callFUT(foo, DummyContext, request), foo)
+        directlyProvides(foo, IBar)
+        self.assertEqual(self._callFUT(foo, IFoo, request), root)
+        self.assertEqual(self._callFUT(foo, IBar, request), None)
+        self.assertEqual(self._callFUT(root, IFoo, request), root)
+        self.assertEqual(self._callFUT(foo, IBar, DummyRequest()), foo)
+        foo.__parent__ = None
+        self.assertEqual(self._callFUT(foo, IFoo, request), None)
+        self.assertEqual(self._callFUT(foo, IBar, request), foo)
+
 class FindRootTests(unittest.TestCase):
     def _callFUT(self, context):
         from pyramid.traversal import find_root
@@ -549,6 +960,115 @@ class FindModelTests(unittest.TestCase):
         result = self._callFUT(root, u'/%E6%B5%81%E8%A1%8C%E8%B6%8B%E5%8A%BF')
         self.assertEqual(result, unprintable)
 
+class FindModelsTests(unittest.TestCase):
+    def setUp(self):
+        cleanUp()
+
+    def tearDown(self):
+        cleanUp()
+
+    def _callFUT(self, model, paths, default=None):
+        from pyramid.traversal import find_models
+        return find_models(model, paths, default)
+
+    def _makeTree(self, factory, calls=None):
+        # root/a/b/c/d, root/a/b/e, root/a/x (a leaf), root/f
+        root = factory('', calls)
+        root.__name__ = None
+        a = root.add(factory('a', calls))
+        b = a.add(factory('b', calls))
+        c = b.add(factory('c', calls))
+        c.add(factory('d', calls))
+        b.add(factory('e', calls))
+        a.children['x'] = DummyLeaf()
+        root.add(factory('f', calls))
+        return root
+
+    def _expected(self, model, paths, default=None):
+        from pyramid.traversal import find_model
+        expected = {}
+        for path in paths:
+            try:
+                expected[path] = find_model(model, path)
+            except KeyError:
+                expected[path] = default
+        return expected
+
+    _paths = ['', '/', '/a', '/a/b/c/d', '/a/b/e', '/a/b/c/d/nope',
+              '/a/nope/b', '/nope', '/a/x', '/a/x/y', '/a/b/@@view',
+              '/a/b/@@', '/a/b/@@/c', '/a/b/../b/e', u'/a/b', '/f/',
+              'b/c', 'c/d', 'nope', ('', 'a', 'b', 'e'), ('b', 'e'), (),
+              ('', u'a', u'nope')]
+
+    def test_same_as_find_model(self):
+        marker = object()
+        for factory in (DummyTreeNode, DummyBatchNode):
+            root = self._makeTree(factory, [])
+            for limit in (None, 1, 2):
+                root.limit = limit
+                for model in (root, root['a'], root['a']['b']):
+                    self.assertEqual(
+                        self._callFUT(model, self._paths, marker),
+                        self._expected(model, self._paths, marker))
+
+    def test_default(self):
+        root = self._makeTree(DummyTreeNode)
+        result = self._callFUT(root, ['/nope', '/a'])
+        self.assertEqual(result, {'/nope':None, '/a':root['a']})
+
+    def test_list_paths(self):
+        root = self._makeTree(DummyTreeNode)
+        result = self._callFUT(root, [['a'], ['', 'a', 'b'], [], ['nope']])
+        self.assertEqual(result, {('a',):root['a'],
+                                  ('', 'a', 'b'):root['a']['b'],
+                                  ():root, ('nope',):None})
+
+    def test_shared_prefix_traversed_once(self):
+        calls = []
+        root = self._makeTree(DummyCountingNode, calls)
+        paths = ['/a/b/c/d', '/a/b/e', '/a/b', '/a/b/c/nope']
+        result = self._callFUT(root, paths)
+        self.assertEqual(result['/a/b/e'].__name__, 'e')
+        self.assertEqual(sorted(calls),
+                         [(None, u'a'), ('a', u'b'), ('b', u'c'), ('b', u'e'),
+                          ('c', u'd'), ('c', u'nope')])
+
+    def test_traverse_many_passed_unbranched_segments(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        paths = ['/a/b/c/d', '/a/b/e', '/f/@@view']
+        result = self._callFUT(root, paths)
+        self.assertEqual(result['/a/b/c/d'].__name__, 'd')
+        self.assertEqual(result['/f/@@view'], None)
+        calls.sort()
+        self.assertEqual(calls, [(None, (u'a', u'b')), (None, (u'f',)),
+                                 ('b', (u'c', u'd')), ('b', (u'e',))])
+
+    def test_traverse_many_intermediate_paths(self):
+        calls = []
+        root = self._makeTree(DummyBatchNode, calls)
+        result = self._callFUT(root, ['/a/b/c/d', '/a/b'])
+        self.assertEqual(result['/a/b'], root['a']['b'])
+        self.assertEqual(result['/a/b/c/d'].__name__, 'd')
+        self.assertEqual(calls, [(None, (u'a', u'b', u'c', u'd'))])
+
+    def test_custom_traverser(self):
+        from zope.interface import Interface
+        from pyramid.interfaces import ITraverser
+        from pyramid.threadlocal import get_current_registry
+        root = self._makeTree(DummyTreeNode)
+        class Traverser(object):
+            def __init__(self, root):
+                self.root = root
+            def __call__(self, request):
+                if request.path_info == '/nope':
+                    return {'context':self.root, 'view_name':'nope'}
+                return {'context':self.root, 'view_name':''}
+        get_current_registry().registerAdapter(Traverser, (Interface,),
+                                               ITraverser)
+        result = self._callFUT(root, ['/a/b', '/nope'], 'missing')
+        self.assertEqual(result, {'/a/b':root, '/nope':'missing'})
+
 class ModelPathTests(unittest.TestCase):
     def _callFUT(self, model, *elements):
         from pyramid.traversal import model_path
@@ -676,6 +1196,115 @@ class ModelPathTupleTests(unittest.TestCase):
         result = self._callFUT(other2)
         self.assertEqual(result, ('', '', 'other2'))
 
+class CachedPathMixinTests(unittest.TestCase):
+    def _makeModel(self, name=None, parent=None):
+        from pyramid.traversal import CachedPathMixin
+        class Model(CachedPathMixin):
+            pass
+        model = Model()
+        model.__name__ = name
+        model.__parent__ = parent
+        return model
+
+    def _makeTree(self):
+        root = self._makeModel()
+        a = self._makeModel(u'a', root)
+        b = self._makeModel(u'b', a)
+        c = self._makeModel(u'c', b)
+        return root, a, b, c
+
+    def _cached(self, model):
+        from pyramid.traversal import _model_paths
+        from pyramid.traversal import _model_path_generation
+        entry = _model_paths.get(id(model))
+        if (entry is not None and entry[1] == _model_path_generation[0]
+            and entry[0]() is model):
+            return entry[2]
+
+    def test_model_path_tuple_caches_lineage(self):
+        from pyramid.traversal import model_path_tuple
+        root, a, b, c = self._makeTree()
+        self.assertEqual(model_path_tuple(c), ('', u'a', u'b', u'c'))
+        self.assertEqual(self._cached(c), ('', u'a', u'b', u'c'))
+        self.assertEqual(self._cached(a), ('', u'a'))
+        self.assertEqual(self._cached(root), ('',))
+        self.assertEqual(model_path_tuple(b, 'x'), ('', u'a', u'b', 'x'))
+        self.assertEqual(model_path_tuple(b), ('', u'a', u'b'))
+
+    def test_model_path_uses_cache(self):
+        from pyramid.traversal import model_path
+        from pyramid.traversal import _model_paths
+        root, a, b, c = self._makeTree()
+        self.assertEqual(model_path(c), '/a/b/c')
+        self.assertEqual(model_path(c), '/a/b/c')
+        self.assertEqual(_model_paths[id(c)][3], '/a/b/c')
+        self.assertEqual(model_path(c, 'x'), '/a/b/c/x')
+        _model_paths[id(c)][2] = ('', u'cached')
+        _model_paths[id(c)][3] = None
+        self.assertEqual(model_path(c), '/cached')
+
+    def test_rename_invalidates_descendants(self):
+        from pyramid.traversal import model_path
+        root, a, b, c = self._makeTree()
+        self.assertEqual(model_path(c), '/a/b/c')
+        a.__name__ = u'z'
+        self.assertEqual(self._cached(c), None)
+        self.assertEqual(model_path(c), '/z/b/c')
+        self.assertEqual(model_path(b), '/z/b')
+
+    def test_move_invalidates_descendants(self):
+        from pyramid.traversal import model_path
+        root, a, b, c = self._makeTree()
+        self.assertEqual(model_path(c), '/a/b/c')
+        b.__parent__ = root
+        self.assertEqual(model_path(c), '/b/c')
+
+    def test_delattr_invalidates(self):
+        from pyramid.traversal import model_path
+        root, a, b, c = self._makeTree()
+        self.assertEqual(model_path(c), '/a/b/c')
+        del b.__name__
+        self.assertEqual(self._cached(c), None)
+        b.__name__ = u'y'
+        self.assertEqual(model_path(c), '/a/y/c')
+
+    def test_new_model_does_not_invalidate(self):
+        from pyramid.traversal import model_path
+        root, a, b, c = self._makeTree()
+        model_path(c)
+        self._makeModel(u'd', c)
+        self.assertEqual(self._cached(c), ('', u'a', u'b', u'c'))
+
+    def test_not_cached_unless_lineage_uses_mixin(self):
+        from pyramid.traversal import model_path
+        root = DummyContext()
+        root.__name__ = None
+        root.__parent__ = None
+        a = self._makeModel(u'a', root)
+        self.assertEqual(model_path(a), '/a')
+        self.assertEqual(self._cached(a), None)
+
+    def test_entry_removed_when_model_collected(self):
+        from pyramid.traversal import model_path
+        from pyramid.traversal import _model_paths
+        import gc
+        root, a, b, c = self._makeTree()
+        model_path(c)
+        key = id(c)
+        self.failUnless(key in _model_paths)
+        del c
+        gc.collect()
+        self.failIf(key in _model_paths)
+
+    def test_forget_path_other_ref(self):
+        from pyramid.traversal import _forget_path
+        from pyramid.traversal import _model_paths
+        from pyramid.traversal import model_path
+        root, a, b, c = self._makeTree()
+        model_path(c)
+        _forget_path(id(c), None)
+        self.failUnless(id(c) in _model_paths)
+
 class QuotePathSegmentTests(unittest.TestCase):
     def _callFUT(self, s):
         from pyramid.traversal import quote_path_segment
@@ -814,6 +1443,48 @@ class TraversalContextURLTests(unittest.TestCase):
         self.assertEqual(context_url.virtual_root(), traversed_to)
         self.assertEqual(context.request.environ['PATH_INFO'], '/one')
 
+    def test_virtual_root_with_virtual_root_path_traversed(self):
+        from pyramid.interfaces import VH_ROOT_KEY
+        context = DummyContext()
+        vroot = DummyContext()
+        request = DummyRequest({VH_ROOT_KEY:'/one/two'})
+        request.root = context
+        request.virtual_root = vroot
+        request.virtual_root_path = (u'one', u'two')
+        request.traversed = (u'one', u'two', u'three')
+        context_url = self._makeOne(context, request)
+        self.assertEqual(context_url.virtual_root(), vroot)
+
+    def test_virtual_root_with_virtual_root_path_other_graph(self):
+        from pyramid.interfaces import VH_ROOT_KEY
+        context = DummyContext()
+        context.__parent__ = None
+        traversed_to = DummyContext()
+        request = DummyRequest({VH_ROOT_KEY:'/one/two'})
+        request.root = DummyContext()
+        request.virtual_root = DummyContext()
+        request.virtual_root_path = (u'one', u'two')
+        request.traversed = (u'one', u'two', u'three')
+        traverser = make_traverser({'context':traversed_to, 'view_name':''})
+        self._registerTraverser(traverser)
+        context_url = self._makeOne(context, request)
+        self.assertEqual(context_url.virtual_root(), traversed_to)
+        self.failUnless(context.wascontext)
+
+    def test_virtual_root_with_virtual_root_path_not_traversed(self):
+        from pyramid.interfaces import VH_ROOT_KEY
+        context = DummyContext()
+        context.__parent__ = None
+        traversed_to = DummyContext()
+        request = DummyRequest({VH_ROOT_KEY:'/one/two'})
+        request.virtual_root = context
+        request.virtual_root_path = (u'one', u'two')
+        request.traversed = (u'one',)
+        traverser = make_traverser({'context':traversed_to, 'view_name':''})
+        self._registerTraverser(traverser)
+        context_url = self._makeOne(context, request)
+        self.assertEqual(context_url.virtual_root(), traversed_to)
+
     def test_empty_names_not_ignored(self):
         bar = DummyContext()
         empty = DummyContext(bar)
@@ -1039,6 +1710,61 @@ class DummyContext(object):
     def __repr__(self):
         return '<DummyContext with name %s at id %s>'%(self.__name__, id(self))
 
+class DummyTreeNode(object):
+    __parent__ = None
+    def __init__(self, name, calls=None):
+        self.__name__ = name
+        self.calls = calls
+        self.children = {}
+
+    def add(self, child):
+        child.__parent__ = self
+        self.children[child.__name__] = child
+        return child
+
+    def __getitem__(self, name):
+        return self.children[name]
+
+class DummyCountingNode(DummyTreeNode):
+    def __getitem__(self, name):
+        self.calls.append((self.__name__, name))
+        return self.children[name]
+
+class DummyCountingTraverser(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, root):
+        self.root = root
+        return self.traverse
+
+    def traverse(self, request):
+        try:
+            environ = request.environ
+        except AttributeError:
+            environ = request
+        self.calls.append(environ['PATH_INFO'])
+        return {'context':self.root, 'view_name':u'', 'subpath':(),
+                'traversed':(), 'virtual_root':self.root,
+                'virtual_root_path':(), 'root':self.root}
+
+class DummyBatchNode(DummyTreeNode):
+    limit = None
+    def __traverse_many__(self, segments):
+        self.calls.append((self.__name__, segments))
+        chain = []
+        ob = self
+        for segment in segments[:self.limit]:
+            try:
+                ob = ob.children[segment]
+            except (AttributeError, KeyError):
+                break
+            chain.append(ob)
+        return chain
+
+class DummyLeaf(object):
+    __name__ = 'x'
+
 class DummyRequest:
     application_url = 'http://example.com:5432' # app_url never ends with slash
     def __init__(self, environ=None):
@@ -136,6 +136,104 @@ class ModelURLTests(unittest.TestCase):
         result = self._callFUT(root, request)
         self.assertEqual(result, 'http://example.com/context/')
 
+class TestModelUrls(unittest.TestCase):
+    def setUp(self):
+        cleanUp()
+
+    def tearDown(self):
+        cleanUp()
+
+    def _callFUT(self, models, request, *elements, **kw):
+        from pyramid.url import model_urls
+        return model_urls(models, request, *elements, **kw)
+
+    def _makeTree(self):
+        root = DummyContext()
+        root.__name__ = None
+        root.__parent__ = None
+        a = DummyContext()
+        a.__name__ = u'La Pe\xf1a'
+        a.__parent__ = root
+        b = DummyContext()
+        b.__name__ = 'b'
+        b.__parent__ = a
+        return root, a, b
+
+    def test_empty(self):
+        request = _makeRequest()
+        self.assertEqual(self._callFUT([], request), [])
+
+    def test_same_as_model_url(self):
+        from pyramid.url import model_url
+        models = self._makeTree()
+        for environ in [{}, {'HTTP_X_VHM_ROOT':'/La%20Pe%C3%B1a'},
+                        {'HTTP_X_VHM_ROOT':'/other'}]:
+            request = _makeRequest(environ)
+            for args, kw in [((), {}), (('x', u'y z'), {}),
+                             (('x',), {'query':{'a':'1'}, 'anchor':u'f'})]:
+                expected = [model_url(model, request, *args, **kw)
+                            for model in models]
+                self.assertEqual(
+                    self._callFUT(models, request, *args, **kw), expected)
+
+    def test_application_url_computed_once(self):
+        request = _makeRequest()
+        calls = []
+        class Request(DummyRequest):
+            def application_url(self):
+                calls.append(1)
+                return 'http://example.com'
+            application_url = property(application_url)
+        request = Request()
+        request.registry = _makeRequest().registry
+        result = self._callFUT(self._makeTree(), request)
+        self.assertEqual(result, ['http://example.com/',
+                                  'http://example.com/La%20Pe%C3%B1a/',
+                                  'http://example.com/La%20Pe%C3%B1a/b/'])
+        self.assertEqual(calls, [1])
+
+    def test_with_IContextURL_registered(self):
+        from zope.interface import Interface
+        from zope.interface import directlyProvides
+        from pyramid.interfaces import IContextURL
+        class IFoo(Interface):
+            pass
+        created = []
+        class ContextURL(object):
+            def __init__(self, context, request):
+                created.append(context)
+                self.context = context
+            def __call__(self):
+                return 'http://example.com/%s/' % self.context.__name__
+        request = _makeRequest()
+        request.registry.registerAdapter(ContextURL, (IFoo, Interface),
+                                         IContextURL)
+        root, a, b = self._makeTree()
+        directlyProvides(a, IFoo)
+        directlyProvides(b, IFoo)
+        result = self._callFUT([root, a, b], request, 'x')
+        self.assertEqual(result, ['http://example.com:5432/x',
+                                  u'http://example.com/La Pe\xf1a/x',
+                                  'http://example.com/b/x'])
+        self.assertEqual(created, [a, b])
+
+    def test_IContextURL_factory_returns_None(self):
+        from zope.interface import Interface
+        from pyramid.interfaces import IContextURL
+        request = _makeRequest()
+        request.registry.registerAdapter(lambda *arg: None,
+                                         (Interface, Interface),
+                                         IContextURL)
+        root, a, b = self._makeTree()
+        self.assertEqual(self._callFUT([b], request),
+                         ['http://example.com:5432/La%20Pe%C3%B1a/b/'])
+
+    def test_no_registry_on_request(self):
+        request = DummyRequest()
+        root, a, b = self._makeTree()
+        self.assertEqual(self._callFUT([root], request),
+                         ['http://example.com:5432/'])
+
 class TestRouteUrl(unittest.TestCase):
     def setUp(self):
         cleanUp()
@@ -209,6 +307,78 @@ class TestRouteUrl(unittest.TestCase):
         self.assertEqual(result,  'http://example2.com/1/2/3/a')
         self.assertEqual(route.kw, {}) # shouldnt have anchor/query
 
+class TestRouteUrls(unittest.TestCase):
+    def setUp(self):
+        cleanUp()
+
+    def tearDown(self):
+        cleanUp()
+        
+    def _callFUT(self, *arg, **kw):
+        from pyramid.url import route_urls
+        return route_urls(*arg, **kw)
+
+    def test_no_such_route(self):
+        from pyramid.interfaces import IRoutesMapper
+        request = _makeRequest()
+        mapper = DummyRoutesMapper()
+        request.registry.registerUtility(mapper, IRoutesMapper)
+        self.assertRaises(KeyError, self._callFUT, 'flub', request, [{}])
+
+    def test_empty(self):
+        from pyramid.interfaces import IRoutesMapper
+        request = _makeRequest()
+        mapper = DummyRoutesMapper(route=DummyRoute('/1/2/3'))
+        request.registry.registerUtility(mapper, IRoutesMapper)
+        self.assertEqual(self._callFUT('flub', request, []), [])
+
+    def test_it(self):
+        from pyramid.interfaces import IRoutesMapper
+        from pyramid.urldispatch import Route
+        request = _makeRequest()
+        route = Route('item', '/items/{id}')
+        mapper = DummyRoutesMapper(route=route)
+        request.registry.registerUtility(mapper, IRoutesMapper)
+        kws = [{'id':'1'}, {'id':u'La Pe\xf1a', '_query':{'a':1}},
+               {'id':'3', '_app_url':'http://example2.com', '_anchor':'x'}]
+        result = self._callFUT('item', request, kws, 'edit')
+        self.assertEqual(result, [
+            'http://example.com:5432/items/1/edit',
+            'http://example.com:5432/items/La%20Pe%C3%B1a/edit?a=1',
+            'http://example2.com/items/3/edit#x',
+            ])
+        self.assertEqual(kws[1]['_query'], {'a':1})
+
+    def test_application_url_computed_once(self):
+        from pyramid.interfaces import IRoutesMapper
+        calls = []
+        class Request(DummyRequest):
+            def application_url(self):
+                calls.append(True)
+                return 'http://example.com'
+            application_url = property(application_url)
+        request = Request()
+        request.registry = _makeRequest().registry
+        mapper = DummyRoutesMapper(route=DummyRoute('/1/2/3'))
+        request.registry.registerUtility(mapper, IRoutesMapper)
+        result = self._callFUT('flub', request, [{}, {}, {}])
+        self.assertEqual(result, ['http://example.com/1/2/3'] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_with_pregenerator(self):
+        from pyramid.interfaces import IRoutesMapper
+        request = _makeRequest()
+        route = DummyRoute(result='/1/2/3')
+        def pregenerator(request, elements, kw):
+            return elements + (kw.pop('extra'),), kw
+        route.pregenerator = pregenerator
+        mapper = DummyRoutesMapper(route=route)
+        request.registry.registerUtility(mapper, IRoutesMapper)
+        result = self._callFUT('flub', request, [{'extra':'a'},
+                                                 {'extra':'b'}])
+        self.assertEqual(result, ['http://example.com:5432/1/2/3/a',
+                                  'http://example.com:5432/1/2/3/b'])
+
 class TestRoutePath(unittest.TestCase):
     def setUp(self):
         cleanUp()
@@ -42,6 +42,10 @@ class TestRoute(unittest.TestCase):
         route = self._makeOne('name', ':path')
         self.assertEqual(route.generate({'path':'abc'}), '/abc')
 
+    def test_prefix(self):
+        route = self._makeOne('name', 'archives/:action/:article')
+        self.assertEqual(route.prefix, '/archives/')
+
 class RoutesMapperTests(unittest.TestCase):
     def setUp(self):
         testing.setUp()
@@ -217,6 +221,171 @@ class RoutesMapperTests(unittest.TestCase):
         mapper.routes['abc'] =  route
         self.assertEqual(mapper.generate('abc', {}), 123)
 
+class RoutesMapperCacheTests(unittest.TestCase):
+    def setUp(self):
+        testing.setUp()
+
+    def tearDown(self):
+        testing.tearDown()
+
+    def _getRequest(self, path):
+        return DummyRequest({'PATH_INFO':path})
+
+    def _makeOne(self, cache_size=10):
+        from pyramid.urldispatch import RoutesMapper
+        return RoutesMapper(cache_size=cache_size)
+
+    def test_no_cache_by_default(self):
+        from pyramid.urldispatch import RoutesMapper
+        mapper = RoutesMapper()
+        self.assertEqual(mapper.cache, None)
+        mapper.connect('foo', 'archives/:action')
+        mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(mapper.cache_hits, 0)
+        self.assertEqual(mapper.cache_misses, 0)
+
+    def test_hit(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action')
+        first = mapper(self._getRequest('/archives/action1'))
+        second = mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(mapper.cache_misses, 1)
+        self.assertEqual(mapper.cache_hits, 1)
+        self.assertEqual(second['route'], mapper.routes['foo'])
+        self.assertEqual(second['match'], {'action':'action1'})
+        self.failIf(first['match'] is second['match'])
+
+    def test_cached_matchdict_not_mutable_by_caller(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action')
+        first = mapper(self._getRequest('/archives/action1'))
+        first['match']['action'] = 'changed'
+        second = mapper(self._getRequest('/archives/action1'))
+        second['match']['extra'] = True
+        third = mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(third['match'], {'action':'action1'})
+
+    def test_miss_is_cached(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action')
+        mapper(self._getRequest('/nowhere'))
+        result = mapper(self._getRequest('/nowhere'))
+        self.assertEqual(mapper.cache_hits, 1)
+        self.assertEqual(result, {'route':None, 'match':None})
+
+    def test_route_with_predicates_not_cached(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action',
+                       predicates=[lambda *arg: True])
+        mapper(self._getRequest('/archives/action1'))
+        mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(mapper.cache_hits, 0)
+        self.assertEqual(mapper.cache_misses, 2)
+
+    def test_failed_predicates_before_match_not_cached(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action',
+                       predicates=[lambda *arg: False])
+        mapper.connect('bar', 'archives/:action')
+        result = mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(result['route'], mapper.routes['bar'])
+        mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(mapper.cache_hits, 0)
+
+    def test_failed_predicates_miss_not_cached(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action',
+                       predicates=[lambda *arg: False])
+        mapper(self._getRequest('/archives/action1'))
+        mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(mapper.cache_hits, 0)
+
+    def test_connect_invalidates(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action')
+        mapper(self._getRequest('/archives/action1'))
+        mapper.connect('foo', 'blog/:action')
+        result = mapper(self._getRequest('/archives/action1'))
+        self.assertEqual(result['route'], None)
+        self.assertEqual(mapper.cache_hits, 0)
+        self.assertEqual(mapper.cache_misses, 2)
+
+    def test_bounded(self):
+        mapper = self._makeOne(cache_size=2)
+        mapper.connect('foo', 'archives/:action')
+        for i in range(10):
+            mapper(self._getRequest('/archives/%s' % i))
+        self.failUnless(len(mapper.cache.data) <= 2)
+
+class IndexedRoutesMapperTests(RoutesMapperTests):
+    def _getTargetClass(self):
+        from pyramid.urldispatch import IndexedRoutesMapper
+        return IndexedRoutesMapper
+
+    def test_connect_name_exists_removes_old_from_index(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', 'archives/:action/:article')
+        mapper.connect('foo', 'blog/:action/:article')
+        request = self._getRequest(PATH_INFO='/archives/action1/article1')
+        result = mapper(request)
+        self.assertEqual(result['route'], None)
+        request = self._getRequest(PATH_INFO='/blog/action1/article1')
+        result = mapper(request)
+        self.assertEqual(result['route'], mapper.routes['foo'])
+
+    def test_candidates_no_leading_slash(self):
+        mapper = self._makeOne()
+        mapper.connect('foo', '*traverse')
+        self.assertEqual(mapper.candidates('foo'), ())
+
+    def test_candidates_only_matching_prefixes(self):
+        mapper = self._makeOne()
+        a = mapper.connect('a', 'a/b/:c')
+        b = mapper.connect('b', 'b/:c')
+        c = mapper.connect('c', 'a/:b')
+        self.assertEqual(mapper.candidates('/a/b/c'), [a, c])
+        self.assertEqual(mapper.candidates('/b/c'), [b])
+        self.assertEqual(mapper.candidates('/c/d'), [])
+
+    def test_candidates_preserve_connection_order(self):
+        mapper = self._makeOne()
+        a = mapper.connect('a', 'a/b/:c')
+        b = mapper.connect('b', '*traverse')
+        c = mapper.connect('c', 'a/:b/:c')
+        d = mapper.connect('d', 'a/b/c/')
+        self.assertEqual(mapper.candidates('/a/b/c/'), [a, b, c, d])
+        self.assertEqual(mapper.candidates('/a/b/c'), [a, b, c])
+
+    def test_registration_order_wins_over_longer_prefix(self):
+        mapper = self._makeOne()
+        mapper.connect('general', 'a/:b/:c')
+        mapper.connect('specific', 'a/b/:c')
+        request = self._getRequest(PATH_INFO='/a/b/c')
+        result = mapper(request)
+        self.assertEqual(result['route'], mapper.routes['general'])
+
+    def test_path_without_leading_slash(self):
+        mapper = self._makeOne()
+        mapper.connect('root', '/')
+        request = self._getRequest(PATH_INFO='foo')
+        result = mapper(request)
+        self.assertEqual(result['route'], None)
+
+class TestRoutePrefix(unittest.TestCase):
+    def _callFUT(self, pattern):
+        from pyramid.urldispatch import _route_prefix
+        return _route_prefix(pattern)
+
+    def test_it(self):
+        self.assertEqual(self._callFUT(''), '/')
+        self.assertEqual(self._callFUT('/'), '/')
+        self.assertEqual(self._callFUT('foo/bar'), '/foo/bar')
+        self.assertEqual(self._callFUT('/foo/:bar'), '/foo/')
+        self.assertEqual(self._callFUT('/foo/{bar}/baz'), '/foo/')
+        self.assertEqual(self._callFUT('/foo/x{bar:\d+}'), '/foo/x')
+        self.assertEqual(self._callFUT('/static/*subpath'), '/static/')
+        self.assertEqual(self._callFUT('*traverse'), '/')
+
 class TestCompileRoute(unittest.TestCase):
     def _callFUT(self, pattern):
         from pyramid.urldispatch import _compile_route
@@ -310,6 +479,109 @@ class TestCompileRouteMatchFunctional(unittest.TestCase):
         self.generates('*traverse', {'traverse':('a', u'La Pe\xf1a')},
                        '/a/La%20Pe%C3%B1a')
         self.generates('/foo/:id.html', {'id':'bar'}, '/foo/bar.html')
+        self.generates('/foo%20bar/{x}', {'x':'a b'}, '/foo%20bar/a%20b')
+        self.generates('/{x}/{y}', {'x':1, 'y':('a', 'b')}, "/1/('a', 'b')")
+        self.generates('/{x}', {'x':'a', 'unused':'b'}, '/a')
+        self.generates('/{x}*y', {'x':'a', 'y':2}, '/a2')
+
+    def test_generator_missing_value(self):
+        from pyramid.urldispatch import _compile_route
+        generator = _compile_route('/{x}/{y}*traverse')[1]
+        self.assertRaises(KeyError, generator, {'x':'a'})
+        self.assertRaises(KeyError, generator, {'x':'a', 'y':'b'})
+
+class TestCompileTraverse(unittest.TestCase):
+    def _callFUT(self, pattern):
+        from pyramid.urldispatch import _compile_traverse
+        return _compile_traverse(pattern)
+
+    def traverses(self, pattern, match, result):
+        # the result is that of parsing the path generated from the match
+        from pyramid.urldispatch import _compile_route
+        from pyramid.traversal import traversal_path
+        generator = _compile_route(pattern)[1]
+        self.assertEqual(traversal_path(generator(match)), result)
+        self.assertEqual(self._callFUT(pattern)(match), result)
+
+    def test_literals(self):
+        self.traverses('/a/./b/../c/', {}, (u'a', u'c'))
+        self.traverses('a//b', {}, (u'a', u'b'))
+        self.traverses('/', {}, ())
+
+    def test_unicode_values(self):
+        self.traverses('/{x}/{y}', {'x':u'La Pe\xf1a', 'y':u'a b'},
+                       (u'La Pe\xf1a', u'a b'))
+        self.traverses('/foo/:id.html', {'id':u'\xe9'},
+                       (u'foo', u'\xe9.html'))
+
+    def test_str_values(self):
+        self.traverses('/{x}', {'x':'La Pe\xc3\xb1a'}, (u'La Pe\xf1a',))
+
+    def test_percent_encoded_values(self):
+        self.traverses('/{x}/{y}', {'x':u'%2F', 'y':'a%20b'},
+                       (u'%2F', u'a%20b'))
+
+    def test_values_with_slashes(self):
+        self.traverses('/{x}', {'x':u'a/b'}, (u'a/b',))
+
+    def test_dot_values(self):
+        self.traverses('/a/{x}/{y}', {'x':u'..', 'y':u'.'}, ())
+        self.traverses('/a/{x}{y}', {'x':u'', 'y':u''}, (u'a',))
+
+    def test_dot_values_above_root(self):
+        traverse = self._callFUT('/{x}')
+        self.assertRaises(IndexError, traverse, {'x':u'..'})
+
+    def test_star_unicode(self):
+        self.traverses('/{x}/*traverse',
+                       {'x':u'a', 'traverse':u'La Pe\xf1a/./b/../c'},
+                       (u'a', u'La Pe\xf1a', u'c'))
+
+    def test_star_str(self):
+        self.traverses('*traverse', {'traverse':'a%2Fb/La%20Pe%C3%B1a'},
+                       (u'a/b', u'La Pe\xf1a'))
+
+    def test_star_sequence(self):
+        self.traverses('/x/*traverse',
+                       {'traverse':(u'a/b', 'La Pe\xc3\xb1a', u'%41', u'..')},
+                       (u'x', u'a/b', u'La Pe\xf1a'))
+        self.traverses('/x/*traverse', {'traverse':()}, (u'x',))
+
+    def test_star_sequence_not_strings(self):
+        traverse = self._callFUT('*traverse')
+        self.assertRaises(TypeError, traverse, {'traverse':(1,)})
+
+    def test_star_not_string(self):
+        self.traverses('/x/*traverse', {'traverse':5}, (u'x', u'5'))
+
+    def test_value_not_string(self):
+        self.traverses('/{x}', {'x':1}, (u'1',))
+
+    def test_invalid_utf8(self):
+        from pyramid.exceptions import URLDecodeError
+        traverse = self._callFUT('/{x}/*traverse')
+        self.assertRaises(URLDecodeError, traverse,
+                          {'x':'\xff', 'traverse':()})
+        self.assertRaises(URLDecodeError, traverse,
+                          {'x':u'a', 'traverse':'%ff'})
+        self.assertRaises(URLDecodeError, traverse,
+                          {'x':u'a', 'traverse':['\xff']})
+
+    def test_percent_in_pattern(self):
+        self.traverses('/a%20b/{x}', {'x':u'c'}, (u'a b', u'c'))
+
+    def test_unicode_pattern(self):
+        self.traverses(u'/a/{x}', {'x':u'c'}, (u'a', u'c'))
+        traverse = self._callFUT(u'/\xe9/{x}')
+        self.assertRaises(UnicodeEncodeError, traverse, {'x':u'c'})
+
+    def test_star_glued_to_literal(self):
+        self.traverses('/a*traverse', {'traverse':u'b/c'}, (u'ab', u'c'))
+
+    def test_missing_value(self):
+        traverse = self._callFUT('/{x}/*traverse')
+        self.assertRaises(KeyError, traverse, {'traverse':()})
+        self.assertRaises(KeyError, traverse, {'x':u'a'})
 
 class DummyContext(object):
     """ """
@@ -175,3 +175,46 @@ class TestDottedNameResolver(unittest.TestCase):
         self.assertEqual(typ.package, None)
         self.assertEqual(typ.package_name, None)
 
+class Test_replace_file(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'file')
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tempdir)
+
+    def _callFUT(self, filename, data):
+        from pyramid.util import replace_file
+        return replace_file(filename, data)
+
+    def test_new(self):
+        import os
+        self._callFUT(self.filename, 'data')
+        self.assertEqual(open(self.filename, 'rb').read(), 'data')
+        self.assertEqual(os.listdir(self.tempdir), ['file'])
+
+    def test_existing(self):
+        open(self.filename, 'wb').write('old data')
+        self._callFUT(self.filename, 'data')
+        self.assertEqual(open(self.filename, 'rb').read(), 'data')
+
+    def test_rename_does_not_replace(self):
+        import os
+        open(self.filename, 'wb').write('old data')
+        rename = os.rename
+        renamed = []
+        def windows_rename(src, dst):
+            if os.path.exists(dst):
+                raise OSError
+            renamed.append(dst)
+            rename(src, dst)
+        os.rename = windows_rename
+        try:
+            self._callFUT(self.filename, 'data')
+        finally:
+            os.rename = rename
+        self.assertEqual(renamed, [self.filename])
+        self.assertEqual(open(self.filename, 'rb').read(), 'data')
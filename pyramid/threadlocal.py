@@ -1,5 +1,10 @@
 import threading
 
+try:
+    from greenlet import getcurrent as get_ident
+except ImportError: # pragma: no cover
+    from thread import get_ident
+
 from pyramid.registry import global_registry
 
 class ThreadLocalManager(threading.local):
@@ -30,11 +35,68 @@ class ThreadLocalManager(threading.local):
     def clear(self):
         self.stack[:] = []
 
+class GreenletLocalManager(object):
+    """ A threadlocal manager which keeps a separate stack for each
+    greenlet (when the :mod:`greenlet` package is installed) or else
+    for each thread, so that requests which are processed concurrently
+    by greenlets sharing a thread (e.g. under a greenlet-based WSGI
+    server) do not share their current request and registry.
+    ``get_ident`` is the function which returns the identity of the
+    current greenlet or thread."""
+    def __init__(self, default=None, get_ident=get_ident):
+        self.stacks = {}
+        self.default = default
+        self.get_ident = get_ident
+
+    def push(self, info):
+        ident = self.get_ident()
+        stack = self.stacks.get(ident)
+        if stack is None:
+            stack = self.stacks[ident] = []
+        stack.append(info)
+
+    set = push # b/c
+
+    def pop(self):
+        ident = self.get_ident()
+        stack = self.stacks.get(ident)
+        if stack:
+            info = stack.pop()
+            if not stack:
+                # don't keep finished greenlets alive
+                del self.stacks[ident]
+            return info
+
+    def get(self):
+        stack = self.stacks.get(self.get_ident())
+        if stack:
+            return stack[-1]
+        return self.default()
+
+    def clear(self):
+        self.stacks.pop(self.get_ident(), None)
+
 def defaults():
     return {'request':None, 'registry':global_registry}
 
 manager = ThreadLocalManager(default=defaults)
 
+def use_manager(new_manager):
+    """ Make ``new_manager`` the threadlocal manager used by
+    :func:`get_current_request`, :func:`get_current_registry`, the
+    :term:`router` and the :class:`pyramid.configuration.Configurator`
+    (as their ``threadlocal_manager`` and ``manager`` attributes).
+    For example, call ``use_manager(GreenletLocalManager(default=defaults))``
+    to use a greenlet-aware manager.  Call this function once, at
+    process startup, before any configuration is performed or request
+    is processed."""
+    global manager
+    from pyramid.configuration import Configurator # avoid circdep
+    from pyramid.router import Router # avoid circdep
+    manager = new_manager
+    Configurator.manager = new_manager
+    Router.threadlocal_manager = new_manager
+
 def get_current_request():
     """Return the currently active request or ``None`` if no request
     is currently active.
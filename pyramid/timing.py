@@ -0,0 +1,108 @@
+import math
+import threading
+
+from zope.interface import implements
+
+from pyramid.interfaces import IRequestTimer
+
+class RequestTimingAggregator(object):
+    """ A :class:`pyramid.interfaces.IRequestTimer` which keeps, for each
+    route name, a histogram of the durations of the requests which matched
+    the route and the total time spent in each phase of the processing of
+    those requests.  Requests which matched no route are kept under the
+    route name ``None``.
+
+    Durations are counted in histogram buckets whose upper bounds grow by a
+    factor of ``1 + precision``, starting at one microsecond, so the
+    percentiles computed by :meth:`percentiles` are never more than a
+    fraction ``precision`` greater than the exact value.
+
+    Register an instance using
+    :meth:`pyramid.configuration.Configurator.set_request_timer` to
+    collect timings for an application."""
+    implements(IRequestTimer)
+
+    resolution = 1e-6
+
+    def __init__(self, precision=0.05):
+        self.factor = 1 + precision
+        self.log_factor = math.log(self.factor)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def __call__(self, route_name, view_name, timings):
+        start = timings[0][1]
+        duration = timings[-1][1] - start
+        if duration > self.resolution:
+            bucket = int(math.ceil(
+                math.log(duration / self.resolution) / self.log_factor))
+        else:
+            bucket = 0
+        self.lock.acquire()
+        try:
+            histogram = self.histograms.setdefault(route_name, {})
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+            phases = self.phases.setdefault(route_name, {})
+            last = start
+            for phase, timestamp in timings[1:]:
+                phases[phase] = phases.get(phase, 0) + (timestamp - last)
+                last = timestamp
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """ Forget all timings recorded so far """
+        self.histograms = {}
+        self.phases = {}
+
+    def route_names(self):
+        """ Return a sorted list of the route names for which timings
+        have been recorded """
+        names = self.histograms.keys()
+        names.sort()
+        return names
+
+    def count(self, route_name):
+        """ Return the number of requests recorded for ``route_name`` """
+        self.lock.acquire()
+        try:
+            counts = self.histograms.get(route_name, {}).values()
+        finally:
+            self.lock.release()
+        return sum(counts)
+
+    def percentiles(self, route_name, percentiles=(50, 95, 99)):
+        """ Return a dictionary mapping each of ``percentiles`` to the
+        request duration (in seconds) at that percentile for
+        ``route_name``.  The dictionary is empty if no request has been
+        recorded for ``route_name``."""
+        self.lock.acquire()
+        try:
+            histogram = self.histograms.get(route_name, {}).items()
+        finally:
+            self.lock.release()
+        histogram.sort()
+        total = sum([ count for bucket, count in histogram ])
+        result = {}
+        if not total:
+            return result
+        for percentile in percentiles:
+            rank = math.ceil(percentile / 100.0 * total)
+            seen = 0
+            for bucket, count in histogram:
+                seen += count
+                if seen >= rank:
+                    break
+            result[percentile] = self.resolution * self.factor ** bucket
+        return result
+
+    def phase_totals(self, route_name):
+        """ Return a dictionary mapping phase names (see
+        :class:`pyramid.interfaces.IRequestTimer`) to the total time (in
+        seconds) spent in that phase by the requests recorded for
+        ``route_name``."""
+        self.lock.acquire()
+        try:
+            return dict(self.phases.get(route_name, {}))
+        finally:
+            self.lock.release()
@@ -1,17 +1,22 @@
+import threading
 import urllib
+import weakref
+
+from time import time
 
 from zope.interface import implements
 from zope.interface.interfaces import IInterface
 
-from repoze.lru import lru_cache
-
 from pyramid.interfaces import IContextURL
 from pyramid.interfaces import IRequestFactory
 from pyramid.interfaces import ITraverser
 from pyramid.interfaces import VH_ROOT_KEY
 
+from pyramid.caches import cached
+from pyramid.caches import register_cache
 from pyramid.encode import url_quote
 from pyramid.exceptions import URLDecodeError
+from pyramid.location import _lineage_entry
 from pyramid.location import lineage
 from pyramid.threadlocal import get_current_registry
 
@@ -80,7 +85,137 @@ def find_model(model, path):
         raise KeyError('%r has no subelement %s' % (context, view_name))
     return context
 
-def find_interface(model, class_or_interface):
+def find_models(model, paths, default=None):
+    """ Given a model object and a sequence of paths, each of which may
+    be any string or tuple accepted by
+    :func:`pyramid.traversal.find_model`, return a dictionary mapping
+    each path to the context found at that path (a path given as a
+    list is mapped as the equivalent tuple).  Paths which cannot be
+    resolved (for which ``find_model`` would raise a :exc:`KeyError`)
+    are mapped to ``default``.
+
+    The result is the same as calling ``find_model`` once per path, but
+    when the default traverser is used, the paths are first arranged in
+    a tree of their segments, so that the models along a prefix shared
+    by many paths are traversed only once.  A model which has a
+    ``__traverse_many__`` method (see
+    :class:`pyramid.traversal.ModelGraphTraverser`) is passed the
+    segments shared by all the remaining paths below it in one call.
+    """
+    results = {}
+    starts = {}
+    root = None
+
+    for path in paths:
+        if hasattr(path, '__iter__'):
+            # lists are not hashable: key the result by a tuple
+            path = tuple(path)
+            if path:
+                string = _join_path_tuple(path)
+            else:
+                string = ''
+        else:
+            string = path
+        if isinstance(string, unicode):
+            string = string.encode('ascii')
+
+        if string and string[0] == '/':
+            if root is None:
+                root = find_root(model)
+            start = root
+        else:
+            start = model
+
+        try:
+            trie = starts[id(start)][1]
+        except KeyError:
+            trie = None
+            reg = get_current_registry()
+            if reg.queryAdapter(start, ITraverser) is None:
+                # a trie node is a list of the paths which end at the node
+                # and a dictionary mapping segments to child nodes
+                trie = [[], {}]
+            starts[id(start)] = (start, trie)
+
+        if trie is None:
+            # a custom traverser: resolve the path on its own
+            try:
+                results[path] = find_model(start, path)
+            except KeyError:
+                results[path] = default
+        else:
+            node = trie
+            for segment in traversal_path(string):
+                node = node[1].setdefault(segment, [[], {}])
+            node[0].append(path)
+
+    for start, trie in starts.values():
+        if trie is not None:
+            _find_trie_models(start, trie, results, default)
+
+    return results
+
+def _find_trie_models(ob, node, results, default):
+    """ Resolve the paths in the trie ``node`` relative to ``ob`` as
+    ModelGraphTraverser would, storing the models found in ``results``
+    """
+    stack = [(ob, node)]
+    while stack:
+        ob, node = stack.pop()
+        for path in node[0]:
+            results[path] = ob
+        traverse_many = getattr(ob, '__traverse_many__', None)
+        for segment, child in node[1].items():
+            if segment[:2] == '@@':
+                # a view name makes find_model raise a KeyError, unless it
+                # is empty
+                if segment == '@@':
+                    _fill_trie(child, ob, results)
+                else:
+                    _fill_trie(child, default, results)
+            elif traverse_many is not None:
+                # pass the segments down to the next branch or view selector
+                segments = [segment]
+                nodes = [child]
+                while len(child[1]) == 1:
+                    next_segment, next_child = child[1].items()[0]
+                    if next_segment[:2] == '@@':
+                        break
+                    segments.append(next_segment)
+                    nodes.append(next_child)
+                    child = next_child
+                chain = traverse_many(tuple(segments))
+                if chain:
+                    # traversal continues from the last model found
+                    for i in range(len(chain) - 1):
+                        for path in nodes[i][0]:
+                            results[path] = chain[i]
+                    stack.append((chain[-1], nodes[len(chain)-1]))
+                else:
+                    _fill_trie(nodes[0], default, results)
+            else:
+                try:
+                    getitem = ob.__getitem__
+                except AttributeError:
+                    _fill_trie(child, default, results)
+                else:
+                    try:
+                        next = getitem(segment)
+                    except KeyError:
+                        _fill_trie(child, default, results)
+                    else:
+                        stack.append((next, child))
+
+def _fill_trie(node, value, results):
+    """ Map every path in the trie ``node`` to ``value`` """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for path in node[0]:
+            results[path] = value
+        stack.extend(node[1].values())
+
+def find_interface(model, class_or_interface, request=None):
     """
     Return the first object found in the parent chain of ``model``
     which, a) if ``class_or_interface`` is a Python class object, is
@@ -89,14 +224,29 @@ def find_interface(model, class_or_interface):
     specified interface.  Return ``None`` if no object providing
     ``interface_or_class`` can be found in the parent chain.  The
     ``model`` passed in *must* be :term:`location`-aware.
+
+    If a ``request`` is passed, the parent chain and the result are
+    memoized on the request (see
+    :func:`pyramid.location.request_lineage`).
     """
+    if request is None:
+        locations = lineage(model)
+    else:
+        model, locations, found = _lineage_entry(model, request)
+        if class_or_interface in found:
+            return found[class_or_interface]
     if IInterface.providedBy(class_or_interface):
         test = class_or_interface.providedBy
     else:
         test = lambda arg: isinstance(arg, class_or_interface)
-    for location in lineage(model):
+    result = None
+    for location in locations:
         if test(location):
-            return location
+            result = location
+            break
+    if request is not None:
+        found[class_or_interface] = result
+    return result
 
 def model_path(model, *elements):
     """ Return a string object representing the absolute physical path
@@ -139,6 +289,14 @@ def model_path(model, *elements):
               will be prepended to the generated path rather than a
               single leading '/' character.
     """
+    if not elements:
+        entry = _model_paths.get(id(model))
+        if (entry is not None and entry[1] == _model_path_generation[0]
+            and entry[0]() is model):
+            path = entry[3]
+            if path is None:
+                path = entry[3] = _join_path_tuple(entry[2])
+            return path
     # joining strings is a bit expensive so we delegate to a function
     # which caches the joined result for us
     return _join_path_tuple(model_path_tuple(model, *elements))
@@ -338,15 +496,73 @@ def model_path_tuple(model, *elements):
               its name will be the first element in the generated
               path tuple rather than the empty string.
     """
-    return tuple(_model_path_list(model, *elements))
+    entry = _model_paths.get(id(model))
+    if (entry is not None and entry[1] == _model_path_generation[0]
+        and entry[0]() is model):
+        path = entry[2]
+    else:
+        path = _model_path_tuple(model)
+    if elements:
+        path = path + elements
+    return path
 
-def _model_path_list(model, *elements):
-    """ Implementation detail shared by model_path and model_path_tuple """
-    path = [loc.__name__ or '' for loc in lineage(model)]
-    path.reverse()
-    path.extend(elements)
+# id(model) -> [weakref, generation, path tuple, path string or None]
+# for instances of CachedPathMixin; an entry is only valid if its
+# generation is the current one, which changes whenever the __name__
+# or __parent__ of a model with a valid entry changes
+_model_paths = {}
+_model_path_generation = [0]
+
+def _model_path_tuple(model):
+    """ Return the path tuple of ``model``, caching it (and the paths
+    of its ancestors) if every model in its lineage is an instance of
+    :class:`CachedPathMixin` """
+    generation = _model_path_generation[0]
+    locations = list(lineage(model))
+    locations.reverse()
+    path = tuple([loc.__name__ or '' for loc in locations])
+    for loc in locations:
+        if not isinstance(loc, CachedPathMixin):
+            break
+    else:
+        for i in range(len(locations)):
+            loc = locations[i]
+            key = id(loc)
+            ref = weakref.ref(loc, lambda ref, key=key: _forget_path(key, ref))
+            _model_paths[key] = [ref, generation, path[:i+1], None]
     return path
 
+def _forget_path(key, ref):
+    entry = _model_paths.get(key)
+    if entry is not None and entry[0] is ref:
+        _model_paths.pop(key, None)
+
+def _invalidate_paths(model):
+    entry = _model_paths.get(id(model))
+    if (entry is not None and entry[1] == _model_path_generation[0]
+        and entry[0]() is model):
+        _model_path_generation[0] += 1
+
+class CachedPathMixin(object):
+    """ A mixin for :term:`model` classes whose instances' paths (as
+    returned by :func:`pyramid.traversal.model_path` and
+    :func:`pyramid.traversal.model_path_tuple`, and so used by
+    :func:`pyramid.url.model_url`) are cached.  The path of a model
+    is cached only if every model in its :term:`lineage` is an
+    instance of this class.  The cached paths are discarded when the
+    ``__name__`` or ``__parent__`` attribute of a model whose path is
+    cached is set or deleted."""
+
+    def __setattr__(self, name, value):
+        if name == '__name__' or name == '__parent__':
+            _invalidate_paths(self)
+        super(CachedPathMixin, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if name == '__name__' or name == '__parent__':
+            _invalidate_paths(self)
+        super(CachedPathMixin, self).__delattr__(name)
+
 def virtual_root(model, request):
     """
     Provided any :term:`model` and a :term:`request` object, return
@@ -382,7 +598,7 @@ def virtual_root(model, request):
         urlgenerator = TraversalContextURL(model, request)
     return urlgenerator.virtual_root()
 
-@lru_cache(1000)
+@cached('traversal_path', 1000)
 def traversal_path(path):
     """ Given a ``PATH_INFO`` string (slash-separated path segments),
     return a tuple representing that path which can be used to
@@ -453,6 +669,27 @@ def traversal_path(path):
     if isinstance(path, unicode):
         path = path.encode('ascii')
     path = path.strip('/')
+    if not '%' in path:
+        # no segment needs to be unquoted, so the path can be decoded at
+        # once; if it can't be, the loop below reports the segment which
+        # can't
+        try:
+            segments = path.decode('utf-8').split(u'/')
+        except UnicodeDecodeError:
+            pass
+        else:
+            if path[:1] != '.' and not '/.' in path:
+                # no segment is '.' or '..'
+                return tuple([segment for segment in segments if segment])
+            clean = []
+            for segment in segments:
+                if not segment or segment == u'.':
+                    continue
+                elif segment == u'..':
+                    del clean[-1]
+                else:
+                    clean.append(segment)
+            return tuple(clean)
     clean = []
     for segment in path.split('/'):
         segment = urllib.unquote(segment) # deal with spaces in path segment
@@ -470,7 +707,8 @@ def traversal_path(path):
             clean.append(segment)
     return tuple(clean)
 
-_segment_cache = {}
+_segment_cache = register_cache('quote_path_segment', 10000)
+_marker = object()
 
 def quote_path_segment(segment):
     """ Return a quoted representation of a 'path segment' (such as
@@ -484,37 +722,43 @@ def quote_path_segment(segment):
     string, never Unicode.
 
     .. note:: The return value for each segment passed to this
-              function is cached in a module-scope dictionary for
-              speed: the cached version is returned when possible
-              rather than recomputing the quoted version.  No cache
-              emptying is ever done for the lifetime of an
-              application, however.  If you pass arbitrary
-              user-supplied strings to this function (as opposed to
-              some bounded set of values from a 'working set' known to
-              your application), it may become a memory leak.
+              function is cached for speed: the cached version is
+              returned when possible rather than recomputing the
+              quoted version.  The cache holds the values of the
+              10000 most recently used segments by default; see
+              :ref:`cache_size_settings`.
     """
     # The bit of this code that deals with ``_segment_cache`` is an
     # optimization: we cache all the computation of URL path segments
-    # in this module-scope dictionary with the original string (or
+    # in this module-scope cache with the original string (or
     # unicode value) as the key, so we can look it up later without
     # needing to reencode or re-url-quote it
-    try:
-        return _segment_cache[segment]
-    except KeyError:
+    result = _segment_cache.get(segment, _marker)
+    if result is _marker:
         if segment.__class__ is unicode: # isinstance slighly slower (~15%)
             result = url_quote(segment.encode('utf-8'))
         else:
             result = url_quote(segment)
-        # we don't need a lock to mutate _segment_cache, as the below
-        # will generate exactly one Python bytecode (STORE_SUBSCR)
-        _segment_cache[segment] = result
-        return result
+        _segment_cache.put(segment, result)
+    return result
 
 class ModelGraphTraverser(object):
     """ A model graph traverser that should be used (for speed) when
     every object in the graph supplies a ``__name__`` and
     ``__parent__`` attribute (ie. every object in the graph is
-    :term:`location` aware) ."""
+    :term:`location` aware) .
+
+    A model may resolve several path segments at once (for example,
+    with a single database query) by supplying a
+    ``__traverse_many__`` method.  It is called with a tuple of the
+    remaining path segments up to the next view selector and must
+    return a sequence of the models found for the leading segments,
+    in order: the model named by the first segment, its child named
+    by the second segment and so on, stopping at the first segment
+    which cannot be resolved.  Traversal continues from the last
+    model returned; an empty sequence means the first segment names
+    no model.  Models without ``__traverse_many__`` are traversed
+    with ``__getitem__``."""
 
     implements(ITraverser)
 
@@ -532,13 +776,21 @@ class ModelGraphTraverser(object):
             # passing us an environ.  If so, deal.
             environ = request
 
+        vpath_tuple = None
         if 'bfg.routes.matchdict' in environ:
             matchdict = environ['bfg.routes.matchdict']
 
             path = matchdict.get('traverse', '/')
             if hasattr(path, '__iter__'):
                 # this is a *traverse stararg (not a :traverse)
-                path = '/'.join([quote_path_segment(x) for x in path]) or '/'
+                if (VH_ROOT_KEY not in environ and
+                    _is_traversal_tuple(path)):
+                    # joining and parsing the segments would return them
+                    # unchanged
+                    vpath_tuple = tuple(path)
+                else:
+                    path = ('/'.join([quote_path_segment(x) for x in path])
+                            or '/')
 
             subpath = matchdict.get('subpath', ())
             if not hasattr(subpath, '__iter__'):
@@ -558,6 +810,14 @@ class ModelGraphTraverser(object):
             vroot_tuple = traversal_path(vroot_path)
             vpath = vroot_path + path
             vroot_idx = len(vroot_tuple) -1
+            if path[:1] == '/':
+                # the path of a virtually hosted request is usually
+                # parsed on its own; that of the virtual root is cached
+                try:
+                    vpath_tuple = vroot_tuple + traversal_path(path)
+                except IndexError:
+                    # '..' leaves the virtual root
+                    pass
         else:
             vroot_tuple = ()
             vpath = path
@@ -566,18 +826,21 @@ class ModelGraphTraverser(object):
         root = self.root
         ob = vroot = root
 
-        if vpath == '/' or (not vpath):
+        if vpath_tuple is None and (vpath == '/' or (not vpath)):
             # prevent a call to traversal_path if we know it's going
             # to return the empty tuple
             vpath_tuple = ()
-        else:
+        elif vpath_tuple != ():
             # we do dead reckoning here via tuple slicing instead of
             # pushing and popping temporary lists for speed purposes
             # and this hurts readability; apologies
             i = 0
             view_selector = self.VIEW_SELECTOR
-            vpath_tuple = traversal_path(vpath)
-            for segment in vpath_tuple:
+            if vpath_tuple is None:
+                vpath_tuple = traversal_path(vpath)
+            end = len(vpath_tuple)
+            while i < end:
+                segment = vpath_tuple[i]
                 if segment[:2] == view_selector:
                     return {'context':ob,
                             'view_name':segment[2:],
@@ -586,6 +849,28 @@ class ModelGraphTraverser(object):
                             'virtual_root':vroot,
                             'virtual_root_path':vroot_tuple,
                             'root':root}
+                traverse_many = getattr(ob, '__traverse_many__', None)
+                if traverse_many is not None:
+                    # resolve the segments up to the next view selector
+                    # in one call; an empty chain means the first of them
+                    # was not found
+                    j = i + 1
+                    while j < end and vpath_tuple[j][:2] != view_selector:
+                        j += 1
+                    chain = traverse_many(vpath_tuple[i:j])
+                    if not chain:
+                        return {'context':ob,
+                                'view_name':segment,
+                                'subpath':vpath_tuple[i+1:],
+                                'traversed':vpath_tuple[:vroot_idx+i+1],
+                                'virtual_root':vroot,
+                                'virtual_root_path':vroot_tuple,
+                                'root':root}
+                    if i <= vroot_idx < i + len(chain):
+                        vroot = chain[vroot_idx-i]
+                    ob = chain[-1]
+                    i += len(chain)
+                    continue
                 try:
                     getitem = ob.__getitem__
                 except AttributeError:
@@ -616,6 +901,190 @@ class ModelGraphTraverser(object):
                 'traversed':vpath_tuple, 'virtual_root':vroot,
                 'virtual_root_path':vroot_tuple, 'root':root}
 
+def _is_traversal_tuple(segments):
+    """ Return ``True`` if ``segments`` is a sequence which
+    traversal_path would return for the path made of its quoted
+    segments, that is, if all of them are Unicode and none of them is
+    empty, ``.`` or ``..``. """
+    for segment in segments:
+        if segment.__class__ is not unicode or segment in _dot_segments:
+            return False
+    return True
+
+_dot_segments = (u'', u'.', u'..')
+
+class TraversalCache(object):
+    """ A :term:`traverser` factory which caches the results of
+    traversal across requests.  Register an instance as an
+    :class:`pyramid.interfaces.ITraverser` adapter for the class or
+    interface of a root object, e.g.::
+
+      traversal_cache = TraversalCache(size=5000, timeout=300)
+      config.registry.registerAdapter(traversal_cache, (MyRoot,),
+                                      ITraverser)
+
+    The results of ``traverser`` (by default,
+    :class:`ModelGraphTraverser`) are cached by path; at most ``size``
+    results are kept (the least recently used are discarded first),
+    each for at most ``timeout`` seconds (``None`` means forever).  A
+    cached result is only used for the root object it was found from,
+    so the cache is only useful if the :term:`root factory` returns
+    the same root object for every request.
+
+    Application code which adds, removes or renames a model must call
+    :meth:`invalidate_subtree` with the path of its container (or
+    :meth:`clear`).  The ``hits`` and ``misses`` attributes count the
+    requests whose results were and were not found in the cache."""
+    hits = 0
+    misses = 0
+
+    def __init__(self, size=1000, timeout=None,
+                 traverser=ModelGraphTraverser):
+        self.size = size
+        self.timeout = timeout
+        self.traverser = traverser
+        self.lock = threading.Lock()
+        self.clear()
+
+    def __call__(self, root):
+        return CachingTraverser(self, root)
+
+    def get(self, key, root):
+        """ Return the result cached under ``key`` for ``root`` or
+        ``None`` """
+        self.lock.acquire()
+        try:
+            link = self.entries.get(key)
+            if link is not None:
+                expires = link[_EXPIRES]
+                if expires is not None and expires <= time():
+                    self._remove(link)
+                elif link[_ROOT] is root:
+                    # move the entry to the most recently used end
+                    _unlink(link)
+                    self._append(link)
+                    self.hits += 1
+                    return dict(link[_RESULT])
+            self.misses += 1
+        finally:
+            self.lock.release()
+
+    def set(self, key, result):
+        """ Cache the traversal ``result`` under ``key`` """
+        expires = None
+        if self.timeout is not None:
+            expires = time() + self.timeout
+        path = (tuple(result['traversed']) + (result['view_name'],) +
+                tuple(result['subpath']))
+        self.lock.acquire()
+        try:
+            entries = self.entries
+            link = entries.get(key)
+            if link is not None:
+                self._remove(link)
+            link = [None, None, key, expires, result['root'], result, path]
+            self._append(link)
+            entries[key] = link
+            head = self.head
+            while len(entries) > self.size:
+                self._remove(head[_NEXT])
+        finally:
+            self.lock.release()
+
+    def keys(self):
+        """ Return a list of the keys of the cached results, the least
+        recently used first """
+        self.lock.acquire()
+        try:
+            head = self.head
+            result = []
+            link = head[_NEXT]
+            while link is not head:
+                result.append(link[_KEY])
+                link = link[_NEXT]
+            return result
+        finally:
+            self.lock.release()
+
+    def invalidate_subtree(self, path_tuple):
+        """ Discard the cached results of traversals of paths which
+        start with ``path_tuple``, a tuple of Unicode model names such
+        as the value returned by
+        :func:`pyramid.traversal.model_path_tuple` (the leading empty
+        string representing the root in that value may be omitted)."""
+        path_tuple = tuple(path_tuple)
+        if path_tuple[:1] == ('',):
+            path_tuple = path_tuple[1:]
+        length = len(path_tuple)
+        self.lock.acquire()
+        try:
+            for link in self.entries.values():
+                if link[_PATH][:length] == path_tuple:
+                    self._remove(link)
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """ Discard all cached results """
+        self.lock.acquire()
+        try:
+            # the entries are links of a circular list which starts
+            # and ends at ``head``, from the least to the most recently
+            # used
+            self.entries = {}
+            head = self.head = [None, None, None, None, None, None, None]
+            head[_PREV] = head[_NEXT] = head
+        finally:
+            self.lock.release()
+
+    def _append(self, link):
+        head = self.head
+        last = head[_PREV]
+        link[_PREV] = last
+        link[_NEXT] = head
+        last[_NEXT] = head[_PREV] = link
+
+    def _remove(self, link):
+        _unlink(link)
+        del self.entries[link[_KEY]]
+
+# the items of the links of a TraversalCache
+_PREV, _NEXT, _KEY, _EXPIRES, _ROOT, _RESULT, _PATH = range(7)
+
+def _unlink(link):
+    link[_PREV][_NEXT] = link[_NEXT]
+    link[_NEXT][_PREV] = link[_PREV]
+
+class CachingTraverser(object):
+    """ The :term:`traverser` created by a :class:`TraversalCache` for
+    a root object """
+    implements(ITraverser)
+
+    def __init__(self, cache, root):
+        self.cache = cache
+        self.root = root
+
+    def __call__(self, request):
+        try:
+            environ = request.environ
+        except AttributeError:
+            environ = request
+
+        matchdict = environ.get('bfg.routes.matchdict')
+        if matchdict is None:
+            key = (environ.get('PATH_INFO'), environ.get(VH_ROOT_KEY))
+        else:
+            key = (environ.get(VH_ROOT_KEY), matchdict.get('traverse', '/'),
+                   matchdict.get('subpath', ()))
+
+        cache = self.cache
+        result = cache.get(key, self.root)
+        if result is None:
+            result = cache.traverser(self.root)(request)
+            cache.set(key, result)
+            result = dict(result)
+        return result
+
 class TraversalContextURL(object):
     """ The IContextURL adapter used to generate URLs for a context
     object obtained via graph traversal"""
@@ -631,7 +1100,20 @@ class TraversalContextURL(object):
         environ = self.request.environ
         vroot_varname = self.vroot_varname
         if vroot_varname in environ:
-            return find_model(self.context, environ[vroot_varname])
+            vroot_path = environ[vroot_varname]
+            # shortcut instead of using find_model: the traverser has
+            # usually found the virtual root of the request already,
+            # which is the one of the context if it is in the same graph
+            request = self.request
+            root = find_root(self.context)
+            vroot_tuple = traversal_path(vroot_path)
+            attrs = getattr(request, '__dict__', {})
+            if (attrs.get('root') is root and
+                attrs.get('virtual_root_path') == vroot_tuple and
+                len(attrs.get('traversed', ())) >= len(vroot_tuple) and
+                'virtual_root' in attrs):
+                return attrs['virtual_root']
+            return find_model(root, vroot_path)
         # shortcut instead of using find_root; we probably already
         # have it on the request
         try:
@@ -665,7 +1147,7 @@ class TraversalContextURL(object):
         app_url = request.application_url # never ends in a slash
         return app_url + path
 
-@lru_cache(1000)
+@cached('join_path_tuple', 1000)
 def _join_path_tuple(tuple):
     return tuple and '/'.join([quote_path_segment(x) for x in tuple]) or '/'
 
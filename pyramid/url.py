@@ -2,16 +2,19 @@
 
 import os
 
-from repoze.lru import lru_cache
+from zope.interface import providedBy
 
 from pyramid.interfaces import IContextURL
 from pyramid.interfaces import IRoutesMapper
 from pyramid.interfaces import IStaticURLInfo
+from pyramid.interfaces import VH_ROOT_KEY
 
+from pyramid.caches import cached
 from pyramid.encode import urlencode
 from pyramid.path import caller_package
 from pyramid.threadlocal import get_current_registry
 from pyramid.traversal import TraversalContextURL
+from pyramid.traversal import model_path
 from pyramid.traversal import quote_path_segment
 
 def route_url(route_name, request, *elements, **kw):
@@ -107,6 +110,43 @@ def route_url(route_name, request, *elements, **kw):
     arguments passed to this function might be augmented or changed.
 
     """
+    route = _find_route(route_name, request)
+    return _route_url(route, request, elements, kw)
+
+def route_urls(route_name, request, kws, *elements):
+    """Generates a list of fully qualified URLs for a named
+    :app:`Pyramid` :term:`route configuration`, one URL for each
+    dictionary in the iterable ``kws``.
+
+    Each dictionary in ``kws`` contains the keyword arguments that would
+    be passed to :func:`pyramid.url.route_url` to generate one URL
+    (including ``_query``, ``_anchor`` and ``_app_url``).  The
+    ``*elements`` are appended to each generated URL as they would be by
+    :func:`pyramid.url.route_url`.  For example::
+
+        route_urls('item', request, [{'id':'1'}, {'id':'2'}]) =>
+
+                        ['http://e.com/items/1', 'http://e.com/items/2']
+
+    The result is the same as calling ``route_url`` once per dictionary,
+    but the route is looked up and ``request.application_url`` is
+    computed only once for the whole batch, which makes a difference
+    when many links to the same route are generated for a single
+    response.  The dictionaries in ``kws`` are not mutated.
+
+    This function raises a :exc:`KeyError` if any URL cannot be generated.
+    """
+    route = _find_route(route_name, request)
+    app_url = None
+    urls = []
+    for kw in kws:
+        kw = dict(kw)
+        if app_url is None and not '_app_url' in kw:
+            app_url = request.application_url
+        urls.append(_route_url(route, request, elements, kw, app_url))
+    return urls
+
+def _find_route(route_name, request):
     try:
         reg = request.registry
     except AttributeError:
@@ -117,6 +157,9 @@ def route_url(route_name, request, *elements, **kw):
     if route is None:
         raise KeyError('No such route named %s' % route_name)
 
+    return route
+
+def _route_url(route, request, elements, kw, default_app_url=None):
     if route.pregenerator is not None:
         elements, kw = route.pregenerator(request, elements, kw)
 
@@ -146,10 +189,12 @@ def route_url(route_name, request, *elements, **kw):
         suffix = ''
 
     if app_url is None:
-        # we only defer lookup of application_url until here because
-        # it's somewhat expensive; we won't need to do it if we've
-        # been passed _app_url
-        app_url = request.application_url
+        app_url = default_app_url
+        if app_url is None:
+            # we only defer lookup of application_url until here
+            # because it's somewhat expensive; we won't need to do it
+            # if we've been passed _app_url
+            app_url = request.application_url
 
     return app_url + path + suffix + qs + anchor
 
@@ -278,6 +323,60 @@ def model_url(model, request, *elements, **kw):
         context_url = TraversalContextURL(model, request)
     model_url = context_url()
 
+    return model_url + _model_url_suffix(elements, kw)
+
+def model_urls(models, request, *elements, **kw):
+    """Generates a list of fully qualified URLs, one for each
+    :term:`model` in the iterable ``models``.  The ``*elements`` and
+    ``query`` and ``anchor`` keyword arguments are appended to each
+    generated URL as they would be by :func:`pyramid.url.model_url`.
+
+    The result is the same as calling ``model_url`` once per model, but
+    the URL generator (:class:`pyramid.interfaces.IContextURL`) for each
+    type of model is looked up only once, and ``request.application_url``
+    and the virtual root path are computed only once for the whole
+    batch, which makes a difference when many links to models are
+    generated for a single response.
+    """
+    try:
+        reg = request.registry
+    except AttributeError:
+        reg = get_current_registry() # b/c
+
+    suffix = _model_url_suffix(elements, kw)
+    lookup = reg.adapters.lookup
+    request_iface = providedBy(request)
+    factories = {}
+    app_url = None
+    vroot_path = None
+    urls = []
+
+    for model in models:
+        model_iface = providedBy(model)
+        try:
+            factory = factories[model_iface]
+        except KeyError:
+            factory = lookup((model_iface, request_iface), IContextURL)
+            factories[model_iface] = factory
+        if factory is not None:
+            context_url = factory(model, request)
+            if context_url is not None:
+                urls.append(context_url() + suffix)
+                continue
+        # the equivalent of TraversalContextURL.__call__
+        if app_url is None:
+            app_url = request.application_url # never ends in a slash
+            vroot_path = request.environ.get(VH_ROOT_KEY)
+        path = model_path(model)
+        if path != '/':
+            path = path + '/'
+        if vroot_path is not None and path.startswith(vroot_path):
+            path = path[len(vroot_path):]
+        urls.append(app_url + path + suffix)
+
+    return urls
+
+def _model_url_suffix(elements, kw):
     qs = ''
     anchor = ''
 
@@ -295,7 +394,7 @@ def model_url(model, request, *elements, **kw):
     else:
         suffix = ''
 
-    return model_url + suffix + qs + anchor
+    return suffix + qs + anchor
 
 def static_url(path, request, **kw):
     """
@@ -356,6 +455,6 @@ def static_url(path, request, **kw):
         
     return info.generate(path, request, **kw)
 
-@lru_cache(1000)
+@cached('join_elements', 1000)
 def _join_elements(elements):
     return '/'.join([quote_path_segment(s) for s in elements])
@@ -2,10 +2,13 @@ import re
 from urllib import unquote
 from zope.interface import implements
 
+from repoze.lru import LRUCache
+
 from pyramid.interfaces import IRoutesMapper
 from pyramid.interfaces import IRoute
 
 from pyramid.compat import all
+from pyramid.encode import always_safe
 from pyramid.encode import url_quote
 from pyramid.exceptions import URLDecodeError
 from pyramid.traversal import traversal_path
@@ -16,21 +19,44 @@ _marker = object()
 
 class Route(object):
     implements(IRoute)
+
+    # set by the router when direct route-to-view binding is enabled:
+    # a (registry generation, request iface, view callable) tuple
+    binding = None
+
     def __init__(self, name, pattern, factory=None, predicates=(),
                  pregenerator=None):
         self.pattern = pattern
         self.path = pattern # indefinite b/w compat, not in interface
         self.match, self.generate = _compile_route(pattern)
+        self.prefix = _route_prefix(pattern)
         self.name = name
         self.factory = factory
         self.predicates = predicates
         self.pregenerator = pregenerator
 
 class RoutesMapper(object):
+    """ The default :term:`routes mapper`.  It tries the pattern of each
+    route in the order in which the routes were connected.
+
+    If ``cache_size`` is a positive integer, the outcome of matching a
+    ``PATH_INFO`` value is remembered in a least-recently-used cache of
+    (at most) that many entries whenever the outcome cannot depend on
+    anything but the path (i.e. when no route with predicates matched
+    the path before the outcome was determined).  The ``cache_hits`` and
+    ``cache_misses`` attributes of the mapper count cache lookups.  The
+    cache is cleared whenever a route is connected."""
     implements(IRoutesMapper)
-    def __init__(self):
+
+    cache = None
+    cache_hits = 0
+    cache_misses = 0
+
+    def __init__(self, cache_size=None):
         self.routelist = []
         self.routes = {}
+        if cache_size:
+            self.cache = LRUCache(cache_size)
 
     def has_routes(self):
         return bool(self.routelist)
@@ -49,11 +75,18 @@ class RoutesMapper(object):
         route = Route(name, pattern, factory, predicates, pregenerator)
         self.routelist.append(route)
         self.routes[name] = route
+        if self.cache is not None:
+            self.cache.clear()
         return route
 
     def generate(self, name, kw):
         return self.routes[name].generate(kw)
 
+    def candidates(self, path):
+        """ Return the sequence of routes which might match ``path``
+        in connection order """
+        return self.routelist
+
     def __call__(self, request):
         environ = request.environ
         try:
@@ -62,17 +95,104 @@ class RoutesMapper(object):
         except KeyError:
             path = '/'
 
-        for route in self.routelist:
+        cache = self.cache
+        if cache is not None:
+            cached = cache.get(path, _marker)
+            if cached is not _marker:
+                self.cache_hits += 1
+                route, match = cached
+                if match is not None:
+                    # the cached matchdict must not be mutated by views
+                    match = match.copy()
+                return {'match':match, 'route':route}
+            self.cache_misses += 1
+
+        # the outcome may only be cached if no route predicate was
+        # consulted to determine it
+        cacheable = cache is not None
+
+        for route in self.candidates(path):
             match = route.match(path)
             if match is not None:
                 preds = route.predicates
                 info = {'match':match, 'route':route}
-                if preds and not all((p(info, request) for p in preds)):
-                    continue
+                if preds:
+                    cacheable = False
+                    if not all((p(info, request) for p in preds)):
+                        continue
+                elif cacheable:
+                    cache.put(path, (route, match.copy()))
                 return info
 
+        if cacheable:
+            cache.put(path, (None, None))
         return {'route':None, 'match':None}
 
+class IndexedRoutesMapper(RoutesMapper):
+    """ A routes mapper which indexes each route by the complete path
+    segments of the literal prefix of its pattern (the part of the
+    pattern before its first replacement marker) in a segment trie.
+    When a request is matched, only the routes stored at the trie nodes
+    along the request's ``PATH_INFO`` are tried, rather than every
+    route in the mapper.  The registration-order and predicate
+    fallthrough semantics of :class:`RoutesMapper` are preserved:
+    candidates are always tried in the order in which their routes were
+    connected."""
+    def __init__(self, cache_size=None):
+        RoutesMapper.__init__(self, cache_size)
+        # each trie node is a two-list of [children, entries]; entries
+        # is a list of (connection order, route) two-tuples
+        self.index = [{}, []]
+        self.order = 0
+
+    def connect(self, name, pattern, factory=None, predicates=(),
+                pregenerator=None):
+        oldroute = self.routes.get(name)
+        if oldroute is not None:
+            entries = self._node(oldroute)[1]
+            for entry in entries:
+                if entry[1] is oldroute:
+                    entries.remove(entry)
+                    break
+        route = RoutesMapper.connect(self, name, pattern, factory,
+                                     predicates, pregenerator)
+        self.order += 1
+        self._node(route)[1].append((self.order, route))
+        return route
+
+    def _node(self, route):
+        node = self.index
+        for segment in route.prefix.split('/')[1:-1]:
+            node = node[0].setdefault(segment, [{}, []])
+        return node
+
+    def candidates(self, path):
+        node = self.index
+        parts = path.split('/')
+        if parts[0]:
+            # every route pattern starts with a slash
+            return ()
+        found = node[1]
+        merged = None
+        # the last part is never followed by a slash, so it cannot be a
+        # complete prefix segment
+        for segment in parts[1:-1]:
+            node = node[0].get(segment)
+            if node is None:
+                break
+            entries = node[1]
+            if entries:
+                if found:
+                    if merged is None:
+                        merged = list(found)
+                    merged.extend(entries)
+                else:
+                    found = entries
+        if merged is not None:
+            merged.sort()
+            found = merged
+        return [ entry[1] for entry in found ]
+
 # stolen from bobo and modified
 old_route_re = re.compile(r'(\:[a-zA-Z]\w*)')
 route_re = re.compile(r'(\{[a-zA-Z][^\}]*\})')
@@ -80,23 +200,38 @@ def update_pattern(matchobj):
     name = matchobj.group(0)
     return '{%s}' % name[1:]
 
-def _compile_route(route):
+def _normalize_route(route):
     if old_route_re.search(route) and not route_re.search(route):
         route = old_route_re.sub(update_pattern, route)
 
     if not route.startswith('/'):
         route = '/' + route
+    return route
+
+def _route_prefix(route):
+    """ Return the literal text which every path matched by the route
+    pattern ``route`` must start with """
+    route = _normalize_route(route)
+    if '*' in route:
+        route = route.rsplit('*', 1)[0]
+    return route_re.split(route)[0]
+
+def _compile_route(route):
+    route = _normalize_route(route)
     star = None
     if '*' in route:
         route, star = route.rsplit('*', 1)
     pat = route_re.split(route)
     pat.reverse()
     rpat = []
+    # the generator interpolates quoted marker values into a format
+    # string made of the literal pattern fragments
     gen = []
+    names = []
     prefix = pat.pop()
     if prefix:
         rpat.append(re.escape(prefix))
-        gen.append(prefix)
+        gen.append(prefix.replace('%', '%%'))
     while pat:
         name = pat.pop()
         name = name[1:-1]
@@ -104,17 +239,18 @@ def _compile_route(route):
             name, reg = name.split(':')
         else:
             reg = '[^/]+'
-        gen.append('%%(%s)s' % name)
+        gen.append('%s')
+        names.append(name)
         name = '(?P<%s>%s)' % (name, reg)
         rpat.append(name)
         s = pat.pop()
         if s:
             rpat.append(re.escape(s))
-            gen.append(s)
+            gen.append(s.replace('%', '%%'))
 
     if star:
         rpat.append('(?P<%s>.*?)' % star)
-        gen.append('%%(%s)s' % star)
+        gen.append('%s')
 
     pattern = ''.join(rpat) + '$'
 
@@ -142,19 +278,123 @@ def _compile_route(route):
                     
 
     gen = ''.join(gen)
+    names = tuple(names)
+    must_quote = _must_quote
     def generator(dict):
-        newdict = {}
-        for k, v in dict.items():
+        values = []
+        append = values.append
+        for name in names:
+            v = dict[name] # raises KeyError if a marker value is missing
+            if v.__class__ is str and must_quote(v) is None:
+                # fast path: the value is already URL-safe
+                append(v)
+            else:
+                append(_quote_marker_value(v))
+        if star:
+            v = dict[star]
             if isinstance(v, unicode):
                 v = v.encode('utf-8')
-            if k == star and hasattr(v, '__iter__'):
+            elif hasattr(v, '__iter__'):
                 v = '/'.join([quote_path_segment(x) for x in v])
-            elif k != star:
-                try:
-                    v = url_quote(v)
-                except TypeError:
-                    pass
-            newdict[k] = v
-        return gen % newdict
+            append(v)
+        return gen % tuple(values)
 
     return matcher, generator
+
+_must_quote = re.compile(r'[^%s]' % always_safe).search
+
+def _quote_marker_value(v):
+    if isinstance(v, unicode):
+        v = v.encode('utf-8')
+    try:
+        return url_quote(v)
+    except TypeError:
+        # not a string; it's rendered into the URL via its __str__
+        return v
+
+def _compile_traverse(traverse):
+    """ Return a function which computes the traversal path tuple that
+    :func:`pyramid.traversal.traversal_path` would return for the path
+    generated from the ``traverse`` route pattern and a matchdict, but
+    which does not generate and reparse that path when it can
+    interpolate the matchdict values into the pattern's segments
+    directly."""
+    _, generator = _compile_route(traverse)
+    def slow_traverse(match):
+        return traversal_path(generator(match))
+
+    route = _normalize_route(traverse)
+    star = None
+    if '*' in route:
+        route, star = route.rsplit('*', 1)
+    if '%' in route or (star and not route.endswith('/')):
+        # literals would be unquoted or the stararg would be glued to
+        # a literal by traversal_path
+        return slow_traverse
+    try:
+        route.decode('ascii')
+    except UnicodeError:
+        return slow_traverse
+
+    # each segment template is a list of literal strings and (marker
+    # name,) tuples
+    segments = [[]]
+    for i, part in enumerate(route_re.split(route)):
+        if i % 2:
+            segments[-1].append((part[1:-1].split(':')[0],))
+        else:
+            literals = part.split('/')
+            segments[-1].append(literals[0])
+            for literal in literals[1:]:
+                segments.append([literal])
+    # segments made only of literal text which traversal_path would
+    # skip are skipped at compile time
+    templates = []
+    for template in segments:
+        template = [ part for part in template if part ]
+        if template and template != ['.']:
+            templates.append(template)
+
+    def push(path, segment):
+        if segment == u'..':
+            del path[-1]
+        elif segment and segment != u'.':
+            path.append(segment)
+
+    def traverse(match):
+        path = []
+        try:
+            for template in templates:
+                segment = []
+                for part in template:
+                    if part.__class__ is tuple:
+                        part = match[part[0]]
+                        if part.__class__ is str:
+                            part = part.decode('utf-8')
+                        elif part.__class__ is not unicode:
+                            return slow_traverse(match)
+                    segment.append(part)
+                push(path, u''.join(segment))
+            if star:
+                value = match[star]
+                if value.__class__ is unicode:
+                    value = value.encode('utf-8')
+                if value.__class__ is str:
+                    for segment in value.split('/'):
+                        push(path, unquote(segment).decode('utf-8'))
+                elif hasattr(value, '__iter__'):
+                    for segment in value:
+                        if segment.__class__ is str:
+                            segment = segment.decode('utf-8')
+                        elif segment.__class__ is not unicode:
+                            return slow_traverse(match)
+                        push(path, segment)
+                else:
+                    return slow_traverse(match)
+        except (UnicodeDecodeError, IndexError):
+            # traversal_path raises the appropriate URLDecodeError or
+            # IndexError
+            return slow_traverse(match)
+        return tuple(path)
+
+    return traverse
@@ -1,3 +1,4 @@
+import os
 import pkg_resources
 import sys
 
@@ -141,4 +142,21 @@ class DottedNameResolver(object):
                 return self._zope_dottedname_style(dotted)
         return dotted
 
-
+def replace_file(filename, data):
+    """ Replace the contents of the file named ``filename`` (creating
+    it if it does not exist) with the string ``data``.  The data is
+    written to a file of the current process which is then renamed, so
+    that processes writing the same file at once do not mix their
+    writes and a process reading it never sees a partial file."""
+    temp = '%s.%d.tmp' % (filename, os.getpid())
+    f = open(temp, 'wb')
+    try:
+        f.write(data)
+    finally:
+        f.close()
+    try:
+        os.rename(temp, filename)
+    except OSError:
+        # Windows does not rename over an existing file
+        os.remove(filename)
+        os.rename(temp, filename)
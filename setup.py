@@ -75,6 +75,10 @@ setup(name='pyramid',
       zip_safe=False,
       install_requires = install_requires,
       tests_require = tests_require,
+      extras_require = {
+        # a greenlet-aware threadlocal manager (pyramid.threadlocal)
+        'greenlet':['greenlet'],
+        },
       test_suite="pyramid.tests",
       entry_points = """\
         [paste.paster_create_template]